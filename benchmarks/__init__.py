@@ -0,0 +1 @@
+# benchmarks: 合成图基准测试（python -m benchmarks --help）
@@ -0,0 +1,104 @@
+# benchmarks/__main__.py
+"""
+用法：
+  python -m benchmarks                                  # 运行 small,medium 预设
+  python -m benchmarks --preset large --repeat 3
+  python -m benchmarks --nodes 5000 --depth 6 --fanout 8 --rel-density 0.3 \
+                       --doc-chars 120 --kinds topic=1,issue=2,position=3,pro=2,con=2
+  python -m benchmarks --layout 1000,10000                # 另测 ibmm.layout（直接建图，不经 import）
+  python -m benchmarks --save-baseline benchmarks/baseline.json
+  python -m benchmarks --compare benchmarks/baseline.json --threshold 1.25
+"""
+from __future__ import annotations
+import argparse, json, sys, tempfile
+from dataclasses import replace
+from pathlib import Path
+
+from .suite import PRESETS, run_suite, compare
+from .synth import SynthSpec
+
+RESULTS_DIR = Path(__file__).resolve().parent / "results"
+
+def _parse_kinds(s: str) -> dict:
+    mix = {}
+    for part in s.split(","):
+        if not part.strip(): continue
+        k, _, w = part.partition("=")
+        mix[k.strip()] = int(w or 1)
+    return mix
+
+def _print_results(results: dict):
+    for case, r in results["cases"].items():
+        g = r["graph"]
+        print(f"\n== {case}: {g['nodes']} nodes, {g['edges']} edges ==")
+        print(f"{'phase':<22}{'min ms':>10}{'median ms':>12}{'peak KiB':>12}{'bytes':>12}")
+        for ph, t in r["timings"].items():
+            peak = r["peak_kib"].get(ph, "")
+            size = r["sizes"].get(ph, "")
+            print(f"{ph:<22}{t['min']*1e3:>10.2f}{t['median']*1e3:>12.2f}{peak!s:>12}{size!s:>12}")
+
+def main(argv=None) -> int:
+    ap = argparse.ArgumentParser(prog="python -m benchmarks", description="ibmm synthetic-graph benchmarks")
+    ap.add_argument("--preset", default="small,medium",
+                    help=f"逗号分隔的预设名（{', '.join(PRESETS)}）；给出自定义参数时忽略")
+    ap.add_argument("--nodes", type=int)
+    ap.add_argument("--depth", type=int)
+    ap.add_argument("--fanout", type=int)
+    ap.add_argument("--rel-density", type=float)
+    ap.add_argument("--doc-chars", type=int)
+    ap.add_argument("--kinds", type=_parse_kinds, help="kind 权重，如 topic=2,issue=1,position=2")
+    ap.add_argument("--layout", default="",
+                    help="逗号分隔的节点数：额外运行分层布局 + SVG 基准（如 1000,10000）")
+    ap.add_argument("--seed", type=int, default=1)
+    ap.add_argument("--repeat", type=int, default=5)
+    ap.add_argument("--no-memory", action="store_true", help="跳过 tracemalloc 峰值内存测量")
+    ap.add_argument("--workdir", default=str(Path(tempfile.gettempdir()) / "ibmm-bench"),
+                    help="生成的合成模块存放目录")
+    ap.add_argument("-o", "--output", default=str(RESULTS_DIR / "latest.json"))
+    ap.add_argument("--save-baseline", metavar="PATH", help="同时把结果写为基线")
+    ap.add_argument("--compare", metavar="BASELINE", help="与基线 JSON 比较，出现回退时返回 1")
+    ap.add_argument("--threshold", type=float, default=1.25, help="回退判定阈值（当前/基线）")
+    args = ap.parse_args(argv)
+
+    custom = {
+        "nodes": args.nodes, "depth": args.depth, "fanout": args.fanout,
+        "rel_density": args.rel_density, "doc_chars": args.doc_chars, "kind_mix": args.kinds,
+    }
+    custom = {k: v for k, v in custom.items() if v is not None}
+    if custom:
+        cases = {"custom": replace(SynthSpec(), seed=args.seed, **custom)}
+    else:
+        names = [n.strip() for n in args.preset.split(",") if n.strip()]
+        unknown = [n for n in names if n not in PRESETS]
+        if unknown:
+            ap.error(f"unknown preset(s): {', '.join(unknown)}")
+        cases = {n: replace(PRESETS[n], seed=args.seed) for n in names}
+
+    layout_cases = {
+        f"layout-{n}": replace(PRESETS["large"], nodes=int(n), seed=args.seed)
+        for n in args.layout.split(",") if n.strip()
+    }
+    results = run_suite(cases, Path(args.workdir), repeat=args.repeat, memory=not args.no_memory,
+                        layout_cases=layout_cases)
+    _print_results(results)
+
+    for out in filter(None, [args.output, args.save_baseline]):
+        p = Path(out)
+        p.parent.mkdir(parents=True, exist_ok=True)
+        p.write_text(json.dumps(results, indent=2, ensure_ascii=False), encoding="utf-8")
+        print(f"\n[bench] saved {p}")
+
+    if args.compare:
+        baseline = json.loads(Path(args.compare).read_text(encoding="utf-8"))
+        rows = compare(results, baseline, threshold=args.threshold)
+        print(f"\n== compare vs {args.compare} (min, threshold x{args.threshold}) ==")
+        for r in rows:
+            flag = "  REGRESSED" if r["regressed"] else ""
+            print(f"{r['case']:<10}{r['phase']:<22}{r['baseline']*1e3:>10.2f} -> {r['current']*1e3:>10.2f} ms"
+                  f"  x{r['ratio']:.2f}{flag}")
+        if any(r["regressed"] for r in rows):
+            return 1
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
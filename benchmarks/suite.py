@@ -0,0 +1,224 @@
+# benchmarks/suite.py
+"""
+基准套件：对合成图依次计时
+  import（执行装饰器）→ resolve_all → mindmap 导出 → flowchart 导出（无/有 subgraph），
+并用 tracemalloc 单独跑一遍记录各阶段峰值内存。结果为 JSON，可与基线比较。
+
+flowchart_styled / flowchart_compact 为带边样式的完整输出与紧凑输出（短 id、合并的 class/linkStyle、
+click 编辑链接），bytes 列即两者的大小对照。
+flowchart_ego 为以关系最多的节点为焦点的两步邻域导出（focus/hops，只访问邻域内的索引边）。
+argument_scores 阶段对导入的图整体计算一次 ibmm.ibis 论证评分（一次后序遍历）。
+bulk_add 阶段把同一份合成图以数据形式写入新的 Registry（不创建类），与 import 阶段的
+装饰器路径对照。布局基准（run_layout_case）同样跳过 import，以便测到 1 万节点规模的
+ibmm.layout 分层布局与 SVG 输出。
+"""
+from __future__ import annotations
+import gc, importlib, platform, statistics, sys, time, tracemalloc
+from dataclasses import asdict
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+import ibmm
+from ibmm import core, ibis, layout
+from .synth import SynthSpec, build_registry, synth_records, write_module
+
+PRESETS: Dict[str, SynthSpec] = {
+    "small":  SynthSpec(nodes=200,  depth=4, fanout=5, rel_density=0.2, doc_chars=40),
+    "medium": SynthSpec(nodes=600,  depth=5, fanout=6, rel_density=0.2, doc_chars=60),
+    "large":  SynthSpec(nodes=2000, depth=6, fanout=8, rel_density=0.2, doc_chars=60),
+}
+
+class Context:
+    """一次基准运行的共享状态（阶段函数之间传递）。"""
+    def __init__(self, spec: SynthSpec, module: str):
+        self.spec = spec
+        self.module = module
+        self.roots: List[str] = []
+        self.focus: Optional[str] = None
+        self.records = None   # bulk_add 阶段的输入数据（首次使用时生成，不计时）
+
+# ---------- 阶段 ----------
+# 每个阶段：fn(ctx) -> 可选返回 str（记录输出字节数）。按注册顺序执行。
+PHASES: List[Tuple[str, Callable[[Context], Any]]] = []
+
+def phase(name: str):
+    def deco(fn: Callable[[Context], Any]):
+        PHASES.append((name, fn))
+        return fn
+    return deco
+
+@phase("import")
+def _import(ctx: Context):
+    core.reset_registry()
+    sys.modules.pop(ctx.module, None)
+    importlib.import_module(ctx.module)
+
+@phase("resolve")
+def _resolve(ctx: Context):
+    core.REGISTRY.resolve_all()
+    tops = sorted(nid for nid, n in core.REGISTRY.nodes.items() if not n.parent)
+    if len(tops) == 1:
+        tops = sorted(nid for nid, n in core.REGISTRY.nodes.items() if n.parent == tops[0])
+    ctx.roots = tops[:8]
+    links = core.REGISTRY._links
+    ctx.focus = min(links, key=lambda nid: (-len(links[nid]), nid)) if links else tops[0]
+
+@phase("mindmap")
+def _mindmap(ctx: Context):
+    return ibmm.to_mermaid_mindmap(None)
+
+@phase("flowchart")
+def _flowchart(ctx: Context):
+    return ibmm.to_mermaid_flowchart(None, show_text=True)
+
+# 与 index.html 相同的边样式：每条语义边一个 linkStyle，用于对照紧凑模式的合并效果
+EDGE_STYLES = {
+    "supports": "color:green,stroke:green,stroke-width:2px;",
+    "opposes":  "color:red,stroke:red,stroke-width:2px;",
+    "answers":  "color:blue,stroke:blue,stroke-width:2px;",
+    "relates":  "color:gray,stroke:gray,stroke-width:2px, stroke-dasharray: 2 2;",
+}
+
+@phase("flowchart_styled")
+def _flowchart_styled(ctx: Context):
+    return ibmm.to_mermaid_flowchart(None, show_text=True, edge_styles=EDGE_STYLES)
+
+@phase("flowchart_compact")
+def _flowchart_compact(ctx: Context):
+    return ibmm.to_mermaid_flowchart(None, show_text=True, edge_styles=EDGE_STYLES, compact=True)
+
+@phase("flowchart_subgraphs")
+def _flowchart_subgraphs(ctx: Context):
+    return ibmm.to_mermaid_flowchart(None, show_text=True, subgraphs=list(ctx.roots))
+
+@phase("flowchart_ego")
+def _flowchart_ego(ctx: Context):
+    return ibmm.to_mermaid_flowchart(show_text=True, focus=ctx.focus, hops=2)
+
+@phase("layout_svg")
+def _layout_svg(ctx: Context):
+    return layout.to_svg(None)
+
+@phase("argument_scores")
+def _argument_scores(ctx: Context):
+    ibis.ArgumentScores(core.REGISTRY)
+
+@phase("bulk_add")
+def _bulk_add(ctx: Context):
+    if ctx.records is None:
+        ctx.records = synth_records(ctx.spec)
+    reg = core.Registry()
+    reg.bulk_add(*ctx.records)
+    reg.resolve_all()
+
+# ---------- 运行 ----------
+def run_case(spec: SynthSpec, workdir: Path, repeat: int = 5, memory: bool = True) -> Dict[str, Any]:
+    """对一组参数运行全部阶段，返回 {params, timings, peak_kib, sizes, graph}。"""
+    if str(workdir) not in sys.path:
+        sys.path.insert(0, str(workdir))
+    ctx = Context(spec, write_module(spec, workdir))
+    importlib.invalidate_caches()
+
+    samples: Dict[str, List[float]] = {name: [] for name, _ in PHASES}
+    sizes: Dict[str, int] = {}
+    for _ in range(repeat):
+        gc.collect()
+        for name, fn in PHASES:
+            t0 = time.perf_counter()
+            out = fn(ctx)
+            samples[name].append(time.perf_counter() - t0)
+            if isinstance(out, str):
+                sizes[name] = len(out.encode("utf-8"))
+
+    peaks: Dict[str, float] = {}
+    if memory:
+        gc.collect()
+        tracemalloc.start()
+        try:
+            for name, fn in PHASES:
+                tracemalloc.reset_peak()
+                fn(ctx)
+                peaks[name] = round(tracemalloc.get_traced_memory()[1] / 1024, 1)
+        finally:
+            tracemalloc.stop()
+
+    timings = {
+        name: {"min": min(v), "median": statistics.median(v)}
+        for name, v in samples.items()
+    }
+    return {
+        "params": asdict(spec),
+        "graph": {"nodes": len(core.REGISTRY.nodes), "edges": len(core.REGISTRY.edges)},
+        "timings": timings,
+        "peak_kib": peaks,
+        "sizes": sizes,
+    }
+
+def run_layout_case(spec: SynthSpec, repeat: int = 3) -> Dict[str, Any]:
+    """布局基准：build_registry 直接建图，分别计时 layout() 与 render_svg()；结果格式同 run_case。"""
+    reg = build_registry(spec)
+    reg.resolve_all()
+    samples: Dict[str, List[float]] = {"layout": [], "svg": []}
+    sizes: Dict[str, int] = {}
+    crossings = 0
+    for _ in range(repeat):
+        gc.collect()
+        t0 = time.perf_counter()
+        lay = layout.layout(None, reg=reg)
+        t1 = time.perf_counter()
+        svg = layout.render_svg(lay)
+        t2 = time.perf_counter()
+        samples["layout"].append(t1 - t0)
+        samples["svg"].append(t2 - t1)
+        sizes["svg"] = len(svg.encode("utf-8"))
+        crossings = lay.crossings
+    return {
+        "params": asdict(spec),
+        "graph": {"nodes": len(reg.nodes), "edges": len(reg.edges), "crossings": crossings},
+        "timings": {name: {"min": min(v), "median": statistics.median(v)} for name, v in samples.items()},
+        "peak_kib": {},
+        "sizes": sizes,
+    }
+
+def run_suite(cases: Dict[str, SynthSpec], workdir: Path, repeat: int = 5,
+              memory: bool = True, log: Optional[Callable[[str], None]] = print,
+              layout_cases: Optional[Dict[str, SynthSpec]] = None) -> Dict[str, Any]:
+    results: Dict[str, Any] = {
+        "meta": {
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "repeat": repeat,
+        },
+        "cases": {},
+    }
+    for name, spec in cases.items():
+        if log: log(f"[bench] {name}: {spec.nodes} nodes ...")
+        results["cases"][name] = run_case(spec, workdir, repeat=repeat, memory=memory)
+    for name, spec in (layout_cases or {}).items():
+        if log: log(f"[bench] {name}: layout of {spec.nodes} nodes ...")
+        results["cases"][name] = run_layout_case(spec, repeat=min(repeat, 3))
+    return results
+
+# ---------- 比较 ----------
+def compare(current: Dict[str, Any], baseline: Dict[str, Any],
+            threshold: float = 1.25, stat: str = "min") -> List[Dict[str, Any]]:
+    """
+    逐 case/阶段比较耗时，返回行列表；ratio = 当前 / 基线，
+    ratio > threshold 的行 regressed=True。双方缺失的 case/阶段会被跳过。
+    """
+    rows = []
+    for case, cur in current.get("cases", {}).items():
+        base = baseline.get("cases", {}).get(case)
+        if not base:
+            continue
+        for ph, t in cur["timings"].items():
+            bt = base.get("timings", {}).get(ph)
+            if not bt or not bt.get(stat):
+                continue
+            ratio = t[stat] / bt[stat]
+            rows.append({
+                "case": case, "phase": ph, "baseline": bt[stat], "current": t[stat],
+                "ratio": ratio, "regressed": ratio > threshold,
+            })
+    return rows
@@ -0,0 +1,199 @@
+# benchmarks/synth.py
+"""
+可复现（固定 seed）的合成图模块生成器：输出一份与手写图模块同构的 .py 源码，
+即嵌套 class + @Kind 装饰器 + `+___.A.B` / `+supports.X` 等关系语句。
+"""
+from __future__ import annotations
+import hashlib, json, random
+from dataclasses import dataclass, field, asdict
+from pathlib import Path
+from typing import Dict, List, Optional
+
+# kind -> ibmm 中的装饰器名
+KIND_DECORATORS = {
+    "topic": "Topic", "title": "Title", "node": "NodeKind", "note": "Note", "question": "Question",
+    "issue": "Issue", "position": "Position", "pro": "Pro", "con": "Con",
+}
+
+DEFAULT_KIND_MIX = {
+    "topic": 2, "title": 3, "node": 2, "note": 1,
+    "issue": 1, "position": 2, "pro": 2, "con": 2,
+}
+
+_WORDS = (
+    "data portal open source policy risk cost trust ecosystem security compliance "
+    "adoption api catalog ingestion strategy vision 开放 数据 门户 生态 合规 风险 成本 "
+    "安全 战略 协作 透明 标准化 治理 路线图"
+).split()
+
+@dataclass
+class SynthSpec:
+    nodes: int = 500            # 节点总数
+    depth: int = 4              # 最大嵌套深度（根为 1）
+    fanout: int = 5             # 每个节点的最大子节点数
+    rel_density: float = 0.2    # 每个节点带一条显式关系语句的概率
+    doc_chars: int = 40         # 每个 docstring 的大致字符数（0=无 docstring）
+    kind_mix: Dict[str, int] = field(default_factory=lambda: dict(DEFAULT_KIND_MIX))
+    seed: int = 1
+
+    def key(self) -> str:
+        """参数指纹（用于生成稳定的模块名）。"""
+        raw = json.dumps(asdict(self), sort_keys=True).encode("utf-8")
+        return hashlib.sha1(raw).hexdigest()[:10]
+
+    def module_name(self) -> str:
+        return f"_ibmm_synth_{self.key()}"
+
+@dataclass
+class _SNode:
+    idx: int
+    parent: Optional[int]
+    depth: int
+    kind: str
+    children: List[int] = field(default_factory=list)
+
+def _build_tree(spec: SynthSpec, rng: random.Random) -> List[_SNode]:
+    """广度优先填充：当前父节点满 fanout 后换下一个；没有可挂的父节点时新开一个根。"""
+    kinds = list(spec.kind_mix)
+    weights = [spec.kind_mix[k] for k in kinds]
+    out: List[_SNode] = []
+    open_parents: List[int] = []
+    head = 0
+    for i in range(spec.nodes):
+        kind = rng.choices(kinds, weights)[0]
+        while head < len(open_parents) and len(out[open_parents[head]].children) >= spec.fanout:
+            head += 1
+        if head < len(open_parents):
+            p = out[open_parents[head]]
+            n = _SNode(i, p.idx, p.depth + 1, kind)
+            p.children.append(i)
+        else:
+            n = _SNode(i, None, 1, kind)
+        out.append(n)
+        if n.depth < spec.depth:
+            open_parents.append(i)
+    return out
+
+def _docstring(rng: random.Random, size: int) -> str:
+    words: List[str] = []
+    total = 0
+    while total < size:
+        w = rng.choice(_WORDS)
+        words.append(w)
+        total += len(w) + 1
+    # 每 8 个词一行，覆盖多行 docstring 的处理路径
+    return "\n".join(" ".join(words[i:i + 8]) for i in range(0, len(words), 8))
+
+def generate_source(spec: SynthSpec) -> str:
+    """生成图模块源码。"""
+    rng = random.Random(spec.seed)
+    tree = _build_tree(spec, rng)
+
+    paths: List[str] = []
+    for n in tree:
+        name = f"N{n.idx}"
+        paths.append(name if n.parent is None else f"{paths[n.parent]}.{name}")
+    by_kind: Dict[str, List[int]] = {}
+    for n in tree:
+        by_kind.setdefault(n.kind, []).append(n.idx)
+
+    def relation(n: _SNode) -> Optional[str]:
+        if rng.random() >= spec.rel_density:
+            return None
+        # 语义关系只在合法的 kind 组合上生成，其余用中性 relates
+        if n.kind == "pro" and by_kind.get("position"):
+            return f"+supports.{paths[rng.choice(by_kind['position'])]}"
+        if n.kind == "con" and by_kind.get("position"):
+            return f"+opposes.{paths[rng.choice(by_kind['position'])]}"
+        if n.kind == "position" and by_kind.get("issue"):
+            return f"+answers.{paths[rng.choice(by_kind['issue'])]}"
+        dst = rng.randrange(len(tree))
+        if dst == n.idx:
+            return None
+        if rng.random() < 0.3:
+            return f'+___("rel {n.idx}").{paths[dst]}'
+        return f"+___.{paths[dst]}"
+
+    used = sorted({KIND_DECORATORS[n.kind] for n in tree})
+    lines = [
+        f"# generated by benchmarks.synth: {json.dumps(asdict(spec), sort_keys=True)}",
+        f"from ibmm import ___, supports, opposes, answers, {', '.join(used)}",
+        "",
+    ]
+
+    def emit(n: _SNode, indent: str):
+        deco = KIND_DECORATORS[n.kind]
+        lines.append(f'{indent}@{deco}("{n.kind} {n.idx}")')
+        lines.append(f"{indent}class N{n.idx}:")
+        body = indent + "    "
+        has_body = False
+        if spec.doc_chars > 0:
+            doc = _docstring(rng, spec.doc_chars).replace("\n", "\n" + body)
+            lines.append(f'{body}"""{doc}"""')
+            has_body = True
+        rel = relation(n)
+        if rel:
+            lines.append(f"{body}{rel}")
+            has_body = True
+        for c in n.children:
+            emit(tree[c], body)
+            has_body = True
+        if not has_body:
+            lines.append(f"{body}pass")
+
+    for n in tree:
+        if n.parent is None:
+            emit(n, "")
+            lines.append("")
+    return "\n".join(lines) + "\n"
+
+def synth_records(spec: SynthSpec):
+    """同一份合成树的数据形式：(节点 dict 列表, (src, dst, rel[, label]) 列表)，供 bulk_add 使用。"""
+    rng = random.Random(spec.seed)
+    tree = _build_tree(spec, rng)
+    paths: List[str] = []
+    for n in tree:
+        paths.append(f"N{n.idx}" if n.parent is None else f"{paths[n.parent]}.N{n.idx}")
+    by_kind: Dict[str, List[int]] = {}
+    for n in tree:
+        by_kind.setdefault(n.kind, []).append(n.idx)
+    # 与 generate_source 相同的关系分布与随机数消耗顺序（先序遍历，每个节点先 docstring 再关系），
+    # 因此两条路径得到同一张图
+    semantic = {"pro": ("supports", "position"), "con": ("opposes", "position"), "position": ("answers", "issue")}
+    nodes, edges = [], []
+    stack = [n.idx for n in reversed(tree) if n.parent is None]
+    while stack:
+        n = tree[stack.pop()]
+        stack.extend(reversed(n.children))
+        nodes.append({"id": paths[n.idx], "kind": n.kind, "title": f"{n.kind} {n.idx}",
+                      "text": _docstring(rng, spec.doc_chars) if spec.doc_chars > 0 else ""})
+        if rng.random() >= spec.rel_density:
+            continue
+        rel, target_kind = semantic.get(n.kind, ("relates", None))
+        if target_kind and by_kind.get(target_kind):
+            edges.append((paths[n.idx], paths[rng.choice(by_kind[target_kind])], rel))
+            continue
+        dst = rng.randrange(len(tree))
+        if dst != n.idx:
+            edges.append((paths[n.idx], paths[dst], "relates", f"rel {n.idx}" if rng.random() < 0.3 else None))
+    return nodes, edges
+
+def build_registry(spec: SynthSpec, reg=None):
+    """
+    不经过源码/导入，用 Registry.bulk_add 直接建图（节点 id 即嵌套 qualname），
+    用于 import 代价过高的规模（如 1 万节点的布局基准）。
+    """
+    from ibmm.core import Registry
+    reg = reg if reg is not None else Registry()
+    reg.bulk_add(*synth_records(spec))
+    return reg
+
+def write_module(spec: SynthSpec, directory: Path) -> str:
+    """把生成的模块写入 directory，返回可 import 的模块名（内容不变时不重写）。"""
+    directory.mkdir(parents=True, exist_ok=True)
+    name = spec.module_name()
+    path = directory / f"{name}.py"
+    src = generate_source(spec)
+    if not path.exists() or path.read_text(encoding="utf-8") != src:
+        path.write_text(src, encoding="utf-8")
+    return name
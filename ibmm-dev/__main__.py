@@ -1,265 +1,141 @@
 # ibmm-dev/__main__.pys
 from __future__ import annotations
-import sys, os, time, webbrowser
+import sys, os, time, webbrowser, queue
 import argparse
-import shlex
 from http.server import SimpleHTTPRequestHandler, ThreadingHTTPServer
 from functools import partial
-from urllib.parse import urlparse, quote_plus
-import urllib.parse
-import subprocess
+from urllib.parse import urlparse
 from pathlib import Path
 import importlib
-from string import Template
+
+from .paths import resolve_layout, to_module
+from .app import DevApp, Response
 
 HOST = os.environ.get("IBMM_DEV_HOST", "127.0.0.1")
 PORT = int(os.environ.get("IBMM_DEV_PORT", "8765"))
 PROJECT_ROOT = os.getcwd()
 
-# ----------------- 工具 -----------------
-def common_docroot(paths):
-    """返回多个路径的公共上层目录 Path."""
-    paths = [str(Path(p).resolve()) for p in paths]
-    return Path(os.path.commonpath(paths))
-
-def list_py_files(root: Path) -> list[Path]:
-    """递归列出 root 下的所有 .py（排除 __pycache__、隐藏目录）。"""
-    items = []
-    for p in root.rglob("*.py"):
-        if "__pycache__" in p.parts:
-            continue
-        items.append(p)
-    return sorted(items)
-
-def compute_sig_for_dirs(dirs: list[Path], extra_files: list[Path] | None = None) -> int:
-    """聚合多个目录/文件的 mtime_ns 作为变化签名。"""
-    sig = 0
-    for d in dirs:
-        if d.is_file():
-            try: sig ^= d.stat().st_mtime_ns
-            except FileNotFoundError: pass
-            continue
-        if not d.exists():
-            continue
-        for p in d.rglob("*.py"):
-            if "__pycache__" in p.parts:
-                continue
-            try: sig ^= p.stat().st_mtime_ns
-            except FileNotFoundError: pass
-    if extra_files:
-        for f in extra_files:
-            try: sig ^= f.stat().st_mtime_ns
-            except FileNotFoundError: pass
-    return sig
+# ----------------- Handler -----------------
+class DevHandler(SimpleHTTPRequestHandler):
+    """静态文件 + /events(SSE) + /list(动态生成) + /search(全文检索) + /render(服务端渲染) + /metrics"""
+    # HTTP/1.1 keep-alive：除 SSE 外的响应都带 Content-Length；空闲连接 30s 后关闭
+    protocol_version = "HTTP/1.1"
+    timeout = 30
 
-def to_module(docroot: Path, file_path: Path) -> str | None:
-    """
-    将文件路径转为可用于 import 的模块名（基于 docroot）。
-    若 file 不在 docroot 下，则返回 None。
-    """
-    try:
-        rel = file_path.resolve().relative_to(docroot.resolve())
-    except ValueError:
-        return None
-    mod = str(rel).replace(os.sep, ".")
-    if mod.endswith(".py"): mod = mod[:-3]
-    return mod
+    def send_response(self, code, message=None):
+        self._status = code
+        super().send_response(code, message)
 
-# ----------------- Handler -----------------
-LIST_HTML = Template("""<!doctype html>
-<html>
-<head>
-<meta charset="utf-8"/>
-<meta name="viewport" content="width=device-width,initial-scale=1"/>
-<title>ibmm-dev · graphs</title>
-<style>
-  body{margin:0;font:14px/1.5 system-ui,-apple-system,Segoe UI,Roboto,Helvetica,Arial;}
-  header{padding:10px 14px;background:#0f172a;color:#e2e8f0;display:flex;gap:12px;align-items:center;}
-  header b{color:#fff;}
-  main{padding:16px;}
-  ul{list-style:none;margin:0;padding:0;}
-  li{padding:8px 10px;border-bottom:1px solid #e5e7eb;display:flex;gap:10px;align-items:center;}
-  code{background:#f3f4f6;padding:2px 6px;border-radius:6px;}
-  a{color:#2563eb;text-decoration:none;}
-  a:hover{text-decoration:underline;}
-  .small{color:#64748b;font-size:12px;}
-</style>
-</head>
-<body>
-<header>
-  <b>ibmm-dev</b>
-  <span>&nbsp;· listing <code>$list_root</code></span>
-  <span style="flex:1"></span>
-  <a href="/" style="color:#e2e8f0">open index.html</a>
-</header>
-<main>
-  <p class="small">点击任意条目将打开 <code>/index.html?graph=&lt;module&gt;</code> 进行渲染。</p>
-  <ul>
-    $items
-  </ul>
-</main>
-<script>
-  // 热刷新（可选）：若服务器支持 /events，自动刷新
-  try {
-    const es = new EventSource("/events");
-    es.onmessage = () => location.reload();
-  } catch (e) {}
-</script>
-</body>
-</html>
-""")
+    def do_HEAD(self):
+        self._observed(self._do_HEAD)
 
-class DevHandler(SimpleHTTPRequestHandler):
-    """静态文件 + /events(SSE) + /list(动态生成)"""
     def do_GET(self):
-        parsed = urlparse(self.path)
-        path = parsed.path
+        self._observed(self._do_GET)
 
-        # ---- 1) SSE ----
-        if path == "/events":
-            self.send_response(200)
-            self.send_header("Content-Type", "text/event-stream")
-            self.send_header("Cache-Control", "no-cache")
-            self.send_header("Connection", "keep-alive")
-            self.end_headers()
-            last = compute_sig_for_dirs(
-                [self.server.watch_root, self.server.ibmm_pkg_dir],
-                [self.server.index_html] if self.server.index_html else None
-            )
-            idle = 0
-            try:
-                while True:
-                    time.sleep(0.5)
-                    cur = compute_sig_for_dirs(
-                        [self.server.watch_root, self.server.ibmm_pkg_dir],
-                        [self.server.index_html] if self.server.index_html else None
-                    )
-                    if cur != last:
-                        self.wfile.write(b"data: reload\n\n")
-                        self.wfile.flush()
-                        last = cur
-                        idle = 0
-                        continue
-                    idle += 1
-                    if idle >= 30:
-                        self.wfile.write(b": keep-alive\n\n")
-                        self.wfile.flush()
-                        idle = 0
-            except (BrokenPipeError, ConnectionResetError):
-                pass
-            return
-
-        # ---- 2) /list ----
-        if path == "/list":
-            root = self.server.watch_root
-            docroot = Path(self.directory)
-            items_html = []
-            for py in list_py_files(root):
-                if py.name == "__init__.py":
-                    continue
-                mod = to_module(docroot, py)
-                if not mod:
-                    # 不在 docroot 下，跳过（正常不会发生）
-                    continue
-                href = f"/?graph={quote_plus(mod)}"
-                rel_show = str(py.relative_to(root))
-                items_html.append(
-                    f'<li><a href="{href}">{mod}</a>'
-                    f'<span class="small">&nbsp;&nbsp;(<code>{rel_show}</code>)</span></li>'
-                )
-            html = LIST_HTML.substitute(
-                list_root=str(root),
-                items="\n    ".join(items_html) or "<li><i>no .py files found</i></li>",
-            )
-            self.send_response(200)
-            self.send_header("Content-Type", "text/html; charset=utf-8")
-            self.send_header("Cache-Control", "no-store")
-            self.end_headers()
-            self.wfile.write(html.encode("utf-8"))
-            return
+    def _observed(self, handler):
+        """计时并按路由记录到 /metrics。"""
+        self._status = 0
+        t0 = time.perf_counter()
+        try:
+            handler()
+        finally:
+            self.server.app.observe_request(urlparse(self.path).path, self.command, self._status,
+                                            time.perf_counter() - t0)
 
-        # 截获 /edit/... ，其他路径走原逻辑
-        if self.path.startswith("/edit/"):
-            self._handle_edit()
-            return
-        # ---- 3) 其他：静态 ----
-        return super().do_GET()
+    def _do_HEAD(self):
+        if not self._serve_static(head_only=True):
+            super().do_HEAD()
 
-    def _handle_edit(self):
-        # /edit/{src_path}:{line_num}
-        parsed = urllib.parse.urlsplit(self.path)
-        raw = urllib.parse.unquote(parsed.path[len("/edit/"):])
+    def _do_GET(self):
+        app: DevApp = self.server.app
+        parsed = urlparse(self.path)
 
-        # 只按“最后一个冒号”分割，避免路径中出现冒号（例如未来扩展）
-        if ":" not in raw:
-            self._send_text(400, f"Bad edit target: {raw}")
+        # ---- 1) SSE ----
+        if parsed.path == "/events":
+            self._serve_events(app)
             return
-        src_str, line_str = raw.rsplit(":", 1)
 
-        try:
-            line_no = int(line_str)
-        except ValueError:
-            self._send_text(400, f"Invalid line number: {line_str}")
+        # ---- 2) 动态路由：/list /search /render /nodes /metrics /edit/... ----
+        resp = app.route(parsed.path, parsed.query)
+        if resp is not None:
+            self._send(resp)
             return
 
-        # 允许绝对路径；相对路径相对于项目根
-        if os.path.isabs(src_str):
-            fs_path = src_str
-        else:
-            fs_path = os.path.abspath(os.path.join(PROJECT_ROOT, src_str))
+        # ---- 3) 其他：静态（内存缓存 + ETag + 预压缩），目录列表/超大文件走原逻辑 ----
+        if not self._serve_static():
+            return super().do_GET()
 
-        # 简单防护：必须在项目目录内
+    def _serve_events(self, app: DevApp):
+        self.send_response(200)
+        for k, v in app.SSE_HEADERS.items():
+            self.send_header(k, v)
+        self.send_header("Connection", "keep-alive")
+        self.end_headers()
+        self.close_connection = True   # 流结束即断开，不复用
+        # 共享监听线程负责扫描与去抖，这里只等待事件
+        q = app.watcher.subscribe()
+        app.sse_opened()
         try:
-            common = os.path.commonpath([PROJECT_ROOT, os.path.abspath(fs_path)])
-        except ValueError:
-            common = ""  # 不同盘符等情况
-        if common != PROJECT_ROOT:
-            self._send_text(403, f"Forbidden path: {fs_path}")
-            return
-
-        if not os.path.exists(fs_path):
-            self._send_text(404, f"File not found: {fs_path}")
-            return
+            while True:
+                try:
+                    ev = q.get(timeout=15)
+                except queue.Empty:
+                    self.wfile.write(app.SSE_KEEPALIVE)
+                    self.wfile.flush()
+                    continue
+                self.wfile.write(app.sse_message(ev))
+                self.wfile.flush()
+        except (BrokenPipeError, ConnectionResetError):
+            pass
+        finally:
+            app.watcher.unsubscribe(q)
+            app.sse_closed()
 
-        # 执行 'EDITOR path:line'
-        editor_cmd = self.server.editor_cmd
-        cmd = shlex.split(editor_cmd) + [f"{fs_path}:{line_no}"]
-        try:
-            subprocess.Popen(cmd)  # 非阻塞
-        except FileNotFoundError:
-            # subl 不存在时给出清晰提示
-            self._send_text(500, f"Editor command not found: '{editor_cmd}'. Check your config or PATH.")
-            return
-        except Exception as e:
-            self._send_text(500, f"Failed to launch editor '{editor_cmd}': {e}")
-            return
+    def _serve_static(self, head_only: bool = False) -> bool:
+        """能从表示缓存提供则返回 True；其余（目录列表、重定向、超大文件、404）交给父类。"""
+        kind, fs_path = self.server.app.static_file(urlparse(self.path).path)
+        if kind != "file":
+            return False
+        ctype = self.guess_type(fs_path)
+        rep = self.server.app.rep_cache.for_file(fs_path, ctype)
+        self._send_negotiated(rep, ctype, DevApp.static_cache_control(urlparse(self.path).path),
+                              head_only=head_only)
+        return True
 
-        # 成功：可以 204，无内容
-        self.send_response(204)
+    def _send_negotiated(self, rep, ctype: str, cache_control: str = "no-cache", head_only: bool = False):
+        status, headers, body = DevApp.negotiate(
+            rep, ctype, self.headers.get("If-None-Match"), self.headers.get("Accept-Encoding"),
+            cache_control)
+        self.send_response(status)
+        for k, v in headers:
+            self.send_header(k, v)
         self.end_headers()
+        if body and not head_only:
+            self.wfile.write(body)
 
-    def _send_text(self, code: int, msg: str):
-        data = msg.encode("utf-8")
-        self.send_response(code)
-        self.send_header("Content-Type", "text/plain; charset=utf-8")
-        self.send_header("Content-Length", str(len(data)))
+    def _send(self, resp: Response):
+        rep = self.server.app.representation(resp)
+        if rep is not None:
+            self._send_negotiated(rep, resp.ctype, resp.headers.get("Cache-Control", "no-cache"))
+            return
+        self.send_response(resp.status)
+        if resp.body or resp.status != 204:
+            self.send_header("Content-Type", resp.ctype)
+        for k, v in resp.headers.items():
+            self.send_header(k, v)
+        self.send_header("Content-Length", str(len(resp.body)))
         self.end_headers()
-        self.wfile.write(data)
+        self.wfile.write(resp.body)
 
 class DevHTTPServer(ThreadingHTTPServer):
     daemon_threads = True
-    def __init__(self, server_address, RequestHandlerClass,
-                 docroot: Path, watch_root: Path, ibmm_pkg_dir: Path, index_html: Path | None,
-                 editor_cmd: str):
+    def __init__(self, server_address, RequestHandlerClass, app: DevApp):
         super().__init__(server_address, RequestHandlerClass)
-        self.docroot = docroot
-        self.watch_root = watch_root
-        self.ibmm_pkg_dir = ibmm_pkg_dir
-        self.index_html = index_html
-        self.editor_cmd = editor_cmd
+        self.app = app
 
 # ----------------- 启动逻辑 -----------------
-def run(entry: str | None, editor_cmd: str):
+def run(entry: str | None, editor_cmd: str, workers: int = 2, use_async: bool = False,
+        profile: bool = False):
     """
     entry:
       - None           : 遍历 ./graphs
@@ -274,43 +150,22 @@ def run(entry: str | None, editor_cmd: str):
         raise
     ibmm_pkg_dir = Path(ibmm.__file__).resolve().parent
 
-    # 2) 解析参数
-    watch_root: Path
-    graph_file: Path | None = None
-    if not entry:
-        # 无参：默认遍历 ./graphs
-        watch_root = Path("graphs").resolve()
-    else:
-        p = Path(entry).resolve()
-        if p.is_dir():
-            watch_root = p
-        elif p.is_file():
-            graph_file = p
-            watch_root = p.parent
-        else:
-            print(f"[ibmm-dev] path not found: {p}")
-            sys.exit(1)
-
-    # 3) 选静态根目录（docroot）：需要覆盖 index.html、ibmm 包目录、watch_root
-    #    若 index.html 位于 watch_root，则优先用它所在目录作为 docroot；
-    #    否则取三者的公共上层目录
-    idx_candidate = watch_root / "index.html"
-    if idx_candidate.exists():
-        docroot = watch_root
-        index_html = idx_candidate
-    else:
-        docroot = common_docroot([watch_root, ibmm_pkg_dir.parent])
-        idx = docroot / "index.html"
-        index_html = idx if idx.exists() else None
+    # 2) 解析参数 + 3) 选静态根目录（docroot）
+    try:
+        watch_root, graph_file, docroot, index_html = resolve_layout(entry, ibmm_pkg_dir)
+    except FileNotFoundError as e:
+        print(f"[ibmm-dev] path not found: {e}")
+        sys.exit(1)
 
-    # 4) 启动服务器（纯静态 + /events + /list）
-    handler_cls = partial(DevHandler, directory=str(docroot))
-    httpd = DevHTTPServer((HOST, PORT), handler_cls,
-                          docroot=docroot,
-                          watch_root=watch_root,
-                          ibmm_pkg_dir=ibmm_pkg_dir,
-                          index_html=index_html,
-                          editor_cmd=editor_cmd)
+    # 4) 启动服务器（静态 + /events + /list + /search + /render）
+    app = DevApp(docroot=docroot,
+                 watch_root=watch_root,
+                 ibmm_pkg_dir=ibmm_pkg_dir,
+                 index_html=index_html,
+                 editor_cmd=editor_cmd,
+                 project_root=PROJECT_ROOT,
+                 workers=workers,
+                 profile=profile)
 
     url_root = f"http://{HOST}:{PORT}"
     url_list = f"{url_root}/list"
@@ -331,6 +186,13 @@ def run(entry: str | None, editor_cmd: str):
 
     print(f"[ibmm-dev] list   : {url_list}")
     print("[ibmm-dev] SSE    : /events  (auto-reload)")
+    print(f"[ibmm-dev] server : {'asyncio (single event loop)' if use_async else 'threaded'}")
+    print("[ibmm-dev] metrics: /metrics  (Prometheus text; ?format=json)")
+    if profile:
+        print("[ibmm-dev] profile: /debug/profile?graph=<module>&view=flowchart|mindmap&top=40&sort=cumulative")
+    print("[ibmm-dev] search : /search?graph=<module>&q=<query>")
+    print("[ibmm-dev] render : /render?graph=<module>&view=flowchart|mindmap&subgraphs=..."
+          f"  ({f'{workers} worker processes' if workers > 0 else 'in-process'})")
 
     # 打开浏览器到 /list
     try:
@@ -339,11 +201,30 @@ def run(entry: str | None, editor_cmd: str):
         pass
 
     try:
-        httpd.serve_forever()
+        if use_async:
+            from .aserver import serve
+            serve(app, HOST, PORT)
+        else:
+            handler_cls = partial(DevHandler, directory=str(docroot))
+            httpd = DevHTTPServer((HOST, PORT), handler_cls, app)
+            try:
+                httpd.serve_forever()
+            finally:
+                httpd.server_close()
     except KeyboardInterrupt:
         print("\n[ibmm-dev] bye.")
+    finally:
+        app.close()
 
 if __name__ == "__main__":
+    # 子命令：python -m ibmm-dev build <dir> -o site/ -j N [--watch]
+    if sys.argv[1:2] == ["build"]:
+        from .build import main as build_main
+        sys.exit(build_main(sys.argv[2:]))
+    # 子命令：python -m ibmm-dev bundle <dir> [-o <docroot>/bundles]
+    if sys.argv[1:2] == ["bundle"]:
+        from .bundle import main as bundle_main
+        sys.exit(bundle_main(sys.argv[2:]))
     parser = argparse.ArgumentParser(description="ibmm-dev server")
     parser.add_argument(
         "entry",
@@ -356,5 +237,22 @@ if __name__ == "__main__":
         default="subl",
         help="Editor command to open files (e.g., 'code -g', 'subl'). Default: 'subl'",
     )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=2,
+        help="Render worker processes for /render, /nodes, /search (0 = build in the server process). Default: 2",
+    )
+    parser.add_argument(
+        "--async",
+        dest="use_async",
+        action="store_true",
+        help="Serve everything from a single asyncio event loop instead of a thread per connection",
+    )
+    parser.add_argument(
+        "--profile",
+        action="store_true",
+        help="Enable /debug/profile?graph=... (cProfile'd build + render, top functions by cumulative time)",
+    )
     args = parser.parse_args()
-    run(args.entry, args.editor)
+    run(args.entry, args.editor, args.workers, args.use_async, args.profile)
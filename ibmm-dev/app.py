@@ -0,0 +1,562 @@
+# ibmm-dev/app.py
+"""
+与具体服务器实现无关的应用层：服务器状态（监听、渲染后端、缓存）+ 各路由的处理逻辑。
+线程版 DevHandler（__main__）与 asyncio 版（aserver）都只是把 HTTP 请求适配到这里。
+"""
+from __future__ import annotations
+import json, mimetypes, os, posixpath, shlex, subprocess, sys, threading, time, traceback
+import urllib.parse
+from dataclasses import dataclass, field
+from html import escape as html_escape
+from pathlib import Path
+from string import Template
+from typing import Dict, List, Optional, Tuple
+from urllib.parse import quote_plus
+
+from .bundle import BUNDLE_NAME, IMMUTABLE, BundleCache
+from .deps import DependencyIndex
+from .httpcache import RepresentationCache, Representation, choose_encoding, etag_matches
+from .listing import GraphListing
+from .metrics import Metrics
+from .pool import RenderPool
+from .render import PROFILE_SORTS, VIEWS, InProcessRenderer, RenderCache
+from .watcher import FileWatcher
+
+# 超过此大小的静态文件不进内存缓存
+MAX_CACHED_FILE = 8 * 1024 * 1024
+
+@dataclass
+class Response:
+    status: int
+    body: bytes = b""
+    ctype: str = "text/plain; charset=utf-8"
+    headers: Dict[str, str] = field(default_factory=dict)
+
+def text_response(status: int, msg: str) -> Response:
+    return Response(status, msg.encode("utf-8"))
+
+def error_response(what: str, e: BaseException) -> Response:
+    """500：完整 traceback 只写服务器日志（stderr）；响应体只有 "类型: 消息"，不暴露本机路径与源码。"""
+    print(f"[ibmm-dev] {what} failed:", file=sys.stderr)
+    traceback.print_exception(type(e), e, e.__traceback__)
+    return text_response(500, f"{type(e).__name__}: {e}")
+
+def json_response(status: int, obj) -> Response:
+    return Response(status, json.dumps(obj, ensure_ascii=False).encode("utf-8"),
+                    "application/json; charset=utf-8")
+
+def format_stats(st: dict | None) -> str:
+    """/list 条目右侧的统计摘要（HTML）。"""
+    if st is None:
+        return '<span class="small pending">…</span>'
+    if "error" in st:
+        return f'<span class="err">{html_escape(st["error"])}</span>'
+    kinds = ", ".join(f"{k} {v}" for k, v in st["kinds"].items())
+    built = time.strftime("%H:%M:%S", time.localtime(st["built_at"]))
+    return (f'{st["nodes"]} nodes · {st["edges"]} edges'
+            f'<span class="small"> · {html_escape(kinds)} · built {built} ({st["build_ms"]:.0f} ms)</span>')
+
+LIST_HTML = Template("""<!doctype html>
+<html>
+<head>
+<meta charset="utf-8"/>
+<meta name="viewport" content="width=device-width,initial-scale=1"/>
+<title>ibmm-dev · graphs</title>
+<style>
+  body{margin:0;font:14px/1.5 system-ui,-apple-system,Segoe UI,Roboto,Helvetica,Arial;}
+  header{padding:10px 14px;background:#0f172a;color:#e2e8f0;display:flex;gap:12px;align-items:center;}
+  header b{color:#fff;}
+  main{padding:16px;}
+  ul{list-style:none;margin:0;padding:0;}
+  li{padding:8px 10px;border-bottom:1px solid #e5e7eb;display:flex;gap:10px;align-items:center;}
+  code{background:#f3f4f6;padding:2px 6px;border-radius:6px;}
+  a{color:#2563eb;text-decoration:none;}
+  a:hover{text-decoration:underline;}
+  .small{color:#64748b;font-size:12px;}
+  .stats{margin-left:auto;text-align:right;}
+  .err{color:#dc2626;font-size:12px;}
+</style>
+</head>
+<body>
+<header>
+  <b>ibmm-dev</b>
+  <span>&nbsp;· listing <code>$list_root</code></span>
+  <span style="flex:1"></span>
+  <a href="/" style="color:#e2e8f0">open index.html</a>
+</header>
+<main>
+  <p class="small">点击任意条目将打开 <code>/index.html?graph=&lt;module&gt;</code> 进行渲染。</p>
+  <ul>
+    $items
+  </ul>
+</main>
+<script>
+  // 统计在后台计算：仍有未完成条目时轮询 JSON 并就地更新
+  function fmt(st) {
+    if (!st) return '<span class="small pending">…</span>';
+    const esc = (s) => String(s).replace(/[&<>"]/g, c => ({"&":"&amp;","<":"&lt;",">":"&gt;",'"':"&quot;"}[c]));
+    if (st.error) return `<span class="err">$${esc(st.error)}</span>`;
+    const kinds = Object.entries(st.kinds).map(([k, v]) => `$${k} $${v}`).join(", ");
+    const built = new Date(st.built_at * 1000).toTimeString().slice(0, 8);
+    return `$${st.nodes} nodes · $${st.edges} edges<span class="small"> · $${esc(kinds)} · built $${built} ($${Math.round(st.build_ms)} ms)</span>`;
+  }
+  async function poll() {
+    try {
+      const data = await (await fetch("/list?format=json")).json();
+      for (const g of data.graphs) {
+        const el = document.querySelector(`.stats[data-mod="$${CSS.escape(g.module)}"]`);
+        if (el) el.innerHTML = fmt(g.stats);
+      }
+      if (data.pending > 0) setTimeout(poll, 1000);
+    } catch (e) {}
+  }
+  if (document.querySelector(".stats .pending")) setTimeout(poll, 500);
+
+  // 热刷新（可选）：增删文件时整页刷新；仅内容改动时只重新拉取统计
+  try {
+    const es = new EventSource("/events");
+    es.onmessage = (ev) => {
+      let msg;
+      try { msg = JSON.parse(ev.data); } catch (e) { return location.reload(); }
+      if (msg.full || msg.added.length || msg.removed.length) return location.reload();
+      setTimeout(poll, 500);
+    };
+  } catch (e) {}
+</script>
+</body>
+</html>
+""")
+
+def format_profile(r: dict) -> str:
+    """/debug/profile 的纯文本报告（列与 pstats 相同）。"""
+    cwd = os.getcwd() + os.sep
+    lines = [
+        f"graph {r['graph']}  view {r['view']}  sorted by {r['sort']}",
+        f"build {r['build_ms']:.1f} ms  export {r['export_ms']:.1f} ms  "
+        f"{r['calls']} calls  output {r['output_bytes']} bytes",
+        "",
+        f"{'ncalls':>14} {'tottime':>9} {'cumtime':>9}  filename:lineno(function)",
+    ]
+    for f in r["functions"]:
+        calls = str(f["ncalls"]) if f["ncalls"] == f["primcalls"] else f"{f['ncalls']}/{f['primcalls']}"
+        where = f["file"][len(cwd):] if f["file"].startswith(cwd) else f["file"]
+        lines.append(f"{calls:>14} {f['tottime']:>9.4f} {f['cumtime']:>9.4f}  {where}:{f['line']}({f['function']})")
+    return "\n".join(lines) + "\n"
+
+def translate_path(directory: str, url_path: str) -> str:
+    """URL 路径 -> docroot 下的文件系统路径（与 SimpleHTTPRequestHandler.translate_path 相同规则）。"""
+    path = url_path.split("?", 1)[0].split("#", 1)[0]
+    trailing_slash = path.rstrip().endswith("/")
+    try:
+        path = urllib.parse.unquote(path, errors="surrogatepass")
+    except UnicodeDecodeError:
+        path = urllib.parse.unquote(path)
+    path = posixpath.normpath(path)
+    out = directory
+    for word in filter(None, path.split("/")):
+        if os.path.dirname(word) or word in (os.curdir, os.pardir):
+            continue
+        out = os.path.join(out, word)
+    if trailing_slash:
+        out += "/"
+    return out
+
+def guess_type(path: str) -> str:
+    return mimetypes.guess_type(path)[0] or "application/octet-stream"
+
+class DevApp:
+    """一个 ibmm-dev 实例的全部状态；线程安全，可被多个请求并发调用。"""
+    def __init__(self, docroot: Path, watch_root: Path, ibmm_pkg_dir: Path, index_html: Path | None,
+                 editor_cmd: str, project_root: str, workers: int = 2, profile: bool = False):
+        self.docroot = docroot
+        self.watch_root = watch_root
+        self.ibmm_pkg_dir = ibmm_pkg_dir
+        self._ibmm_dir = ibmm_pkg_dir.resolve()
+        self.index_html = index_html
+        self.editor_cmd = editor_cmd
+        self.project_root = project_root
+        self.profile_enabled = profile   # /debug/profile 需显式开启（--profile）
+        self.metrics = Metrics()
+        # 每个服务器一个监听线程，所有 /events 连接共享
+        self.watcher = FileWatcher([watch_root, ibmm_pkg_dir], [index_html] if index_html else None)
+        self.watcher.on_scan = self._observe_scan
+        self.watcher.on_change = self._on_change
+        # workers=0：在本进程内构建；否则交给独立的渲染进程池
+        if workers > 0:
+            self.renderer = RenderPool(docroot, watch_root, workers=workers)
+        else:
+            self.renderer = InProcessRenderer(docroot, watch_root)
+        self.render_cache = RenderCache(self.renderer, self.metrics, self.watcher.seq)
+        # /list：模块清单与统计在后台维护；留一个 worker 给交互式渲染
+        self.listing = GraphListing(docroot, watch_root, ibmm_pkg_dir, self.renderer, self.watcher,
+                                    concurrency=max(1, workers - 1))
+        self.watcher.start()
+        # 静态文件与渲染输出的 ETag/压缩缓存；启动时在后台预热 index.html 与 ibmm/*.py
+        self.rep_cache = RepresentationCache()
+        threading.Thread(target=self._warm_cache, daemon=True).start()
+        # SSE 定向通知：按 import 与 +___.X 引用求出受影响的图模块
+        self.deps = DependencyIndex(docroot, watch_root)
+        self._sse_lock = threading.Lock()
+        self._sse_last: Tuple[int, bytes] = (0, b"")
+        # Pyodide 回退模式的单文件载荷（ibmm + 图，内容哈希命名）
+        self.bundles = BundleCache(ibmm_pkg_dir, docroot, self.deps)
+        self._describe_metrics()
+
+    def _warm_cache(self):
+        files = ([self.index_html] if self.index_html else []) + sorted(self.ibmm_pkg_dir.glob("*.py"))
+        for f in files:
+            try:
+                self.rep_cache.for_file(str(f), guess_type(str(f)))
+            except OSError:
+                pass
+
+    def close(self):
+        self.watcher.stop()
+        self.renderer.shutdown()
+
+    # ---------- 指标 ----------
+    def _describe_metrics(self):
+        m = self.metrics
+        m.describe("ibmm_dev_requests_total", "counter", "HTTP requests by route, method and status.")
+        m.describe("ibmm_dev_request_seconds", "histogram", "HTTP request latency by route (SSE streams excluded).")
+        m.describe("ibmm_dev_backend_seconds", "histogram", "Render backend calls (build + export) by operation.")
+        m.describe("ibmm_dev_render_cache_total", "counter", "Render cache lookups by operation and result.")
+        m.describe("ibmm_dev_watcher_scan_seconds", "histogram", "Duration of one file watcher stat scan.")
+        m.describe("ibmm_dev_watcher_files", "gauge", "Files covered by the last watcher scan.")
+        m.describe("ibmm_dev_change_events_total", "counter", "Change events pushed to SSE subscribers.")
+        m.describe("ibmm_dev_sse_subscribers", "gauge", "Open /events connections.")
+        m.describe("ibmm_dev_rep_cache_bytes", "gauge", "Bytes held by the ETag/compression cache.")
+        m.describe("ibmm_dev_render_cache_entries", "gauge", "Entries in the render result cache.")
+        m.describe("ibmm_dev_listing_pending", "gauge", "Graphs whose /list stats are still being computed.")
+        m.describe("ibmm_dev_backend_inflight", "gauge", "Requests currently running in render workers.")
+        m.describe("ibmm_dev_uptime_seconds", "gauge", "Seconds since the server started.")
+        m.add("ibmm_dev_sse_subscribers", 0)
+        m.collector(lambda: {
+            "ibmm_dev_rep_cache_bytes": {(): self.rep_cache.nbytes},
+            "ibmm_dev_render_cache_entries": {(): len(self.render_cache)},
+            "ibmm_dev_listing_pending": {(): self.listing.pending},
+            "ibmm_dev_backend_inflight": {(): getattr(self.renderer, "inflight", 0)},
+        })
+
+    def _on_change(self, ev: dict):
+        # 监听线程内、分发给 SSE 订阅者与 /list 之前：先换 worker 再推进版本，
+        # 拿到新版本的请求不会落到仍导入旧 ibmm 的进程上
+        if any(map(self._in_ibmm, ev["added"] + ev["modified"] + ev["removed"])):
+            self.renderer.recycle()
+        self.render_cache.invalidate(ev["seq"])
+
+    def _observe_scan(self, seconds: float, files: int):
+        self.metrics.observe("ibmm_dev_watcher_scan_seconds", seconds)
+        self.metrics.set("ibmm_dev_watcher_files", files)
+
+    ROUTE_LABELS = ("/list", "/search", "/render", "/nodes", "/bundle", "/events", "/metrics", "/debug/profile")
+
+    @classmethod
+    def route_label(cls, path: str) -> str:
+        """把请求路径归并为有限的标签值（静态文件统一为 static），避免指标基数膨胀。"""
+        if path in cls.ROUTE_LABELS:
+            return path
+        for prefix in ("/bundles/", "/edit/"):
+            if path.startswith(prefix):
+                return prefix + "*"
+        return "static"
+
+    def observe_request(self, path: str, method: str, status: int, seconds: float):
+        """两种服务器在每个请求结束时调用。"""
+        label = self.route_label(path)
+        self.metrics.inc("ibmm_dev_requests_total", route=label, method=method, status=status)
+        if label != "/events":
+            self.metrics.observe("ibmm_dev_request_seconds", seconds, route=label)
+
+    def sse_opened(self):
+        self.metrics.add("ibmm_dev_sse_subscribers", 1)
+
+    def sse_closed(self):
+        self.metrics.add("ibmm_dev_sse_subscribers", -1)
+
+    # ---------- SSE ----------
+    def _in_ibmm(self, path: str) -> bool:
+        # 按路径组件判断（字符串前缀会把 ibmm_notes.py、ibmm-dev/ 也算进 ibmm/）
+        return Path(path).resolve().is_relative_to(self._ibmm_dir)
+
+    def change_event(self, ev: dict) -> dict:
+        """
+        监听事件 -> 推送给页面的结构化事件：
+          modules : 需要重新渲染的图（改动的模块 + 传递依赖它们的模块）
+          changed / added / removed : 直接改动 / 新增 / 删除的模块
+          ibmm    : ibmm 包本身有改动（服务端渲染只需重渲染，浏览器端运行时需整页刷新）
+          full    : 其他文件（如 index.html）有改动，需整页刷新
+        """
+        paths = ev["added"] + ev["modified"] + ev["removed"]
+        in_ibmm = {p: self._in_ibmm(p) for p in paths}
+        ibmm_changed = any(in_ibmm.values())
+        graph_paths = [p for p in paths if not in_ibmm[p]]
+        changed, modules = self.deps.affected(graph_paths)
+        return {
+            "seq": ev["seq"],
+            "modules": modules,
+            "changed": changed,
+            "added": [m for m in map(self.deps.module_for, ev["added"]) if m],
+            "removed": [m for m in map(self.deps.module_for, ev["removed"]) if m],
+            "ibmm": ibmm_changed,
+            "full": any(self.deps.module_for(p) is None for p in graph_paths),
+        }
+
+    def sse_message(self, ev: dict) -> bytes:
+        # 同一事件会发给每个订阅者：只计算一次
+        with self._sse_lock:
+            if self._sse_last[0] != ev["seq"]:
+                data = json.dumps(self.change_event(ev), ensure_ascii=False)
+                self.metrics.inc("ibmm_dev_change_events_total")
+                self._sse_last = (ev["seq"], f"data: {data}\n\n".encode("utf-8"))
+            return self._sse_last[1]
+
+    SSE_KEEPALIVE = b": keep-alive\n\n"
+    SSE_HEADERS = {"Content-Type": "text/event-stream", "Cache-Control": "no-cache"}
+
+    # ---------- 动态路由 ----------
+    # 快速路由（可直接在事件循环里执行）与可能阻塞在渲染后端上的慢路由
+    FAST_ROUTES = ("/list", "/metrics")
+    SLOW_ROUTES = ("/search", "/render", "/nodes", "/bundle", "/debug/profile")
+
+    def route(self, path: str, query: str) -> Optional[Response]:
+        """处理动态路由；非动态路径返回 None（交给静态文件处理）。"""
+        qs = urllib.parse.parse_qs(query)
+        if path == "/list":
+            return self.handle_list(qs)
+        if path == "/search":
+            return self.handle_search(qs)
+        if path == "/render":
+            return self.handle_render(qs)
+        if path == "/nodes":
+            return self.handle_nodes(qs)
+        if path == "/bundle":
+            return self.handle_bundle(qs)
+        if path == "/metrics":
+            return self.handle_metrics(qs)
+        if path == "/debug/profile":
+            return self.handle_profile(qs)
+        if path.startswith("/bundles/"):
+            return self.handle_bundle_file(path)
+        if path.startswith("/edit/"):
+            return self.handle_edit(path)
+        return None
+
+    def handle_list(self, qs: dict) -> Response:
+        """缓存的模块清单 + 后台统计；?format=json 供页面轮询。"""
+        entries = self.listing.entries()
+        if qs.get("format") == ["json"]:
+            return json_response(200, {"root": str(self.watch_root),
+                                       "pending": self.listing.pending, "graphs": entries})
+        items_html = []
+        for e in entries:
+            mod = e["module"]
+            href = f"/?graph={quote_plus(mod)}"
+            items_html.append(
+                f'<li><a href="{href}">{html_escape(mod)}</a>'
+                f'<span class="small">&nbsp;&nbsp;(<code>{html_escape(e["file"])}</code>)</span>'
+                f'<span class="stats" data-mod="{html_escape(mod)}">{format_stats(e["stats"])}</span></li>'
+            )
+        html = LIST_HTML.substitute(
+            list_root=str(self.watch_root),
+            items="\n    ".join(items_html) or "<li><i>no .py files found</i></li>",
+        )
+        return Response(200, html.encode("utf-8"), "text/html; charset=utf-8")
+
+    def handle_search(self, qs: dict) -> Response:
+        graph = (qs.get("graph") or [""])[0]
+        query = (qs.get("q") or [""])[0]
+        try:
+            limit = int((qs.get("limit") or ["20"])[0])
+        except ValueError:
+            return text_response(400, "Invalid limit")
+        if limit < 1:
+            return text_response(400, "Invalid limit: must be >= 1")
+        if not graph:
+            return text_response(400, "Missing 'graph' parameter")
+        try:
+            results = self.render_cache.search(graph, query, limit)
+        except Exception as e:
+            return error_response(f"search {graph}", e)
+        return json_response(200, {"graph": graph, "query": query, "results": results})
+
+    def handle_render(self, qs: dict) -> Response:
+        graph = (qs.get("graph") or [""])[0]
+        view = (qs.get("view") or ["flowchart"])[0]
+        subgraphs = [s for v in qs.get("subgraphs", []) for s in v.split(",") if s]
+        if not graph:
+            return text_response(400, "Missing 'graph' parameter")
+        if view not in VIEWS:
+            return text_response(400, f"Unknown view: {view!r}")
+        try:
+            return text_response(200, self.render_cache.render(graph, view, subgraphs))
+        except Exception as e:
+            return error_response(f"render {graph}", e)
+
+    def handle_nodes(self, qs: dict) -> Response:
+        graph = (qs.get("graph") or [""])[0]
+        if not graph:
+            return text_response(400, "Missing 'graph' parameter")
+        try:
+            names = self.render_cache.nodes(graph)
+        except Exception as e:
+            return error_response(f"nodes {graph}", e)
+        return json_response(200, {"graph": graph, "nodes": names})
+
+    def handle_bundle(self, qs: dict) -> Response:
+        """当前源码对应的 zip 地址；地址随内容变化，本响应本身不缓存。"""
+        graph = (qs.get("graph") or [""])[0]
+        if not graph:
+            return text_response(400, "Missing 'graph' parameter")
+        try:
+            name = self.bundles.bundle(graph)
+        except KeyError:
+            return text_response(404, f"Unknown graph: {graph}")
+        return json_response(200, {"graph": graph, "url": f"/bundles/{name}"})
+
+    NO_STORE = {"Cache-Control": "no-store"}
+
+    def handle_metrics(self, qs: dict) -> Response:
+        """Prometheus 文本格式；?format=json 返回 JSON（直方图附带分位数估计）。"""
+        if (qs.get("format") or [""])[0] == "json":
+            body = json.dumps(self.metrics.to_json(), ensure_ascii=False, indent=2).encode("utf-8")
+            return Response(200, body, "application/json; charset=utf-8", dict(self.NO_STORE))
+        return Response(200, self.metrics.to_prometheus().encode("utf-8"),
+                        "text/plain; version=0.0.4; charset=utf-8", dict(self.NO_STORE))
+
+    def handle_profile(self, qs: dict) -> Response:
+        """
+        /debug/profile?graph=<module>&view=flowchart|mindmap&top=40&sort=cumulative|tottime|ncalls[&format=json]
+        在渲染后端中用 cProfile 跑一次不走缓存的构建 + 导出，返回耗时最多的函数。
+        """
+        if not self.profile_enabled:
+            return text_response(404, "Profiling is disabled; start ibmm-dev with --profile")
+        graph = (qs.get("graph") or [""])[0]
+        view = (qs.get("view") or ["flowchart"])[0]
+        sort = (qs.get("sort") or ["cumulative"])[0]
+        subgraphs = [s for v in qs.get("subgraphs", []) for s in v.split(",") if s]
+        if not graph:
+            return text_response(400, "Missing 'graph' parameter")
+        if view not in VIEWS:
+            return text_response(400, f"Unknown view: {view!r}")
+        if sort not in PROFILE_SORTS:
+            return text_response(400, f"Unknown sort: {sort!r} (use {', '.join(PROFILE_SORTS)})")
+        try:
+            top = max(1, int((qs.get("top") or ["40"])[0]))
+        except ValueError:
+            return text_response(400, "Invalid top")
+        try:
+            result = self.renderer.profile(graph, view, subgraphs, top, sort)
+        except Exception as e:
+            return error_response(f"profile {graph}", e)
+        if (qs.get("format") or [""])[0] == "json":
+            body = json.dumps(result, ensure_ascii=False, indent=2).encode("utf-8")
+            return Response(200, body, "application/json; charset=utf-8", dict(self.NO_STORE))
+        return Response(200, format_profile(result).encode("utf-8"), "text/plain; charset=utf-8",
+                        dict(self.NO_STORE))
+
+    def handle_bundle_file(self, url_path: str) -> Optional[Response]:
+        # 内存中没有（如 python -m ibmm-dev bundle 预先生成的）则交给静态文件
+        data = self.bundles.get(url_path[len("/bundles/"):])
+        if data is None:
+            return None
+        return Response(200, data, "application/zip", {"Cache-Control": IMMUTABLE})
+
+    def handle_edit(self, url_path: str) -> Response:
+        # /edit/{src_path}:{line_num}
+        raw = urllib.parse.unquote(url_path[len("/edit/"):])
+
+        # 只按“最后一个冒号”分割，避免路径中出现冒号（例如未来扩展）
+        if ":" not in raw:
+            return text_response(400, f"Bad edit target: {raw}")
+        src_str, line_str = raw.rsplit(":", 1)
+
+        try:
+            line_no = int(line_str)
+        except ValueError:
+            return text_response(400, f"Invalid line number: {line_str}")
+
+        # 允许绝对路径；相对路径相对于项目根
+        if os.path.isabs(src_str):
+            fs_path = src_str
+        else:
+            fs_path = os.path.abspath(os.path.join(self.project_root, src_str))
+
+        # 简单防护：必须在项目目录内
+        try:
+            common = os.path.commonpath([self.project_root, os.path.abspath(fs_path)])
+        except ValueError:
+            common = ""  # 不同盘符等情况
+        if common != self.project_root:
+            return text_response(403, f"Forbidden path: {fs_path}")
+
+        if not os.path.exists(fs_path):
+            return text_response(404, f"File not found: {fs_path}")
+
+        # 执行 'EDITOR path:line'
+        cmd = shlex.split(self.editor_cmd) + [f"{fs_path}:{line_no}"]
+        try:
+            subprocess.Popen(cmd)  # 非阻塞
+        except FileNotFoundError:
+            # subl 不存在时给出清晰提示
+            return text_response(500, f"Editor command not found: '{self.editor_cmd}'. Check your config or PATH.")
+        except Exception as e:
+            return text_response(500, f"Failed to launch editor '{self.editor_cmd}': {e}")
+
+        # 成功：可以 204，无内容
+        return Response(204)
+
+    # ---------- 静态文件 ----------
+    def static_file(self, url_path: str) -> Tuple[str, Optional[str]]:
+        """
+        返回 ("file", fs_path) / ("redirect", location) / ("large", fs_path) / ("dir", fs_path) / ("missing", None)。
+        """
+        fs_path = translate_path(str(self.docroot), url_path)
+        if os.path.isdir(fs_path):
+            if not url_path.endswith("/"):
+                return "redirect", url_path + "/"
+            index = os.path.join(fs_path, "index.html")
+            if not os.path.isfile(index):
+                return "dir", fs_path
+            fs_path = index
+        try:
+            st = os.stat(fs_path)
+        except OSError:
+            return "missing", None
+        if not os.path.isfile(fs_path):
+            return "missing", None
+        if st.st_size > MAX_CACHED_FILE:
+            return "large", fs_path
+        return "file", fs_path
+
+    @staticmethod
+    def static_cache_control(url_path: str) -> str:
+        """内容哈希命名的 bundle 可长期缓存；其余静态文件每次用 ETag 重新验证。"""
+        if url_path.startswith("/bundles/") and BUNDLE_NAME.match(url_path[len("/bundles/"):]):
+            return IMMUTABLE
+        return "no-cache"
+
+    # ---------- 条件请求 / 压缩协商 ----------
+    def representation(self, resp: Response) -> Optional[Representation]:
+        """200 响应走表示缓存（ETag/压缩）；其余及 no-store 的响应原样发送。"""
+        if resp.status != 200 or resp.headers.get("Cache-Control") == "no-store":
+            return None
+        return self.rep_cache.for_bytes(resp.body, resp.ctype)
+
+    @staticmethod
+    def negotiate(rep: Representation, ctype: str, if_none_match: Optional[str],
+                  accept_encoding: Optional[str], cache_control: str = "no-cache"
+                  ) -> Tuple[int, List[Tuple[str, str]], bytes]:
+        """按 Accept-Encoding 选择预压缩副本 + 强 ETag 协商（304，ETag 随所选编码）；返回 (status, headers, body)。"""
+        enc = choose_encoding(rep, accept_encoding)
+        etag = rep.etag_for(enc)
+        if etag_matches(if_none_match, rep.etag):
+            return 304, [("ETag", etag), ("Cache-Control", cache_control),
+                         ("Vary", "Accept-Encoding")], b""
+        body = rep.encoded[enc] if enc else rep.body
+        headers = [("Content-Type", ctype), ("ETag", etag),
+                   ("Cache-Control", cache_control), ("Vary", "Accept-Encoding")]
+        if enc:
+            headers.append(("Content-Encoding", enc))
+        headers.append(("Content-Length", str(len(body))))
+        return 200, headers, body
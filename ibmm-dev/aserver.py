@@ -0,0 +1,277 @@
+# ibmm-dev/aserver.py
+"""
+asyncio 版服务器（--async）：所有连接（含 SSE 长连接）共用一个事件循环，不再每连接一个线程。
+
+- 极简 HTTP/1.1：仅 GET/HEAD，支持 keep-alive（空闲 30s 断开），不支持请求体；
+- /list、/metrics、/edit、静态文件（表示缓存命中时）直接在事件循环里处理；
+  /search、/render、/nodes、/debug/profile 以及未命中缓存的文件读取放到线程池执行；
+- SSE：一个桥接线程订阅共享 FileWatcher，计算定向事件后投递到每个订阅者的 asyncio.Queue。
+"""
+from __future__ import annotations
+import asyncio, os, threading, time
+from email.utils import formatdate
+from html import escape as html_escape
+from http import HTTPStatus
+from typing import Dict, List, Optional, Set, Tuple
+from urllib.parse import urlsplit
+
+from .app import DevApp, Response, guess_type, text_response
+
+IDLE_TIMEOUT = 30          # keep-alive 空闲超时（秒）
+SSE_KEEPALIVE_EVERY = 15   # SSE 注释心跳间隔（秒）
+MAX_HEADER_BYTES = 64 * 1024
+SERVER_NAME = "ibmm-dev-async"
+
+class _EventHub:
+    """把 FileWatcher 的线程队列桥接为多个 asyncio.Queue（每个 SSE 连接一个）。"""
+    def __init__(self, app: DevApp, loop: asyncio.AbstractEventLoop):
+        self.loop = loop
+        self.subs: Set[asyncio.Queue] = set()
+        self._src = app.watcher.subscribe()
+        self._app = app
+        threading.Thread(target=self._bridge, name="ibmm-dev-sse-bridge", daemon=True).start()
+
+    def _bridge(self):
+        while True:
+            ev = self._src.get()
+            if ev is None:
+                return
+            msg = self._app.sse_message(ev)   # 依赖分析要读文件，不放在事件循环里
+            try:
+                self.loop.call_soon_threadsafe(self._fanout, msg)
+            except RuntimeError:   # 事件循环已关闭
+                return
+
+    def _fanout(self, msg: bytes):
+        for q in self.subs:
+            q.put_nowait(msg)
+
+    def subscribe(self) -> asyncio.Queue:
+        q: asyncio.Queue = asyncio.Queue()
+        self.subs.add(q)
+        return q
+
+    def unsubscribe(self, q: asyncio.Queue):
+        self.subs.discard(q)
+
+    def close(self):
+        self._app.watcher.unsubscribe(self._src)
+        self._src.put(None)
+
+class _Request:
+    __slots__ = ("method", "target", "version", "headers", "status")
+    def __init__(self, method: str, target: str, version: str, headers: Dict[str, str]):
+        self.method, self.target, self.version, self.headers = method, target, version, headers
+        self.status = 0   # 已发送的状态码（指标用）
+
+    @property
+    def keep_alive(self) -> bool:
+        conn = self.headers.get("connection", "").lower()
+        if self.version == "HTTP/1.0":
+            return conn == "keep-alive"
+        return conn != "close"
+
+async def _read_request(reader: asyncio.StreamReader) -> Optional[_Request]:
+    """读取并解析一个请求头；连接关闭/超时返回 None，格式错误抛 ValueError。"""
+    try:
+        raw = await asyncio.wait_for(reader.readuntil(b"\r\n\r\n"), IDLE_TIMEOUT)
+    except (asyncio.IncompleteReadError, asyncio.TimeoutError, ConnectionError):
+        return None
+    except asyncio.LimitOverrunError:
+        raise ValueError("Request header too large")
+    lines = raw.decode("iso-8859-1").split("\r\n")
+    parts = lines[0].split()
+    if len(parts) != 3 or not parts[2].startswith("HTTP/"):
+        raise ValueError(f"Bad request line: {lines[0]!r}")
+    headers: Dict[str, str] = {}
+    for line in lines[1:]:
+        if not line:
+            continue
+        k, sep, v = line.partition(":")
+        if not sep:
+            raise ValueError(f"Bad header line: {line!r}")
+        headers[k.strip().lower()] = v.strip()
+    return _Request(parts[0], parts[1], parts[2], headers)
+
+class AsyncDevServer:
+    def __init__(self, app: DevApp):
+        self.app = app
+        self.hub: Optional[_EventHub] = None
+
+    # ---------- 输出 ----------
+    @staticmethod
+    def _head(status: int, headers: List[Tuple[str, str]], keep_alive: bool) -> bytes:
+        phrase = HTTPStatus(status).phrase
+        lines = [f"HTTP/1.1 {status} {phrase}", f"Server: {SERVER_NAME}",
+                 f"Date: {formatdate(usegmt=True)}"]
+        lines += [f"{k}: {v}" for k, v in headers]
+        if not keep_alive:
+            lines.append("Connection: close")
+        return ("\r\n".join(lines) + "\r\n\r\n").encode("latin-1", "strict")
+
+    async def _write(self, writer: asyncio.StreamWriter, status: int, headers: List[Tuple[str, str]],
+                     body: bytes, req: _Request, keep_alive: bool):
+        req.status = status
+        writer.write(self._head(status, headers, keep_alive))
+        if body and req.method != "HEAD":
+            writer.write(body)
+        await writer.drain()
+
+    async def _send_response(self, writer, req: _Request, resp: Response, keep_alive: bool):
+        rep = self.app.representation(resp)
+        if rep is not None:
+            status, headers, body = DevApp.negotiate(
+                rep, resp.ctype, req.headers.get("if-none-match"), req.headers.get("accept-encoding"),
+                resp.headers.get("Cache-Control", "no-cache"))
+        else:
+            status, body = resp.status, resp.body
+            headers = [] if status == 204 else [("Content-Type", resp.ctype)]
+            headers += list(resp.headers.items())
+            headers.append(("Content-Length", str(len(body))))
+        await self._write(writer, status, headers, body, req, keep_alive)
+
+    # ---------- 路由 ----------
+    async def _dispatch(self, req: _Request, writer, keep_alive: bool) -> bool:
+        """处理一个请求并记录指标；返回是否还可复用连接。"""
+        path = urlsplit(req.target).path or "/"
+        t0 = time.perf_counter()
+        try:
+            return await self._dispatch_inner(req, writer, keep_alive)
+        finally:
+            self.app.observe_request(path, req.method, req.status, time.perf_counter() - t0)
+
+    async def _dispatch_inner(self, req: _Request, writer, keep_alive: bool) -> bool:
+        loop = asyncio.get_running_loop()
+        url = urlsplit(req.target)
+        path = url.path or "/"
+
+        if req.method not in ("GET", "HEAD"):
+            # 不读取请求体：连接复用的话，未读的 POST/PUT 请求体会被当成下一个请求行，只能关闭连接
+            await self._send_response(writer, req, text_response(501, f"Unsupported method ({req.method!r})"),
+                                      False)
+            return False
+
+        if path == "/events" and req.method == "GET":
+            await self._serve_events(req, writer)
+            return False
+
+        if path in DevApp.SLOW_ROUTES:
+            resp = await loop.run_in_executor(None, self.app.route, path, url.query)
+        else:
+            resp = self.app.route(path, url.query)   # 非动态路径立即返回 None
+        if resp is not None:
+            await self._send_response(writer, req, resp, keep_alive)
+            return keep_alive
+
+        await self._serve_static(req, path, writer, keep_alive)
+        return keep_alive
+
+    async def _serve_static(self, req: _Request, path: str, writer, keep_alive: bool):
+        kind, value = self.app.static_file(path)
+        if kind == "redirect":
+            await self._write(writer, 301, [("Location", value), ("Content-Length", "0")], b"", req, keep_alive)
+            return
+        if kind == "missing":
+            await self._send_response(writer, req, text_response(404, "File not found"), keep_alive)
+            return
+        if kind == "dir":
+            await self._send_response(writer, req, self._dir_listing(path, value), keep_alive)
+            return
+        ctype = guess_type(value)
+        loop = asyncio.get_running_loop()
+        if kind == "large":
+            # 超大文件不进缓存：在线程池中读取，按块写出
+            size = os.path.getsize(value)
+            await self._write(writer, 200, [("Content-Type", ctype), ("Content-Length", str(size)),
+                                            ("Cache-Control", "no-cache")], b"", req, keep_alive)
+            if req.method == "HEAD":
+                return
+            with open(value, "rb") as f:
+                while True:
+                    chunk = await loop.run_in_executor(None, f.read, 1024 * 1024)
+                    if not chunk:
+                        break
+                    writer.write(chunk)
+                    await writer.drain()
+            return
+        # 表示缓存命中只是一次 stat；未命中才读取+压缩，放到线程池
+        rep = await loop.run_in_executor(None, self.app.rep_cache.for_file, value, ctype)
+        status, headers, body = DevApp.negotiate(
+            rep, ctype, req.headers.get("if-none-match"), req.headers.get("accept-encoding"),
+            DevApp.static_cache_control(path))
+        await self._write(writer, status, headers, body, req, keep_alive)
+
+    @staticmethod
+    def _dir_listing(url_path: str, fs_path: str) -> Response:
+        try:
+            names = sorted(os.listdir(fs_path), key=str.lower)
+        except OSError:
+            return text_response(404, "No permission to list directory")
+        items = []
+        for name in names:
+            link = name + ("/" if os.path.isdir(os.path.join(fs_path, name)) else "")
+            items.append(f'<li><a href="{html_escape(link, quote=True)}">{html_escape(link)}</a></li>')
+        title = html_escape(f"Directory listing for {url_path}")
+        html = (f'<!DOCTYPE HTML>\n<html>\n<head>\n<meta charset="utf-8">\n<title>{title}</title>\n</head>\n'
+                f'<body>\n<h1>{title}</h1>\n<hr>\n<ul>\n' + "\n".join(items) + '\n</ul>\n<hr>\n</body>\n</html>\n')
+        return Response(200, html.encode("utf-8"), "text/html; charset=utf-8")
+
+    async def _serve_events(self, req: _Request, writer: asyncio.StreamWriter):
+        headers = list(DevApp.SSE_HEADERS.items())
+        req.status = 200
+        writer.write(self._head(200, headers + [("Connection", "keep-alive")], keep_alive=True))
+        await writer.drain()
+        q = self.hub.subscribe()
+        self.app.sse_opened()
+        try:
+            while True:
+                try:
+                    msg = await asyncio.wait_for(q.get(), SSE_KEEPALIVE_EVERY)
+                except asyncio.TimeoutError:
+                    writer.write(DevApp.SSE_KEEPALIVE)
+                else:
+                    writer.write(msg)
+                await writer.drain()
+        except (ConnectionError, asyncio.CancelledError):
+            pass
+        finally:
+            self.hub.unsubscribe(q)
+            self.app.sse_closed()
+
+    # ---------- 连接 ----------
+    async def handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        try:
+            while True:
+                try:
+                    req = await _read_request(reader)
+                except ValueError as e:
+                    writer.write(self._head(400, [("Content-Type", "text/plain; charset=utf-8"),
+                                                  ("Content-Length", str(len(str(e).encode())))], False))
+                    writer.write(str(e).encode())
+                    await writer.drain()
+                    break
+                if req is None:
+                    break
+                if not await self._dispatch(req, writer, req.keep_alive):
+                    break
+        except ConnectionError:
+            pass
+        finally:
+            writer.close()
+            try:
+                await writer.wait_closed()
+            except (ConnectionError, asyncio.CancelledError):
+                pass
+
+    async def serve_forever(self, host: str, port: int):
+        self.hub = _EventHub(self.app, asyncio.get_running_loop())
+        server = await asyncio.start_server(self.handle, host, port, limit=MAX_HEADER_BYTES)
+        try:
+            async with server:
+                await server.serve_forever()
+        finally:
+            self.hub.close()
+
+def serve(app: DevApp, host: str, port: int):
+    """阻塞运行直到 Ctrl-C（KeyboardInterrupt 向上抛出）。"""
+    asyncio.run(AsyncDevServer(app).serve_forever(host, port))
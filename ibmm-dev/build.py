@@ -0,0 +1,374 @@
+# ibmm-dev/build.py
+"""
+静态站点构建：python -m ibmm-dev build <dir> -o site/ -j N [--watch]
+
+- 每个图模块渲染为 <module>.html（内嵌 flowchart / mindmap 两种视图）与 mmd/<module>.<view>.mmd；
+- 渲染在 spawn 工作进程中并行进行（与 /render 相同的 build_graph / export_graph）；
+- manifest.json 记录每个图的构建键与输出文件的内容哈希。构建键由
+  ibmm 包源码、图自身源码、它（传递）引用/导入的其他图的源码共同决定，键不变且输出完好时跳过；
+- --watch：保存文件后增量重建。
+"""
+from __future__ import annotations
+import argparse, hashlib, importlib, json, multiprocessing, os, sys, time, traceback
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from html import escape as html_escape
+from pathlib import Path
+from string import Template
+from typing import Dict, List, Optional
+
+from .app import format_stats
+from .deps import DependencyIndex
+from .paths import resolve_layout
+from .pool import _W, _w_init
+from .render import BUILD_LOCK, build_graph, export_graph, graph_stats
+from .watcher import FileWatcher
+
+MANIFEST = "manifest.json"
+MANIFEST_VERSION = 3   # 2：静态页不再带 edit/ 链接；3：失败页不再带 traceback
+MERMAID_JS = "https://cdn.jsdelivr.net/npm/mermaid@11/dist/mermaid.min.js"
+
+PAGE_HTML = Template("""<!doctype html>
+<html>
+<head>
+<meta charset="utf-8"/>
+<meta name="viewport" content="width=device-width,initial-scale=1"/>
+<title>$title</title>
+<style>
+  body{margin:0;font:14px/1.5 system-ui,-apple-system,Segoe UI,Roboto,Helvetica,Arial;}
+  header{padding:10px 14px;background:#0f172a;color:#e2e8f0;display:flex;gap:12px;align-items:center;}
+  header b{color:#fff;} header a{color:#e2e8f0;text-decoration:none;}
+  main{padding:16px;}
+  .button-group{margin-bottom:16px;display:flex;gap:8px;align-items:center;}
+  .button-group button{padding:8px 16px;border-radius:6px;border:1px solid #e5e7eb;background:#f9fafb;cursor:pointer;font-weight:500;}
+  .button-group button.active{background:#0f172a;color:#fff;border-color:#0f172a;}
+  .small{color:#64748b;font-size:12px;}
+  #mermaid{background:#fff;border:1px solid #e5e7eb;border-radius:12px;padding:16px;overflow:auto;}
+  #error{background:#111827;color:#fca5a5;border-radius:12px;padding:16px;overflow:auto;white-space:pre;}
+</style>
+<script src="$mermaid_js"></script>
+</head>
+<body>
+<header><a href="index.html"><b>IBMM</b></a><span>&nbsp;· <code>$module</code></span>
+  <span style="flex:1"></span><span class="small">$stats</span></header>
+<main>
+$body
+</main>
+</body>
+</html>
+""")
+
+PAGE_BODY = Template("""<div class="button-group">
+  <button id="flowchart-btn" class="active">Flowchart</button>
+  <button id="mindmap-btn">Mindmap</button>
+  <span class="small">source: <a href="$flowchart_mmd">flowchart.mmd</a> · <a href="$mindmap_mmd">mindmap.mmd</a></span>
+</div>
+<div id="mermaid"></div>
+<script>
+  mermaid.initialize({ startOnLoad:false, securityLevel:'loose' });
+  const VIEWS = $views;
+  function show(view) {
+    const box = document.getElementById("mermaid");
+    const pre = document.createElement("pre");
+    pre.className = "mermaid";
+    pre.textContent = VIEWS[view];
+    box.replaceChildren(pre);
+    mermaid.run();
+    for (const v in VIEWS) document.getElementById(v + "-btn").classList.toggle("active", v === view);
+  }
+  for (const v in VIEWS) document.getElementById(v + "-btn").addEventListener("click", () => show(v));
+  show("flowchart");
+</script>""")
+
+INDEX_HTML = Template("""<!doctype html>
+<html>
+<head>
+<meta charset="utf-8"/>
+<meta name="viewport" content="width=device-width,initial-scale=1"/>
+<title>IBMM · graphs</title>
+<style>
+  body{margin:0;font:14px/1.5 system-ui,-apple-system,Segoe UI,Roboto,Helvetica,Arial;}
+  header{padding:10px 14px;background:#0f172a;color:#e2e8f0;display:flex;gap:12px;align-items:center;}
+  header b{color:#fff;}
+  main{padding:16px;}
+  ul{list-style:none;margin:0;padding:0;}
+  li{padding:8px 10px;border-bottom:1px solid #e5e7eb;display:flex;gap:10px;align-items:center;}
+  a{color:#2563eb;text-decoration:none;}
+  a:hover{text-decoration:underline;}
+  .small{color:#64748b;font-size:12px;}
+  .stats{margin-left:auto;text-align:right;}
+  .err{color:#dc2626;font-size:12px;}
+</style>
+</head>
+<body>
+<header><b>IBMM</b><span>&nbsp;· $count graphs</span></header>
+<main>
+  <ul>
+    $items
+  </ul>
+</main>
+</body>
+</html>
+""")
+
+def _sha256(data: bytes) -> str:
+    return hashlib.sha256(data).hexdigest()
+
+def _script_json(obj) -> str:
+    """可安全嵌入 <script> 的 JSON。"""
+    return json.dumps(obj, ensure_ascii=False).replace("</", "<\\/")
+
+def _write_if_changed(path: Path, data: bytes) -> bool:
+    """内容相同则不动文件（保留 mtime，便于下游同步/缓存）；否则原子替换。"""
+    try:
+        if path.read_bytes() == data:
+            return False
+    except OSError:
+        pass
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_name(path.name + ".tmp")
+    tmp.write_bytes(data)
+    os.replace(tmp, path)
+    return True
+
+def hash_package(pkg_dir: Path) -> str:
+    h = hashlib.sha256()
+    for p in sorted(pkg_dir.rglob("*.py")):
+        if "__pycache__" in p.parts:
+            continue
+        h.update(str(p.relative_to(pkg_dir)).encode("utf-8") + b"\0")
+        h.update(p.read_bytes() + b"\0")
+    return h.hexdigest()
+
+# ----------------- 工作进程侧 -----------------
+def _site_error(graph: str, e: BaseException) -> dict:
+    """完整 traceback 只写构建日志（stderr）；写入页面与 manifest 的只有 "类型: 消息"（同 app.error_response）。"""
+    print(f"[ibmm-dev] build  : {graph} failed:", file=sys.stderr)
+    traceback.print_exception(type(e), e, e.__traceback__)
+    return {"error": f"{type(e).__name__}: {e}"}
+
+def _w_site(graph: str, key: str) -> dict:
+    """构建一张图并导出两种视图；失败时返回 {"error": "类型: 消息"}。"""
+    sig = int(key[:15], 16)
+    try:
+        with BUILD_LOCK:
+            snap = build_graph(_W["docroot"], _W["watch_root"], graph, sig)   # 导出这份快照，而非全局 REGISTRY
+    except Exception as e:
+        return _site_error(graph, e)
+    stats = graph_stats(_W["docroot"], _W["watch_root"], graph, sig)       # 已发布：不再构建
+    if "error" in stats:
+        return {"error": stats["error"]}
+    try:
+        return {
+            "stats": stats,
+            "flowchart": export_graph("flowchart", [], snap, edit_links=False),
+            "mindmap": export_graph("mindmap", [], snap),
+        }
+    except Exception as e:
+        return _site_error(graph, e)
+
+# ----------------- 构建器 -----------------
+class SiteBuilder:
+    def __init__(self, docroot: Path, watch_root: Path, ibmm_pkg_dir: Path, out_dir: Path, jobs: int = 0):
+        self.docroot = docroot
+        self.watch_root = watch_root
+        self.ibmm_pkg_dir = ibmm_pkg_dir
+        self.out_dir = out_dir
+        self.jobs = jobs or os.cpu_count() or 1
+        self.deps = DependencyIndex(docroot, watch_root)
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._executor_ibmm: Optional[str] = None
+
+    def _pool(self, ibmm_hash: str) -> ProcessPoolExecutor:
+        # ibmm 改动后工作进程里导入的是旧 ibmm：换一批新进程
+        if self._executor is None or self._executor_ibmm != ibmm_hash:
+            self.close()
+            self._executor = ProcessPoolExecutor(
+                max_workers=self.jobs, mp_context=multiprocessing.get_context("spawn"),
+                initializer=_w_init, initargs=(str(self.docroot), str(self.watch_root), list(sys.path)))
+            self._executor_ibmm = ibmm_hash
+        return self._executor
+
+    def close(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=True, cancel_futures=True)
+            self._executor = None
+
+    def _load_manifest(self) -> dict:
+        try:
+            m = json.loads((self.out_dir / MANIFEST).read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            return {"graphs": {}}
+        return m if m.get("version") == MANIFEST_VERSION else {"graphs": {}}
+
+    def _outputs_intact(self, entry: dict) -> bool:
+        for rel, digest in entry.get("files", {}).items():
+            try:
+                if _sha256((self.out_dir / rel).read_bytes()) != digest:
+                    return False
+            except OSError:
+                return False
+        return bool(entry.get("files"))
+
+    @staticmethod
+    def _outputs(mod: str) -> Dict[str, str]:
+        return {"page": f"{mod}.html",
+                "flowchart": f"mmd/{mod}.flowchart.mmd",
+                "mindmap": f"mmd/{mod}.mindmap.mmd"}
+
+    def _keys(self, ibmm_hash: str) -> Dict[str, dict]:
+        """module -> {"key", "source", "deps"}；__init__.py 只参与哈希，不单独输出。"""
+        deps = self.deps.dependencies()
+        file_hash = {mod: _sha256(Path(path).read_bytes()) for mod, (path, _) in deps.items()}
+        out = {}
+        for mod, (path, mod_deps) in deps.items():
+            if mod.endswith(".__init__") or mod == "__init__":
+                continue
+            # 导入 a.b.c 会先执行 a/__init__.py、a/b/__init__.py
+            parts = mod.split(".")
+            inits = [".".join(parts[:i] + ["__init__"]) for i in range(1, len(parts))]
+            h = hashlib.sha256(f"v{MANIFEST_VERSION}\0{ibmm_hash}\0{mod}\0{file_hash[mod]}".encode())
+            for d in sorted(set(mod_deps) | {i for i in inits if i in file_hash}):
+                h.update(f"\0{d}\0{file_hash[d]}".encode())
+            out[mod] = {"key": h.hexdigest(), "source": str(Path(path).relative_to(self.watch_root)),
+                        "deps": [d for d in mod_deps if not d.endswith("__init__")]}
+        return out
+
+    def build(self, log=print) -> dict:
+        """增量构建一次；返回 {"built": [...], "skipped": [...], "removed": [...], "errors": [...]}。"""
+        t0 = time.perf_counter()
+        ibmm_hash = hash_package(self.ibmm_pkg_dir)
+        manifest = self._load_manifest()
+        old = manifest.get("graphs", {})
+        keys = self._keys(ibmm_hash)
+
+        # 键相同、上次成功且输出文件完好才跳过；失败的图每次都重试（错误可能来自环境）
+        todo = [mod for mod, k in keys.items()
+                if not (mod in old and old[mod].get("key") == k["key"] and "error" not in old[mod]
+                        and self._outputs_intact(old[mod]))]
+        graphs = {mod: old[mod] for mod in keys if mod not in todo}
+        report = {"built": [], "skipped": sorted(graphs), "removed": [], "errors": []}
+
+        if todo:
+            pool = self._pool(ibmm_hash)
+            futures = {pool.submit(_w_site, mod, keys[mod]["key"]): mod for mod in todo}
+            for fut in as_completed(futures):
+                mod = futures[fut]
+                try:
+                    res = fut.result()
+                except Exception as e:   # 工作进程崩溃等
+                    res = {"error": f"{type(e).__name__}: {e}"}
+                graphs[mod] = self._write_graph(mod, keys[mod], res)
+                if "error" in res:
+                    report["errors"].append(mod)
+                    log(f"[ibmm-dev] build  : {mod}  ERROR {res['error'].strip().splitlines()[-1]}")
+                else:
+                    report["built"].append(mod)
+                    log(f"[ibmm-dev] build  : {mod}  ({res['stats']['build_ms']:.0f} ms)")
+
+        # 已删除的图：清理其输出
+        for mod in sorted(set(old) - set(keys)):
+            for rel in old[mod].get("files", {}):
+                try:
+                    (self.out_dir / rel).unlink()
+                except OSError:
+                    pass
+            report["removed"].append(mod)
+
+        manifest = {"version": MANIFEST_VERSION, "ibmm": ibmm_hash,
+                    "graphs": {mod: graphs[mod] for mod in sorted(graphs)}}
+        _write_if_changed(self.out_dir / "index.html", self._index_html(manifest["graphs"]).encode("utf-8"))
+        _write_if_changed(self.out_dir / MANIFEST,
+                          (json.dumps(manifest, ensure_ascii=False, indent=2) + "\n").encode("utf-8"))
+        report["built"].sort()
+        report["errors"].sort()
+        log(f"[ibmm-dev] build  : {len(report['built'])} built, {len(report['skipped'])} up to date, "
+            f"{len(report['errors'])} failed, {len(report['removed'])} removed "
+            f"in {time.perf_counter() - t0:.2f}s -> {self.out_dir}")
+        return report
+
+    def _write_graph(self, mod: str, key: dict, res: dict) -> dict:
+        outs = self._outputs(mod)
+        entry = {**key, "files": {}}
+        if "error" in res:
+            body = f'<pre id="error">{html_escape(res["error"])}</pre>'
+            page = PAGE_HTML.substitute(title=html_escape(mod), module=html_escape(mod),
+                                        stats="build failed", mermaid_js=MERMAID_JS, body=body)
+            entry["error"] = res["error"]
+            files = {outs["page"]: page.encode("utf-8")}
+        else:
+            body = PAGE_BODY.substitute(
+                views=_script_json({"flowchart": res["flowchart"], "mindmap": res["mindmap"]}),
+                flowchart_mmd=outs["flowchart"], mindmap_mmd=outs["mindmap"])
+            page = PAGE_HTML.substitute(title=html_escape(mod), module=html_escape(mod),
+                                        stats=f'{res["stats"]["nodes"]} nodes · {res["stats"]["edges"]} edges',
+                                        mermaid_js=MERMAID_JS, body=body)
+            entry["stats"] = res["stats"]
+            files = {outs["page"]: page.encode("utf-8"),
+                     outs["flowchart"]: res["flowchart"].encode("utf-8"),
+                     outs["mindmap"]: res["mindmap"].encode("utf-8")}
+        for rel, data in files.items():
+            _write_if_changed(self.out_dir / rel, data)
+            entry["files"][rel] = _sha256(data)
+        return entry
+
+    @staticmethod
+    def _index_html(graphs: Dict[str, dict]) -> str:
+        items = []
+        for mod, e in graphs.items():
+            st = {"error": e["error"].strip().splitlines()[-1]} if "error" in e else e.get("stats")
+            items.append(
+                f'<li><a href="{html_escape(mod)}.html">{html_escape(mod)}</a>'
+                f'<span class="small">&nbsp;&nbsp;(<code>{html_escape(e["source"])}</code>)</span>'
+                f'<span class="stats">{format_stats(st)}</span></li>'
+            )
+        return INDEX_HTML.substitute(count=len(graphs),
+                                     items="\n    ".join(items) or "<li><i>no graphs found</i></li>")
+
+    def watch(self, log=print):
+        """先构建一次，之后每次保存（去抖后）增量重建，直到 Ctrl-C。"""
+        self.build(log)
+        watcher = FileWatcher([self.watch_root, self.ibmm_pkg_dir])
+        events = watcher.subscribe()
+        watcher.start()
+        log(f"[ibmm-dev] watching: {self.watch_root}  (and {self.ibmm_pkg_dir})")
+        try:
+            while True:
+                events.get()
+                self.build(log)
+        finally:
+            watcher.stop()
+
+# ----------------- 命令行 -----------------
+def main(argv: List[str]) -> int:
+    parser = argparse.ArgumentParser(prog="python -m ibmm-dev build",
+                                     description="Render every graph module to a static Mermaid/HTML site")
+    parser.add_argument("entry", nargs="?", default=None,
+                        help="Directory of graph modules (default: ./graphs)")
+    parser.add_argument("-o", "--output", default="site", help="Output directory. Default: site")
+    parser.add_argument("-j", "--jobs", type=int, default=0,
+                        help="Parallel render worker processes. Default: CPU count")
+    parser.add_argument("--watch", action="store_true", help="Rebuild incrementally whenever a file is saved")
+    args = parser.parse_args(argv)
+
+    ibmm = importlib.import_module("ibmm")
+    ibmm_pkg_dir = Path(ibmm.__file__).resolve().parent
+    try:
+        layout = resolve_layout(args.entry, ibmm_pkg_dir)
+    except FileNotFoundError as e:
+        print(f"[ibmm-dev] path not found: {e}")
+        return 1
+    if str(layout.docroot) not in sys.path:
+        sys.path.insert(0, str(layout.docroot))
+
+    builder = SiteBuilder(layout.docroot, layout.watch_root, ibmm_pkg_dir,
+                          Path(args.output).resolve(), jobs=args.jobs)
+    try:
+        if args.watch:
+            builder.watch()
+            return 0
+        return 1 if builder.build()["errors"] else 0
+    except KeyboardInterrupt:
+        print("\n[ibmm-dev] bye.")
+        return 0
+    finally:
+        builder.close()
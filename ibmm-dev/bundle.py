@@ -0,0 +1,120 @@
+# ibmm-dev/bundle.py
+"""
+Pyodide 载荷打包：ibmm 包 + 目标图（及其 import / +___.X 依赖的图、所在包的 __init__.py）
+打成一个确定性的 zip，文件名取内容哈希，PyScript 一次 fetch 即可解压到工作目录。
+
+- 服务器：/bundle?graph=<module> 返回当前 zip 的 URL，/bundles/<hash>.zip 以长期缓存头提供；
+- 静态托管：python -m ibmm-dev bundle <dir> -o <docroot>/bundles 预先生成 zip 与 bundles.json。
+"""
+from __future__ import annotations
+import argparse, hashlib, importlib, io, json, os, re, threading, zipfile
+from collections import OrderedDict
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+from .deps import DependencyIndex
+from .paths import resolve_layout
+
+BUNDLE_MANIFEST = "bundles.json"
+BUNDLE_NAME = re.compile(r"^[0-9a-f]{16}\.zip$")
+IMMUTABLE = "public, max-age=31536000, immutable"
+_ZIP_EPOCH = (1980, 1, 1, 0, 0, 0)   # 固定时间戳：相同内容 -> 相同字节 -> 相同文件名
+
+def bundle_files(ibmm_pkg_dir: Path, docroot: Path, deps: DependencyIndex, graph: str) -> List[Tuple[str, Path]]:
+    """[(zip 内路径, 源文件)]，按 zip 内路径排序。"""
+    files: Dict[str, Path] = {}
+    for p in ibmm_pkg_dir.rglob("*.py"):
+        if "__pycache__" not in p.parts:
+            files[p.relative_to(ibmm_pkg_dir.parent).as_posix()] = p
+    table = deps.dependencies()
+    if graph not in table:
+        raise KeyError(graph)
+    mods = {graph, *table[graph][1]}
+    for mod in list(mods):
+        parts = mod.split(".")
+        mods.update(".".join(parts[:i] + ["__init__"]) for i in range(1, len(parts)))
+    for mod in mods:
+        if mod in table:
+            p = Path(table[mod][0])
+            files[p.resolve().relative_to(docroot.resolve()).as_posix()] = p
+    return sorted(files.items())
+
+def make_bundle(files: List[Tuple[str, Path]]) -> Tuple[str, bytes]:
+    """返回 (文件名, zip 字节)；文件名为内容哈希。"""
+    buf = io.BytesIO()
+    with zipfile.ZipFile(buf, "w", zipfile.ZIP_DEFLATED) as zf:
+        for arcname, path in files:
+            info = zipfile.ZipInfo(arcname, date_time=_ZIP_EPOCH)
+            info.compress_type = zipfile.ZIP_DEFLATED
+            info.external_attr = 0o644 << 16
+            zf.writestr(info, path.read_bytes())
+    data = buf.getvalue()
+    return hashlib.sha256(data).hexdigest()[:16] + ".zip", data
+
+class BundleCache:
+    """服务器端：按需打包，最近的若干个 zip 留在内存中（按文件名即内容哈希索引）。"""
+    def __init__(self, ibmm_pkg_dir: Path, docroot: Path, deps: DependencyIndex, max_entries: int = 32):
+        self.ibmm_pkg_dir = ibmm_pkg_dir
+        self.docroot = docroot
+        self.deps = deps
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._zips: "OrderedDict[str, bytes]" = OrderedDict()
+
+    def bundle(self, graph: str) -> str:
+        """打包 graph，返回 zip 文件名；graph 不存在时抛 KeyError。"""
+        name, data = make_bundle(bundle_files(self.ibmm_pkg_dir, self.docroot, self.deps, graph))
+        with self._lock:
+            self._zips[name] = data
+            self._zips.move_to_end(name)
+            while len(self._zips) > self.max_entries:
+                self._zips.popitem(last=False)
+        return name
+
+    def get(self, name: str) -> Optional[bytes]:
+        with self._lock:
+            return self._zips.get(name)
+
+# ----------------- 命令行 -----------------
+def main(argv: List[str]) -> int:
+    parser = argparse.ArgumentParser(prog="python -m ibmm-dev bundle",
+                                     description="Pack ibmm and each graph into a content-hashed zip for Pyodide")
+    parser.add_argument("entry", nargs="?", default=None,
+                        help="Directory of graph modules (default: ./graphs)")
+    parser.add_argument("-o", "--output", default=None,
+                        help="Output directory (default: <docroot>/bundles, next to index.html)")
+    args = parser.parse_args(argv)
+
+    ibmm = importlib.import_module("ibmm")
+    ibmm_pkg_dir = Path(ibmm.__file__).resolve().parent
+    try:
+        layout = resolve_layout(args.entry, ibmm_pkg_dir)
+    except FileNotFoundError as e:
+        print(f"[ibmm-dev] path not found: {e}")
+        return 1
+    out_dir = Path(args.output).resolve() if args.output else layout.docroot / "bundles"
+    out_dir.mkdir(parents=True, exist_ok=True)
+
+    deps = DependencyIndex(layout.docroot, layout.watch_root)
+    graphs: Dict[str, str] = {}
+    for mod in sorted(deps.dependencies()):
+        if mod.endswith("__init__"):
+            continue
+        name, data = make_bundle(bundle_files(ibmm_pkg_dir, layout.docroot, deps, mod))
+        if not (out_dir / name).exists():
+            tmp = out_dir / (name + ".tmp")
+            tmp.write_bytes(data)
+            os.replace(tmp, out_dir / name)
+        graphs[mod] = name
+        print(f"[ibmm-dev] bundle : {mod} -> {name} ({len(data) / 1024:.1f} KiB)")
+
+    manifest = json.dumps({"version": 1, "graphs": graphs}, ensure_ascii=False, indent=2) + "\n"
+    tmp = out_dir / (BUNDLE_MANIFEST + ".tmp")
+    tmp.write_text(manifest, encoding="utf-8")
+    os.replace(tmp, out_dir / BUNDLE_MANIFEST)
+    # 清理不再被引用的旧 zip
+    for p in out_dir.iterdir():
+        if BUNDLE_NAME.match(p.name) and p.name not in graphs.values():
+            p.unlink()
+    print(f"[ibmm-dev] bundle : {len(graphs)} bundles -> {out_dir}")
+    return 0
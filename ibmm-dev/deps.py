@@ -0,0 +1,197 @@
+# ibmm-dev/deps.py
+"""
+图模块之间的依赖（静态分析，不导入模块）：
+
+- import / from ... import 引用的其他图模块；
+- 一元加号关系 +___.A.B / +supports.A.B / +X.___("标签").A.B / +___["A.B"] 的根名 A，
+  指向“顶层定义了 class A 的模块”（路径在 resolve_all 时跨模块解析）。
+
+文件改动后，据此求出“直接改动的模块 + 所有（传递）依赖它的模块”，SSE 只通知这些模块。
+"""
+from __future__ import annotations
+import ast, threading
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+from .paths import list_py_files, to_module
+
+@dataclass
+class ModuleInfo:
+    defines: Set[str] = field(default_factory=set)   # 顶层类名
+    refs: Set[str] = field(default_factory=set)      # 关系路径的根名
+    imports: Set[str] = field(default_factory=set)   # 导入的模块全名（含可能的 "包.名字"）
+
+def _chain(node: ast.AST) -> Optional[List[Tuple[str, str]]]:
+    """把 a.b("x").c["d.e"] 展平为 [("name","a"),("attr","b"),("call",""),("attr","c"),("path","d.e")]。"""
+    out: List[Tuple[str, str]] = []
+    while True:
+        if isinstance(node, ast.Attribute):
+            out.append(("attr", node.attr))
+            node = node.value
+        elif isinstance(node, ast.Call):
+            out.append(("call", ""))
+            node = node.func
+        elif isinstance(node, ast.Subscript):
+            key = node.slice
+            if isinstance(key, ast.Constant) and isinstance(key.value, str):
+                out.append(("path", key.value))
+            node = node.value
+        elif isinstance(node, ast.Name):
+            out.append(("name", node.id))
+            out.reverse()
+            return out
+        else:
+            return None
+
+def _relation_names(tree: ast.Module) -> Set[str]:
+    """'___'、从 ibmm 导入的小写名字（supports/opposes/...）、define_relation(...) 的赋值目标。"""
+    names = {"___"}
+    for node in ast.walk(tree):
+        if isinstance(node, ast.ImportFrom) and (node.module or "").split(".")[0] == "ibmm":
+            names.update((a.asname or a.name) for a in node.names if a.name.islower())
+        elif isinstance(node, ast.Assign) and isinstance(node.value, ast.Call):
+            f = node.value.func
+            fname = f.id if isinstance(f, ast.Name) else getattr(f, "attr", None)
+            if fname == "define_relation":
+                names.update(t.id for t in node.targets if isinstance(t, ast.Name))
+    return names
+
+def _resolve_import(module: str, is_pkg: bool, node: ast.ImportFrom) -> Optional[str]:
+    if not node.level:
+        return node.module
+    parts = module.split(".")
+    base = parts if is_pkg else parts[:-1]
+    if node.level > 1:
+        base = base[:len(base) - (node.level - 1)]
+    return ".".join(base + ([node.module] if node.module else [])) or None
+
+def scan_source(source: str, module: str, is_pkg: bool = False) -> ModuleInfo:
+    tree = ast.parse(source)
+    info = ModuleInfo()
+    info.defines = {n.name for n in tree.body if isinstance(n, ast.ClassDef)}
+    rels = _relation_names(tree)
+    for node in ast.walk(tree):
+        if isinstance(node, ast.Import):
+            info.imports.update(a.name for a in node.names)
+        elif isinstance(node, ast.ImportFrom):
+            mod = _resolve_import(module, is_pkg, node)
+            if mod:
+                info.imports.add(mod)
+                info.imports.update(f"{mod}.{a.name}" for a in node.names)
+        elif isinstance(node, ast.UnaryOp) and isinstance(node.op, ast.UAdd):
+            chain = _chain(node.operand)
+            if not chain:
+                continue
+            # 第一个关系名之后的第一段路径即根名；其间的 ___("标签") 调用跳过
+            for i, (kind, name) in enumerate(chain):
+                if kind in ("name", "attr") and name in rels:
+                    for kind2, name2 in chain[i + 1:]:
+                        if kind2 == "attr":
+                            info.refs.add(name2)
+                            break
+                        if kind2 == "path":
+                            info.refs.add(name2.split(".")[0])
+                            break
+                    break
+    return info
+
+class DependencyIndex:
+    """watch_root 下所有图模块的依赖信息；按 (mtime_ns, size) 缓存每个文件的分析结果。"""
+    def __init__(self, docroot: Path, watch_root: Path):
+        self.docroot = docroot
+        self.watch_root = watch_root
+        self._lock = threading.Lock()
+        self._files: Dict[str, Tuple[Tuple[int, int], str, ModuleInfo]] = {}   # path -> (stamp, module, info)
+        self._refresh()
+
+    def module_for(self, path: str) -> Optional[str]:
+        p = Path(path)
+        if p.suffix != ".py":
+            return None
+        return to_module(self.docroot, p)
+
+    def _refresh(self) -> Dict[str, ModuleInfo]:
+        seen = {}
+        for py in list_py_files(self.watch_root):
+            path = str(py)
+            try:
+                st = py.stat()
+            except OSError:
+                continue
+            stamp = (st.st_mtime_ns, st.st_size)
+            hit = self._files.get(path)
+            if hit and hit[0] == stamp:
+                seen[path] = hit
+                continue
+            mod = to_module(self.docroot, py)
+            if not mod:
+                continue
+            try:
+                info = scan_source(py.read_text(encoding="utf-8"), mod, py.name == "__init__.py")
+            except (SyntaxError, UnicodeDecodeError, ValueError):
+                info = hit[2] if hit else ModuleInfo()   # 保存到一半的语法错误：沿用上次的依赖
+            seen[path] = (stamp, mod, info)
+        self._files = seen
+        return {mod: info for _, mod, info in seen.values()}
+
+    @staticmethod
+    def _edges(infos: Dict[str, ModuleInfo], extra: Iterable[Tuple[str, ModuleInfo]] = ()
+               ) -> Dict[str, Set[str]]:
+        """模块 -> 它直接依赖的模块。extra 中的（旧）定义也参与根名匹配。"""
+        definers: Dict[str, Set[str]] = {}
+        for mod, info in list(infos.items()) + list(extra):
+            for name in info.defines:
+                definers.setdefault(name, set()).add(mod)
+        known = set(infos) | {m for m, _ in extra}
+        edges: Dict[str, Set[str]] = {}
+        for mod, info in infos.items():
+            targets = {m for m in info.imports if m in known}
+            for r in info.refs:
+                targets |= definers.get(r, set())
+            edges[mod] = targets - {mod}
+        return edges
+
+    @staticmethod
+    def _closure(edges: Dict[str, Set[str]], start: Iterable[str]) -> Set[str]:
+        out, todo = set(start), list(start)
+        while todo:
+            for d in edges.get(todo.pop(), ()):
+                if d not in out:
+                    out.add(d)
+                    todo.append(d)
+        return out
+
+    def dependencies(self) -> Dict[str, Tuple[str, List[str]]]:
+        """模块 -> (源文件路径, 传递依赖的模块列表，不含自身)。"""
+        with self._lock:
+            infos = self._refresh()
+            paths = {mod: path for path, (_, mod, _) in self._files.items()}
+        edges = self._edges(infos)
+        return {mod: (paths[mod], sorted(self._closure(edges, [mod]) - {mod})) for mod in infos}
+
+    def module_map(self) -> Dict[str, str]:
+        """顶层类名 -> 定义它的模块（供 ibmm.set_module_map 按需导入）；多处定义的名字不收录。"""
+        with self._lock:
+            infos = self._refresh()
+        seen: Dict[str, Set[str]] = {}
+        for mod, info in infos.items():
+            for name in info.defines:
+                seen.setdefault(name, set()).add(mod)
+        return {name: next(iter(mods)) for name, mods in seen.items() if len(mods) == 1}
+
+    def affected(self, changed_paths: Iterable[str]) -> Tuple[List[str], List[str]]:
+        """
+        返回 (直接改动的模块, 改动模块 + 传递依赖它们的模块)。
+        已删除文件的旧定义也参与匹配，使引用它的模块得到通知。
+        """
+        with self._lock:
+            old = {mod: info for _, mod, info in self._files.values()}
+            infos = self._refresh()
+        changed = {m for m in (self.module_for(p) for p in changed_paths) if m}
+        edges = self._edges(infos, [(m, old[m]) for m in changed if m in old])
+        dependents: Dict[str, Set[str]] = {}
+        for mod, targets in edges.items():
+            for t in targets:
+                dependents.setdefault(t, set()).add(mod)
+        return sorted(changed), sorted(self._closure(dependents, changed))
@@ -0,0 +1,152 @@
+# ibmm-dev/httpcache.py
+"""
+内存中的响应表示缓存：内容哈希强 ETag + 预压缩（gzip / 可选 brotli）副本。
+每种编码的字节不同，各有自己的强 ETag（"<哈希>"、"<哈希>-gz"、"<哈希>-br"）；条件请求匹配其中任何一个。
+
+- 静态文件按 (mtime_ns, size) 失效，变化后重新读取、哈希、压缩；
+- 动态内容（/render 输出等）按内容哈希记忆压缩结果，相同输出不会重复压缩；
+- 两者都有总字节数上限，按 LRU 淘汰。
+"""
+from __future__ import annotations
+import gzip, hashlib, os, threading
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Dict, Optional
+
+try:  # 可选依赖：pip install brotli
+    import brotli
+except ImportError:  # pragma: no cover - 取决于环境
+    brotli = None
+
+MIN_COMPRESS = 1024          # 小于此字节数不压缩
+COMPRESSIBLE = ("text/", "application/json", "application/javascript", "application/xml",
+                "image/svg+xml", "application/wasm")
+ETAG_SUFFIX = {"gzip": "gz", "br": "br"}   # Content-Encoding -> ETag 后缀
+
+@dataclass
+class Representation:
+    body: bytes
+    etag: str                                             # 原文的强 ETag（含双引号）
+    encoded: Dict[str, bytes] = field(default_factory=dict)   # "br"/"gzip" -> 压缩后内容
+
+    def etag_for(self, enc: Optional[str]) -> str:
+        """按编码区分的强 ETag：enc=None 为原文，否则为 "<哈希>-gz" / "<哈希>-br"。"""
+        return self.etag if enc is None else f'{self.etag[:-1]}-{ETAG_SUFFIX[enc]}"'
+
+    @property
+    def nbytes(self) -> int:
+        return len(self.body) + sum(len(v) for v in self.encoded.values())
+
+def is_compressible(ctype: str) -> bool:
+    return ctype.startswith(COMPRESSIBLE)
+
+def content_etag(data: bytes) -> str:
+    return '"' + hashlib.blake2b(data, digest_size=16).hexdigest() + '"'
+
+def make_representation(data: bytes, ctype: str, *, best: bool = False,
+                        etag: Optional[str] = None) -> Representation:
+    """计算强 ETag，并为可压缩内容生成 gzip / br 副本（仅当确实更小）。"""
+    rep = Representation(data, etag or content_etag(data))
+    if len(data) >= MIN_COMPRESS and is_compressible(ctype):
+        gz = gzip.compress(data, compresslevel=9 if best else 6, mtime=0)
+        if len(gz) < len(data):
+            rep.encoded["gzip"] = gz
+        if brotli is not None:
+            br = brotli.compress(data, quality=11 if best else 5)
+            if len(br) < len(data):
+                rep.encoded["br"] = br
+    return rep
+
+def parse_accept_encoding(header: Optional[str]) -> Dict[str, float]:
+    """'gzip, br;q=0.8' -> {"gzip": 1.0, "br": 0.8}"""
+    out: Dict[str, float] = {}
+    for part in (header or "").split(","):
+        token, _, params = part.strip().partition(";")
+        if not token:
+            continue
+        q = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try: q = float(params[2:])
+            except ValueError: q = 0.0
+        out[token.strip().lower()] = q
+    return out
+
+def choose_encoding(rep: Representation, accept_encoding: Optional[str]) -> Optional[str]:
+    """按客户端偏好挑选可用的压缩副本；都不可用时返回 None（原文）。"""
+    acc = parse_accept_encoding(accept_encoding)
+    best, best_q = None, 0.0
+    for enc in ("br", "gzip"):   # 同 q 时优先 br
+        q = acc.get(enc, acc.get("*", 0.0))
+        if enc in rep.encoded and q > best_q:
+            best, best_q = enc, q
+    return best
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """If-None-Match 是否命中原文 ETag etag 或它的任一编码变体（内容相同，只是传输编码不同）。"""
+    if not if_none_match:
+        return False
+    variants = {etag} | {f'{etag[:-1]}-{s}"' for s in ETAG_SUFFIX.values()}
+    for tag in if_none_match.split(","):
+        tag = tag.strip()
+        if tag.startswith("W/"):
+            tag = tag[2:]
+        if tag == "*" or tag in variants:
+            return True
+    return False
+
+class RepresentationCache:
+    def __init__(self, max_bytes: int = 64 * 1024 * 1024):
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._files: "OrderedDict[str, tuple]" = OrderedDict()          # path -> (mtime_ns, size, rep)
+        self._blobs: "OrderedDict[str, Representation]" = OrderedDict()  # etag -> rep
+        self._bytes = 0
+
+    @property
+    def nbytes(self) -> int:
+        with self._lock:
+            return self._bytes
+
+    def _evict(self):
+        while self._bytes > self.max_bytes and (self._files or self._blobs):
+            # 先淘汰动态内容，再淘汰静态文件
+            if self._blobs:
+                _, rep = self._blobs.popitem(last=False)
+            else:
+                _, (_, _, rep) = self._files.popitem(last=False)
+            self._bytes -= rep.nbytes
+
+    def for_file(self, path: str, ctype: str) -> Representation:
+        st = os.stat(path)
+        with self._lock:
+            hit = self._files.get(path)
+            if hit and hit[0] == st.st_mtime_ns and hit[1] == st.st_size:
+                self._files.move_to_end(path)
+                return hit[2]
+        with open(path, "rb") as f:
+            data = f.read()
+        rep = make_representation(data, ctype, best=True)
+        with self._lock:
+            old = self._files.pop(path, None)
+            if old:
+                self._bytes -= old[2].nbytes
+            self._files[path] = (st.st_mtime_ns, st.st_size, rep)
+            self._bytes += rep.nbytes
+            self._evict()
+        return rep
+
+    def for_bytes(self, data: bytes, ctype: str) -> Representation:
+        etag = content_etag(data)
+        with self._lock:
+            rep = self._blobs.get(etag)
+            if rep is not None:
+                self._blobs.move_to_end(etag)
+                return rep
+        rep = make_representation(data, ctype, etag=etag)
+        with self._lock:
+            if etag not in self._blobs:
+                self._blobs[etag] = rep
+                self._bytes += rep.nbytes
+                self._evict()
+        return rep
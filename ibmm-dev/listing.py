@@ -0,0 +1,120 @@
+# ibmm-dev/listing.py
+"""
+/list 的缓存：图模块清单 + 每个模块的统计（节点/边数、kind 分布、最近构建时间）。
+
+- 模块清单只在监听到新增/删除文件时重新扫描；
+- 统计由后台线程通过渲染后端（默认是工作进程池）计算，服务器进程不导入图模块；
+- 文件改动让对应模块及（传递）依赖它的模块的统计失效；ibmm 包改动则全部失效；
+- 统计按监听事件序号（seq）区分源码版本，不再每次遍历目录求签名。
+"""
+from __future__ import annotations
+import queue, threading
+from pathlib import Path
+from typing import Dict, List, Optional
+
+from .deps import DependencyIndex
+from .paths import list_py_files, to_module
+
+class GraphListing:
+    def __init__(self, docroot: Path, watch_root: Path, ibmm_pkg_dir: Path, backend, watcher,
+                 concurrency: int = 1):
+        self.docroot = docroot
+        self.watch_root = watch_root
+        self.ibmm_pkg_dir = ibmm_pkg_dir
+        self.backend = backend
+        self.deps = DependencyIndex(docroot, watch_root)
+        self._lock = threading.Lock()
+        self._entries: Dict[str, dict] = {}      # module -> {"module","file","path","stats","ver"}
+        self._todo: queue.Queue = queue.Queue()
+        self._queued: set = set()
+        self._events = watcher.subscribe()
+        self._sig = watcher.seq
+        self._rescan()
+        threading.Thread(target=self._event_loop, name="ibmm-dev-listing", daemon=True).start()
+        for i in range(max(1, concurrency)):
+            threading.Thread(target=self._stats_loop, name=f"ibmm-dev-stats-{i}", daemon=True).start()
+
+    # ---------- 读取 ----------
+    def entries(self) -> List[dict]:
+        """按模块名排序的条目副本（stats 为 None 表示尚在计算）。"""
+        with self._lock:
+            return [
+                {"module": e["module"], "file": e["file"], "stats": e["stats"]}
+                for _, e in sorted(self._entries.items())
+            ]
+
+    @property
+    def pending(self) -> int:
+        with self._lock:
+            return sum(1 for e in self._entries.values() if e["stats"] is None)
+
+    # ---------- 维护 ----------
+    def _rescan(self):
+        found = {}
+        for py in list_py_files(self.watch_root):
+            if py.name == "__init__.py":
+                continue
+            mod = to_module(self.docroot, py)
+            if mod:   # 不在 docroot 下则跳过（正常不会发生）
+                found[mod] = py
+        with self._lock:
+            for mod in list(self._entries):
+                if mod not in found:
+                    del self._entries[mod]
+            for mod, py in found.items():
+                if mod not in self._entries:
+                    self._entries[mod] = {
+                        "module": mod, "file": str(py.relative_to(self.watch_root)),
+                        "path": str(py.resolve()), "stats": None, "ver": 0,
+                    }
+                    self._enqueue(mod)
+
+    def _enqueue(self, mod: str):
+        # 调用方持有 self._lock
+        if mod not in self._queued:
+            self._queued.add(mod)
+            self._todo.put(mod)
+
+    def invalidate(self, modules: Optional[List[str]] = None):
+        """让指定模块（None=全部）的统计失效并重新排队计算。"""
+        with self._lock:
+            for mod in (self._entries if modules is None else modules):
+                e = self._entries.get(mod)
+                if e is None: continue
+                e["stats"] = None
+                e["ver"] += 1
+                self._enqueue(mod)
+
+    def _event_loop(self):
+        ibmm_dir = self.ibmm_pkg_dir.resolve()
+        while True:
+            ev = self._events.get()
+            self._sig = ev["seq"]
+            paths = ev["added"] + ev["modified"] + ev["removed"]
+            in_ibmm = {p: Path(p).resolve().is_relative_to(ibmm_dir) for p in paths}
+            if any(in_ibmm.values()):
+                self.invalidate(None)
+            if ev["added"] or ev["removed"]:
+                self._rescan()
+            # 改动的模块 + 通过 import / +___.X 引用（传递）依赖它们的模块
+            _, mods = self.deps.affected([p for p in paths if not in_ibmm[p]])
+            if mods:
+                self.invalidate(mods)
+
+    def _stats_loop(self):
+        while True:
+            mod = self._todo.get()
+            with self._lock:
+                self._queued.discard(mod)
+                e = self._entries.get(mod)
+                if e is None or e["stats"] is not None:
+                    continue
+                ver = e["ver"]
+            try:
+                stats = self.backend.stats(mod, self._sig)
+            except Exception as ex:
+                stats = {"error": f"{type(ex).__name__}: {ex}"}
+            with self._lock:
+                e = self._entries.get(mod)
+                if e is not None and e["ver"] == ver:
+                    e["stats"] = stats
@@ -0,0 +1,160 @@
+# ibmm-dev/metrics.py
+"""
+进程内指标：计数器、直方图与采集时现算的 gauge，导出为 Prometheus 文本格式或 JSON（/metrics）。
+
+只依赖标准库；所有方法线程安全，asyncio 版与线程版服务器共用一个实例。
+"""
+from __future__ import annotations
+import bisect, threading, time
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterator, List, Tuple
+
+# 秒级延迟的直方图桶（与 Prometheus 客户端库的默认桶相近，补了更细的低端）
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+Labels = Tuple[Tuple[str, str], ...]
+
+def _labels(kw: Dict[str, object]) -> Labels:
+    return tuple(sorted((k, str(v)) for k, v in kw.items()))
+
+def _fmt_labels(labels: Labels, extra: Tuple[Tuple[str, str], ...] = ()) -> str:
+    items = labels + extra
+    if not items:
+        return ""
+    esc = lambda v: v.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+    return "{" + ",".join(f'{k}="{esc(v)}"' for k, v in items) + "}"
+
+def _fmt_num(v: float) -> str:
+    if v == float("inf"):
+        return "+Inf"
+    return repr(float(v)) if isinstance(v, float) else str(v)
+
+class _Histogram:
+    __slots__ = ("counts", "sum", "count")
+    def __init__(self, nbuckets: int):
+        self.counts = [0] * nbuckets   # 非累积；导出时累加
+        self.sum = 0.0
+        self.count = 0
+
+class Metrics:
+    def __init__(self, buckets: Tuple[float, ...] = DEFAULT_BUCKETS):
+        self.buckets = tuple(buckets)
+        self.started = time.time()
+        self._lock = threading.Lock()
+        self._help: Dict[str, Tuple[str, str]] = {}                     # name -> (type, help)
+        self._counters: Dict[str, Dict[Labels, float]] = {}
+        self._gauges: Dict[str, Dict[Labels, float]] = {}
+        self._hists: Dict[str, Dict[Labels, _Histogram]] = {}
+        self._collectors: List[Callable[[], Dict[str, Dict[Labels, float]]]] = []
+
+    # ---------- 声明 ----------
+    def describe(self, name: str, kind: str, help_text: str) -> None:
+        """kind: counter / gauge / histogram；未声明的指标导出时没有 HELP 行。"""
+        self._help[name] = (kind, help_text)
+
+    def collector(self, fn: Callable[[], Dict[str, Dict[Labels, float]]]) -> None:
+        """采集时调用 fn()，返回 {gauge 名: {labels: 值}}（如订阅者数、缓存大小）。"""
+        self._collectors.append(fn)
+
+    # ---------- 记录 ----------
+    def inc(self, name: str, value: float = 1, **labels) -> None:
+        key = _labels(labels)
+        with self._lock:
+            series = self._counters.setdefault(name, {})
+            series[key] = series.get(key, 0) + value
+
+    def set(self, name: str, value: float, **labels) -> None:
+        with self._lock:
+            self._gauges.setdefault(name, {})[_labels(labels)] = value
+
+    def add(self, name: str, value: float, **labels) -> None:
+        """gauge 增减（如当前 SSE 连接数）。"""
+        key = _labels(labels)
+        with self._lock:
+            series = self._gauges.setdefault(name, {})
+            series[key] = series.get(key, 0) + value
+
+    def observe(self, name: str, seconds: float, **labels) -> None:
+        key = _labels(labels)
+        with self._lock:
+            series = self._hists.setdefault(name, {})
+            h = series.get(key)
+            if h is None:
+                h = series[key] = _Histogram(len(self.buckets) + 1)
+            h.counts[bisect.bisect_left(self.buckets, seconds)] += 1
+            h.sum += seconds
+            h.count += 1
+
+    @contextmanager
+    def time(self, name: str, **labels) -> Iterator[None]:
+        t0 = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(name, time.perf_counter() - t0, **labels)
+
+    # ---------- 导出 ----------
+    def _snapshot(self):
+        gauges: Dict[str, Dict[Labels, float]] = {}
+        for fn in self._collectors:
+            for name, series in fn().items():
+                gauges.setdefault(name, {}).update(series)
+        with self._lock:
+            for name, series in self._gauges.items():
+                gauges.setdefault(name, {}).update(series)
+            counters = {n: dict(s) for n, s in self._counters.items()}
+            hists = {n: {k: (list(h.counts), h.sum, h.count) for k, h in s.items()}
+                     for n, s in self._hists.items()}
+        gauges.setdefault("ibmm_dev_uptime_seconds", {})[()] = time.time() - self.started
+        return counters, gauges, hists
+
+    def to_prometheus(self) -> str:
+        counters, gauges, hists = self._snapshot()
+        out: List[str] = []
+        def head(name: str, kind: str):
+            help_text = self._help.get(name, (kind, ""))[1]
+            if help_text:
+                out.append(f"# HELP {name} {help_text}")
+            out.append(f"# TYPE {name} {kind}")
+        for name in sorted(counters):
+            head(name, "counter")
+            for labels, v in sorted(counters[name].items()):
+                out.append(f"{name}{_fmt_labels(labels)} {_fmt_num(v)}")
+        for name in sorted(gauges):
+            head(name, "gauge")
+            for labels, v in sorted(gauges[name].items()):
+                out.append(f"{name}{_fmt_labels(labels)} {_fmt_num(v)}")
+        for name in sorted(hists):
+            head(name, "histogram")
+            for labels, (counts, total, n) in sorted(hists[name].items()):
+                acc = 0
+                for le, c in zip(self.buckets + (float("inf"),), counts):
+                    acc += c
+                    out.append(f"{name}_bucket{_fmt_labels(labels, (('le', _fmt_num(le)),))} {acc}")
+                out.append(f"{name}_sum{_fmt_labels(labels)} {_fmt_num(total)}")
+                out.append(f"{name}_count{_fmt_labels(labels)} {n}")
+        return "\n".join(out) + "\n"
+
+    def to_json(self) -> dict:
+        """{counters, gauges, histograms}；直方图给出 count/sum/mean 与按桶估计的 p50/p90/p99。"""
+        counters, gauges, hists = self._snapshot()
+        def rows(series):
+            return [{"labels": dict(k), "value": v} for k, v in sorted(series.items())]
+        def quantile(counts: List[int], n: int, q: float) -> float:
+            rank, acc = q * n, 0
+            for le, c in zip(self.buckets + (float("inf"),), counts):
+                acc += c
+                if acc >= rank:
+                    return le if le != float("inf") else self.buckets[-1]
+            return self.buckets[-1]
+        hout = {}
+        for name, series in sorted(hists.items()):
+            hout[name] = [{
+                "labels": dict(k), "count": n, "sum": total, "mean": total / n if n else 0.0,
+                "p50": quantile(counts, n, 0.5), "p90": quantile(counts, n, 0.9), "p99": quantile(counts, n, 0.99),
+            } for k, (counts, total, n) in sorted(series.items())]
+        return {
+            "counters": {n: rows(s) for n, s in sorted(counters.items())},
+            "gauges": {n: rows(s) for n, s in sorted(gauges.items())},
+            "histograms": hout,
+        }
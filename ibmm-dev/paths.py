@@ -0,0 +1,68 @@
+# ibmm-dev/paths.py
+from __future__ import annotations
+import os
+from pathlib import Path
+from typing import NamedTuple, Optional
+
+def common_docroot(paths):
+    """返回多个路径的公共上层目录 Path."""
+    paths = [str(Path(p).resolve()) for p in paths]
+    return Path(os.path.commonpath(paths))
+
+def list_py_files(root: Path) -> list[Path]:
+    """递归列出 root 下的所有 .py（排除 __pycache__、隐藏目录）。"""
+    items = []
+    for p in root.rglob("*.py"):
+        if "__pycache__" in p.parts:
+            continue
+        items.append(p)
+    return sorted(items)
+
+def to_module(docroot: Path, file_path: Path) -> str | None:
+    """
+    将文件路径转为可用于 import 的模块名（基于 docroot）。
+    若 file 不在 docroot 下，则返回 None。
+    """
+    try:
+        rel = file_path.resolve().relative_to(docroot.resolve())
+    except ValueError:
+        return None
+    mod = str(rel).replace(os.sep, ".")
+    if mod.endswith(".py"): mod = mod[:-3]
+    return mod
+
+class Layout(NamedTuple):
+    watch_root: Path
+    graph_file: Optional[Path]
+    docroot: Path
+    index_html: Optional[Path]
+
+def resolve_layout(entry: str | None, ibmm_pkg_dir: Path) -> Layout:
+    """
+    entry:
+      - None           : 遍历 ./graphs
+      - 指向目录的路径 : 遍历该目录
+      - 指向文件的路径 : 支持，但仍遍历所在目录
+    静态根目录（docroot）需要覆盖 index.html、ibmm 包目录、watch_root：
+    若 index.html 位于 watch_root，则优先用它所在目录作为 docroot；否则取公共上层目录。
+    路径不存在时抛 FileNotFoundError。
+    """
+    graph_file = None
+    if not entry:
+        watch_root = Path("graphs").resolve()
+    else:
+        p = Path(entry).resolve()
+        if p.is_dir():
+            watch_root = p
+        elif p.is_file():
+            graph_file = p
+            watch_root = p.parent
+        else:
+            raise FileNotFoundError(p)
+
+    idx_candidate = watch_root / "index.html"
+    if idx_candidate.exists():
+        return Layout(watch_root, graph_file, watch_root, idx_candidate)
+    docroot = common_docroot([watch_root, ibmm_pkg_dir.parent])
+    idx = docroot / "index.html"
+    return Layout(watch_root, graph_file, docroot, idx if idx.exists() else None)
@@ -0,0 +1,149 @@
+# ibmm-dev/pool.py
+"""
+渲染工作进程池：图模块只在工作进程中导入，服务器进程的 REGISTRY 保持干净。
+
+- 每个 worker 是独立进程（spawn），每次构建前 reset_registry 并清掉 watch_root 下的模块，
+  因此不同图之间不会互相污染，也没有 importlib.reload 残留的旧节点/代理；
+- 同一张图优先路由到固定 worker（复用其已构建的图），该 worker 忙时改用空闲 worker，
+  所以一张图的热重载不会阻塞其他图的渲染；
+- ibmm 包本身有改动时由服务器按监听事件调用 recycle() 整体回收 worker（旧进程处理完手头请求后退出），
+  请求路径上不轮询 ibmm 目录。
+"""
+from __future__ import annotations
+import multiprocessing, sys, threading, zlib
+from concurrent.futures import ProcessPoolExecutor, TimeoutError as FutureTimeout
+from concurrent.futures.process import BrokenProcessPool
+from pathlib import Path
+from typing import List
+
+from .render import (build_graph, export_graph, node_names, search_graph, graph_stats,
+                     profile_graph)
+
+# ----------------- 工作进程侧 -----------------
+_W = {"docroot": None, "watch_root": None}
+
+def _w_init(docroot: str, watch_root: str, sys_path: List[str]):
+    for p in reversed(sys_path):
+        if p not in sys.path:
+            sys.path.insert(0, p)
+    _W["docroot"], _W["watch_root"] = Path(docroot), Path(watch_root)
+
+def _w_build(graph: str, sig: int):
+    return build_graph(_W["docroot"], _W["watch_root"], graph, sig)
+
+def _w_render(graph: str, view: str, subgraphs: List[str], sig: int) -> str:
+    return export_graph(view, subgraphs, _w_build(graph, sig))
+
+def _w_nodes(graph: str, sig: int) -> List[str]:
+    return node_names(_w_build(graph, sig))
+
+def _w_search(graph: str, query: str, limit: int, sig: int) -> List[dict]:
+    return search_graph(query, limit, _w_build(graph, sig))
+
+def _w_stats(graph: str, sig: int) -> dict:
+    return graph_stats(_W["docroot"], _W["watch_root"], graph, sig)
+
+def _w_profile(graph: str, view: str, subgraphs: List[str], top: int, sort: str) -> dict:
+    return profile_graph(_W["docroot"], _W["watch_root"], graph, view, subgraphs, top, sort)
+
+def _w_ping() -> bool:
+    return True
+
+# ----------------- 服务器侧 -----------------
+class _Worker:
+    """单进程执行器 + 在途请求计数。"""
+    def __init__(self, initargs: tuple):
+        ctx = multiprocessing.get_context("spawn")
+        self.executor = ProcessPoolExecutor(max_workers=1, mp_context=ctx,
+                                            initializer=_w_init, initargs=initargs)
+        self.inflight = 0
+
+    def stop(self, kill: bool = False):
+        """关闭执行器；kill=True 时同时终止仍在运行的进程（如超时卡住的构建）。"""
+        procs = list((getattr(self.executor, "_processes", None) or {}).values())
+        self.executor.shutdown(wait=False, cancel_futures=kill)
+        if kill:
+            for p in procs:
+                p.terminate()
+
+class RenderPool:
+    """与 render.InProcessRenderer 同接口：render / nodes / search / stats / profile / recycle / shutdown。"""
+    def __init__(self, docroot: Path, watch_root: Path, workers: int = 2, timeout: float = 60.0):
+        self.docroot = docroot
+        self.watch_root = watch_root
+        self.size = max(1, workers)
+        self.timeout = timeout
+        self.generation = 0
+        self._lock = threading.Lock()
+        self._initargs = (str(docroot), str(watch_root), list(sys.path))
+        self._workers = [_Worker(self._initargs) for _ in range(self.size)]
+        # 预热：让 worker 进程尽早启动并导入 ibmm
+        for w in self._workers:
+            w.executor.submit(_w_ping)
+
+    def recycle(self):
+        """ibmm 包改动 → 换一批新 worker（由监听事件触发）。"""
+        with self._lock:
+            if not self._workers:   # 已 shutdown
+                return
+            old, self._workers = self._workers, [_Worker(self._initargs) for _ in range(self.size)]
+            self.generation += 1
+        for w in old:
+            w.stop()
+
+    def _replace(self, w: _Worker, kill: bool = False):
+        with self._lock:
+            if w in self._workers:
+                self._workers[self._workers.index(w)] = _Worker(self._initargs)
+        w.stop(kill)
+
+    def _pick(self, graph: str) -> _Worker:
+        with self._lock:
+            home = self._workers[zlib.crc32(graph.encode("utf-8")) % self.size]
+            if home.inflight:
+                idle = [w for w in self._workers if not w.inflight]
+                if idle:
+                    home = idle[0]
+            home.inflight += 1
+            return home
+
+    def _call(self, graph: str, fn, *args):
+        w = self._pick(graph)
+        try:
+            return w.executor.submit(fn, *args).result(timeout=self.timeout)
+        except BrokenProcessPool:
+            self._replace(w)    # 图模块把进程搞崩（如 sys.exit / 段错误）：换一个新 worker
+            raise
+        except FutureTimeout:
+            # 进程仍在执行卡住的任务：若只递减 inflight，_pick 会把它当空闲，新请求排到它后面
+            self._replace(w, kill=True)
+            raise
+        finally:
+            with self._lock:
+                w.inflight -= 1
+
+    def render(self, graph: str, view: str, subgraphs: List[str], sig: int) -> str:
+        return self._call(graph, _w_render, graph, view, subgraphs, sig)
+
+    def nodes(self, graph: str, sig: int) -> List[str]:
+        return self._call(graph, _w_nodes, graph, sig)
+
+    def search(self, graph: str, query: str, limit: int, sig: int) -> List[dict]:
+        return self._call(graph, _w_search, graph, query, limit, sig)
+
+    def stats(self, graph: str, sig: int) -> dict:
+        return self._call(graph, _w_stats, graph, sig)
+
+    def profile(self, graph: str, view: str, subgraphs: List[str], top: int, sort: str) -> dict:
+        return self._call(graph, _w_profile, graph, view, subgraphs, top, sort)
+
+    @property
+    def inflight(self) -> int:
+        with self._lock:
+            return sum(w.inflight for w in self._workers)
+
+    def shutdown(self):
+        with self._lock:
+            workers, self._workers = self._workers, []
+        for w in workers:
+            w.executor.shutdown(wait=False, cancel_futures=True)
@@ -0,0 +1,289 @@
+# ibmm-dev/render.py
+"""
+服务端构建与渲染：在 CPython 中导入图模块、导出 Mermaid 文本，
+结果按源码签名缓存，源码不变时直接返回。
+"""
+from __future__ import annotations
+import cProfile, importlib, os, pstats, sys, threading, time
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+from .deps import DependencyIndex
+from .watcher import snapshot_paths
+
+# 与 index.html 中一致的默认样式
+NODE_STYLES = {
+    "issue":    "fill:#fff2cc,stroke:#cc7a00,stroke-width:1.5px;",
+    "position": "fill:#eafff5,stroke:#148f55,stroke-width:1.5px;",
+    "pro":      "fill:#f0fff4,stroke:#22c55e,stroke-width:1px;",
+    "con":      "fill:#fff1f2,stroke:#ef4444,stroke-width:1px;",
+}
+EDGE_STYLES = {
+    "supports": "color:green,stroke:green,stroke-width:2px;",
+    "opposes":  "color:red,stroke:red,stroke-width:2px;",
+    "answers":  "color:blue,stroke:blue,stroke-width:2px;",
+    "relates":  "color:gray,stroke:gray,stroke-width:2px, stroke-dasharray: 2 2;",
+}
+VIEWS = ("flowchart", "mindmap")
+
+def compute_sig_for_dirs(dirs: List[Path], extra_files: List[Path] | None = None) -> int:
+    """由多个目录/文件的 per-file stat 快照计算变化签名（新增/删除/修改都会改变签名）。"""
+    return hash(frozenset(snapshot_paths(dirs, extra_files).items()))
+
+# ----------------- 进程内构建 -----------------
+# 全局 REGISTRY 是进程级共享的，构建必须持有该锁；构建完成后冻结为快照，连同最近构建的其他图
+# 整体替换 _PUBLISHED（每张图只留最新签名，最多 PUBLISHED_MAX 张，先进先出）。交替请求不同的图时
+# 不会互相挤掉；导出/搜索在快照上进行，不持锁（重建期间读者继续使用旧快照）
+BUILD_LOCK = threading.Lock()
+PUBLISHED_MAX = 8
+_PUBLISHED: Dict[str, Tuple[int, Any]] = {}   # graph -> (sig, ibmm.core.Snapshot)；只整体替换，不原地修改
+_DEPS: Dict[Tuple[str, str], DependencyIndex] = {}
+
+def _evict_modules_under(root: Path):
+    """从 sys.modules 中移除位于 root 下的模块，使下次 import 重新执行装饰器。"""
+    root = root.resolve()
+    for name, m in list(sys.modules.items()):
+        f = getattr(m, "__file__", None)
+        if not f:
+            continue
+        try:
+            Path(f).resolve().relative_to(root)
+        except ValueError:
+            continue
+        del sys.modules[name]
+
+def build_graph(docroot: Path, watch_root: Path, graph: str, sig: Optional[int] = None,
+                use_cache: bool = True):
+    """
+    在服务器进程内构建图模块，返回 REGISTRY 冻结后的快照（已 resolve_all，已建全文索引）并发布为当前版本。
+    watch_root 下源码未变化时复用上次结果；调用方需持有 BUILD_LOCK。
+    use_cache=False：不复用上次结果也不读磁盘缓存，总是执行装饰器（供性能剖析）。
+    """
+    global _PUBLISHED
+    import ibmm
+    from ibmm.cache import load_graph
+    from ibmm.search import enable_search
+    if sig is None:
+        sig = compute_sig_for_dirs([watch_root])
+    snap = published(graph, sig)
+    if use_cache and snap is not None:
+        return snap
+    if str(docroot) not in sys.path:
+        sys.path.insert(0, str(docroot))
+    _evict_modules_under(watch_root)
+    ibmm.reset_registry()
+    enable_search(ibmm.REGISTRY)
+    # 被 +___.X 引用、但未被 import 的图在 resolve_all 时按需导入
+    key = (str(docroot), str(watch_root))
+    if key not in _DEPS:
+        _DEPS[key] = DependencyIndex(docroot, watch_root)
+    ibmm.set_module_map(_DEPS[key].module_map())
+    importlib.invalidate_caches()
+    # 源码（及其依赖、ibmm 版本）未变时从 __ibmmcache__ 恢复，不执行装饰器
+    load_graph(graph, use_cache=use_cache)
+    snap = ibmm.REGISTRY.freeze()
+    pub = {g: v for g, v in _PUBLISHED.items() if g != graph}
+    pub[graph] = (sig, snap)
+    _PUBLISHED = dict(list(pub.items())[-PUBLISHED_MAX:])
+    return snap
+
+def published(graph: str, sig: int):
+    """已发布且签名一致的 graph 快照，否则 None（无需持锁）。"""
+    hit = _PUBLISHED.get(graph)
+    return hit[1] if hit is not None and hit[0] == sig else None
+
+def export_graph(view: str, subgraphs: List[str], reg=None, edit_links: bool = True) -> str:
+    """
+    对快照 reg（默认当前 REGISTRY）导出 Mermaid 文本（与 index.html 的浏览器端渲染参数一致）。
+    edit_links=False：不带 edit/<路径>:<行号> 链接（静态站点：不泄露本机路径，也没有 /edit/ 路由）。
+    """
+    import ibmm
+    reg = reg if reg is not None else ibmm.REGISTRY
+    if view == "mindmap":
+        return ibmm.to_mermaid_mindmap(root=None, reg=reg)
+    return ibmm.to_mermaid_flowchart(
+        root=None,
+        include=("contains", "answers", "supports", "opposes", "relates"),
+        show_text=True,
+        node_styles=NODE_STYLES,
+        edge_styles=EDGE_STYLES,
+        subgraphs=[s for s in subgraphs if s in reg.nodes],
+        reg=reg,
+        edit_links=edit_links,
+    )
+
+def node_names(reg=None) -> List[str]:
+    """reg（默认当前 REGISTRY）中所有节点的 qualname（供 subgraph 选择器使用；从缓存恢复时没有类对象）。"""
+    import ibmm
+    return sorted((reg if reg is not None else ibmm.REGISTRY).nodes)
+
+def search_graph(query: str, limit: int, reg=None) -> List[dict]:
+    """在 reg（默认当前 REGISTRY）的全文索引上检索，返回可直接 JSON 化的结果。"""
+    import ibmm
+    from ibmm.search import search
+    reg = reg if reg is not None else ibmm.REGISTRY
+    out = []
+    for nid, score in search(query, limit, reg):
+        n = reg.nodes[nid]
+        out.append({
+            "id": nid, "title": n.title, "kind": n.kind, "score": round(score, 4),
+            "src_file": n.meta.get("src_file"), "src_line": n.meta.get("src_line"),
+        })
+    return out
+
+def graph_stats(docroot: Path, watch_root: Path, graph: str, sig: int) -> dict:
+    """
+    构建 graph 并统计“定义在该模块文件中”的节点/边数与 kind 分布（被导入的其他图不计入）。
+    构建失败时返回 {"error": ...}。
+    """
+    t0 = time.perf_counter()
+    try:
+        snap = build_graph(docroot, watch_root, graph, sig)
+    except Exception as e:
+        return {"error": f"{type(e).__name__}: {e}", "built_at": time.time()}
+    build_ms = (time.perf_counter() - t0) * 1e3
+    own_file = str((docroot / (graph.replace(".", os.sep) + ".py")).resolve())
+    own = {nid for nid, n in snap.nodes.items()
+           if n.meta.get("src_file") and os.path.realpath(n.meta["src_file"]) == own_file}
+    kinds: Dict[str, int] = {}
+    for nid in own:
+        k = snap.nodes[nid].kind
+        kinds[k] = kinds.get(k, 0) + 1
+    return {
+        "nodes": len(own),
+        "edges": sum(1 for e in snap.edges if e.src in own),
+        "kinds": dict(sorted(kinds.items())),
+        "build_ms": round(build_ms, 1),
+        "built_at": time.time(),
+    }
+
+PROFILE_SORTS = {"cumulative": 3, "tottime": 2, "ncalls": 1}   # -> pstats 元组 (cc, nc, tt, ct) 的下标
+
+def profile_graph(docroot: Path, watch_root: Path, graph: str, view: str, subgraphs: List[str],
+                  top: int = 40, sort: str = "cumulative") -> dict:
+    """
+    用 cProfile 跑一次完整构建（跳过所有缓存）+ 导出，返回可 JSON 化的结果：
+    各阶段耗时与按 sort 排序的前 top 个函数。调用方需持有 BUILD_LOCK。
+    """
+    sig = compute_sig_for_dirs([watch_root])
+    prof = cProfile.Profile()
+    t0 = time.perf_counter()
+    prof.enable()
+    try:
+        snap = build_graph(docroot, watch_root, graph, sig, use_cache=False)
+        t1 = time.perf_counter()
+        out = export_graph(view, subgraphs, snap)
+    finally:
+        prof.disable()
+    t2 = time.perf_counter()
+    stats = pstats.Stats(prof).stats
+    key = PROFILE_SORTS[sort]
+    rows = sorted(stats.items(), key=lambda kv: kv[1][key], reverse=True)[:top]
+    return {
+        "graph": graph, "view": view, "sort": sort,
+        "build_ms": round((t1 - t0) * 1e3, 2), "export_ms": round((t2 - t1) * 1e3, 2),
+        "output_bytes": len(out.encode("utf-8")),
+        "calls": sum(v[1] for v in stats.values()),
+        "functions": [{
+            "file": file, "line": line, "function": func, "ncalls": nc, "primcalls": cc,
+            "tottime": round(tt, 6), "cumtime": round(ct, 6),
+        } for (file, line, func), (cc, nc, tt, ct, _) in rows],
+    }
+
+class InProcessRenderer:
+    """
+    在服务器进程内构建（--workers 0）。只有构建串行化在 BUILD_LOCK 上；导出与搜索在已发布的快照上
+    并发进行，图（最近构建的 PUBLISHED_MAX 张之一）已是当前版本时完全不取锁。
+    """
+    def __init__(self, docroot: Path, watch_root: Path):
+        self.docroot = docroot
+        self.watch_root = watch_root
+
+    def _snapshot(self, graph: str, sig: int):
+        snap = published(graph, sig)
+        if snap is None:
+            with BUILD_LOCK:
+                snap = build_graph(self.docroot, self.watch_root, graph, sig)
+        return snap
+
+    def render(self, graph: str, view: str, subgraphs: List[str], sig: int) -> str:
+        return export_graph(view, subgraphs, self._snapshot(graph, sig))
+
+    def nodes(self, graph: str, sig: int) -> List[str]:
+        return node_names(self._snapshot(graph, sig))
+
+    def search(self, graph: str, query: str, limit: int, sig: int) -> List[dict]:
+        return search_graph(query, limit, self._snapshot(graph, sig))
+
+    def stats(self, graph: str, sig: int) -> dict:
+        with BUILD_LOCK:
+            return graph_stats(self.docroot, self.watch_root, graph, sig)
+
+    def profile(self, graph: str, view: str, subgraphs: List[str], top: int, sort: str) -> dict:
+        with BUILD_LOCK:
+            return profile_graph(self.docroot, self.watch_root, graph, view, subgraphs, top, sort)
+
+    def recycle(self):
+        pass   # 本进程已导入的 ibmm 无法替换；ibmm 改动需重启服务器（或使用 --workers）
+
+    def shutdown(self):
+        pass
+
+# ----------------- 结果缓存 -----------------
+class RenderCache:
+    """
+    (graph, view, subgraphs) -> Mermaid 文本；源码版本 version（监听事件 seq）推进后失效。
+    version 由 invalidate() 随监听事件推进，请求路径上不遍历目录；同时作为 sig 传给后端复用已构建的图。
+    实际构建交给 backend（InProcessRenderer 或 pool.RenderPool）。
+    """
+    def __init__(self, backend, metrics=None, version: int = 0):
+        self.backend = backend
+        self.metrics = metrics
+        self.version = version
+        self._lock = threading.Lock()
+        self._entries: Dict[Tuple, Tuple[int, object]] = {}
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._entries)
+
+    def _timed(self, op: str, fn):
+        if self.metrics is None:
+            return fn()
+        with self.metrics.time("ibmm_dev_backend_seconds", op=op):
+            return fn()
+
+    def _cached(self, key: Tuple, compute):
+        sig = self.version
+        with self._lock:
+            hit = self._entries.get(key)
+        fresh = bool(hit and hit[0] == sig)
+        if self.metrics is not None:
+            self.metrics.inc("ibmm_dev_render_cache_total", op=key[0], result="hit" if fresh else "miss")
+        if fresh:
+            return hit[1]
+        value = self._timed(key[0], lambda: compute(sig))
+        with self._lock:
+            if sig == self.version:   # 计算期间版本已推进：结果可能是旧的，不入缓存
+                self._entries[key] = (sig, value)
+        return value
+
+    def render(self, graph: str, view: str, subgraphs: List[str]) -> str:
+        if view not in VIEWS:
+            raise ValueError(f"Unknown view: {view!r}")
+        return self._cached(("render", graph, view, tuple(subgraphs)),
+                            lambda sig: self.backend.render(graph, view, subgraphs, sig))
+
+    def nodes(self, graph: str) -> List[str]:
+        return self._cached(("nodes", graph), lambda sig: self.backend.nodes(graph, sig))
+
+    def search(self, graph: str, query: str, limit: int) -> List[dict]:
+        # 查询词千变万化，不缓存结果；后端自身会复用已构建的图与索引
+        sig = self.version
+        return self._timed("search", lambda: self.backend.search(graph, query, limit, sig))
+
+    def invalidate(self, version: int):
+        """源码版本推进到 version（监听事件 seq）：旧条目全部作废。"""
+        with self._lock:
+            self.version = version
+            self._entries.clear()
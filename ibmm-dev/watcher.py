@@ -0,0 +1,116 @@
+# ibmm-dev/watcher.py
+"""
+共享文件监听：每个服务器一个后台线程，按 per-file stat 快照比较检测变化，
+对连续保存做去抖，再把变化事件分发给所有订阅者（每个订阅者一个 Queue）。
+"""
+from __future__ import annotations
+import queue, threading, time
+from pathlib import Path
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+Snapshot = Dict[str, Tuple[int, int]]   # path -> (mtime_ns, size)
+
+def snapshot_paths(dirs: Iterable[Path], extra_files: Iterable[Path] | None = None) -> Snapshot:
+    """收集目录下所有 .py（排除 __pycache__）及额外文件的 stat 快照。"""
+    snap: Snapshot = {}
+    def _add(p: Path):
+        try:
+            st = p.stat()
+        except FileNotFoundError:
+            return
+        snap[str(p)] = (st.st_mtime_ns, st.st_size)
+    for d in dirs:
+        if d.is_file():
+            _add(d)
+            continue
+        if not d.exists():
+            continue
+        for p in d.rglob("*.py"):
+            if "__pycache__" in p.parts:
+                continue
+            _add(p)
+    for f in extra_files or ():
+        _add(f)
+    return snap
+
+def diff_snapshots(old: Snapshot, new: Snapshot) -> Dict[str, List[str]]:
+    """返回 {"added": [...], "modified": [...], "removed": [...]}（均已排序）。"""
+    return {
+        "added":    sorted(p for p in new if p not in old),
+        "modified": sorted(p for p in new if p in old and new[p] != old[p]),
+        "removed":  sorted(p for p in old if p not in new),
+    }
+
+class FileWatcher(threading.Thread):
+    """
+    interval : 轮询间隔（秒）
+    debounce : 最后一次检测到变化后，需保持安静多久才发出事件（秒）
+    事件格式 : {"seq": n, "added": [...], "modified": [...], "removed": [...]}
+    on_change: 分发给订阅者之前在监听线程内同步调用；订阅者（如 SSE 页面）收到事件时缓存已失效
+    """
+    def __init__(self, dirs: List[Path], extra_files: List[Path] | None = None,
+                 interval: float = 0.5, debounce: float = 0.3):
+        super().__init__(name="ibmm-dev-watcher", daemon=True)
+        self.dirs = list(dirs)
+        self.extra_files = list(extra_files or [])
+        self.interval = interval
+        self.debounce = debounce
+        self.seq = 0
+        self._subs: List[queue.Queue] = []
+        self._lock = threading.Lock()
+        self._stop_evt = threading.Event()
+        self._snap = snapshot_paths(self.dirs, self.extra_files)
+        self.on_scan: Optional[Callable[[float, int], None]] = None   # (耗时秒, 文件数)，供指标统计
+        self.on_change: Optional[Callable[[dict], None]] = None
+
+    # 订阅
+    def subscribe(self) -> queue.Queue:
+        q: queue.Queue = queue.Queue()
+        with self._lock:
+            self._subs.append(q)
+        return q
+
+    def unsubscribe(self, q: queue.Queue) -> None:
+        with self._lock:
+            try: self._subs.remove(q)
+            except ValueError: pass
+
+    @property
+    def subscriber_count(self) -> int:
+        with self._lock:
+            return len(self._subs)
+
+    def stop(self) -> None:
+        self._stop_evt.set()
+
+    # 主循环
+    def run(self):
+        base: Optional[Snapshot] = None   # 本轮变化开始前的快照；None 表示当前没有待发事件
+        last_change = 0.0
+        while not self._stop_evt.wait(self.interval if base is None else min(self.interval, self.debounce)):
+            t0 = time.perf_counter()
+            cur = snapshot_paths(self.dirs, self.extra_files)
+            if self.on_scan is not None:
+                self.on_scan(time.perf_counter() - t0, len(cur))
+            now = time.monotonic()
+            if cur != self._snap:
+                if base is None:
+                    base = self._snap
+                self._snap = cur
+                last_change = now
+                continue
+            if base is not None and now - last_change >= self.debounce:
+                changes = diff_snapshots(base, cur)
+                base = None
+                if any(changes.values()):
+                    self._publish(changes)
+
+    def _publish(self, changes: Dict[str, List[str]]):
+        self.seq += 1
+        ev = {"seq": self.seq, **changes}
+        if self.on_change is not None:
+            self.on_change(ev)
+        with self._lock:
+            subs = list(self._subs)
+        for q in subs:
+            q.put(ev)
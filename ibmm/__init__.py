@@ -1,12 +1,15 @@
 # ibmm/__init__.py
 
+__version__ = "0.1.0"
+
 from .core import (
     # 基础 mind map
     Topic, Title, NodeKind, Note, Question, ___,
     # 导出/工具
-    to_mermaid_mindmap, to_mermaid_flowchart, to_node_classes, summarize,
+    to_mermaid_mindmap, to_mermaid_flowchart, to_node_classes, summarize, reset_registry,
+    set_module_map, bulk_add, unload,
     # 可选：内部数据结构（需要时再用）
-    REGISTRY, Node, Edge,
+    REGISTRY, Node, Edge, Snapshot,
 )
 
 # IBIS 扩展
@@ -18,8 +21,9 @@ from .ibis import (
 __all__ = [
     # core
     "Topic", "Title", "NodeKind", "Note", "Question", "___",
-    "to_mermaid_mindmap", "to_mermaid_flowchart", "to_node_classes", "summarize",
-    "REGISTRY", "Node", "Edge",
+    "to_mermaid_mindmap", "to_mermaid_flowchart", "to_node_classes", "summarize", "reset_registry",
+    "set_module_map", "bulk_add", "unload",
+    "REGISTRY", "Node", "Edge", "Snapshot",
     # ibis
     "Issue", "Position", "Pro", "Con", "Idea",
     "supports", "opposes", "answers",
@@ -0,0 +1,219 @@
+# ibmm/cache.py
+"""
+图模块的磁盘缓存（类似 __pycache__）：导入并 resolve_all 之后，把 Registry 中的节点/边写入
+<模块所在目录>/__ibmmcache__/<模块全名>.json；源码未变时直接恢复，不再执行装饰器。
+
+有效性：ibmm 版本（含 ibmm 包源码哈希）+ 图模块源码哈希 + 它（及被引用的图）按 import 语句
+传递导入的项目内源码哈希，任何一项变化即视为未命中并重新导入。写入先落到同目录的临时文件再 os.replace，
+多个进程并发读写时只会读到完整的旧文件或新文件。
+
+- IBMM_CACHE_DIR=<dir> : 把缓存统一放到 dir（源码目录只读时使用）；
+- IBMM_CACHE=0         : 关闭缓存（总是导入）。
+
+用法：
+    from ibmm import reset_registry
+    from ibmm.cache import load_graph
+    reset_registry()
+    hit = load_graph("graphs.example_ibis")   # 命中时不导入模块；REGISTRY 已 resolve_all
+"""
+from __future__ import annotations
+import ast, hashlib, importlib, importlib.util, json, os, sys, threading
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+from . import core
+from .core import Edge, Node, Registry, REGISTRY
+
+CACHE_DIRNAME = "__ibmmcache__"
+FORMAT = 3
+_IBMM_DIR = Path(core.__file__).resolve().parent
+_FINGERPRINT: Dict[str, str] = {}
+
+def _sha(path: str) -> Optional[str]:
+    try:
+        with open(path, "rb") as f:
+            return hashlib.sha256(f.read()).hexdigest()
+    except OSError:
+        return None
+
+def ibmm_fingerprint() -> str:
+    """ibmm.__version__ + ibmm 包内全部 .py 的内容哈希（开发中改了 ibmm 但未改版本号也会失效）。"""
+    if "fp" not in _FINGERPRINT:
+        from . import __version__
+        h = hashlib.sha256(__version__.encode())
+        for p in sorted(_IBMM_DIR.glob("*.py")):
+            h.update(p.name.encode())
+            h.update(p.read_bytes())
+        _FINGERPRINT["fp"] = f"{__version__}:{h.hexdigest()[:16]}"
+    return _FINGERPRINT["fp"]
+
+def cache_path(module: str, origin: str) -> Path:
+    base = os.environ.get("IBMM_CACHE_DIR")
+    d = Path(base) if base else Path(origin).parent / CACHE_DIRNAME
+    return d / f"{module}.json"
+
+def _is_graph_source(path: str) -> bool:
+    """只跟踪项目内的源码：ibmm 自身（已含在 fingerprint 中）与标准库/site-packages 除外。"""
+    p = os.path.realpath(path)
+    if not p.endswith(".py") or p.startswith(str(_IBMM_DIR) + os.sep):
+        return False
+    prefixes = {os.path.realpath(x) + os.sep for x in (sys.prefix, sys.base_prefix, sys.exec_prefix)}
+    return not any(p.startswith(x) for x in prefixes)
+
+# ---------- 依赖 ----------
+def _imports(tree: ast.Module, module: Optional[str], is_pkg: bool) -> Set[str]:
+    """import / from ... import 引用的模块全名（含可能的 "包.名字"；相对导入按 module 解析）。"""
+    out: Set[str] = set()
+    for node in ast.walk(tree):
+        if isinstance(node, ast.Import):
+            out.update(a.name for a in node.names)
+        elif isinstance(node, ast.ImportFrom):
+            mod = node.module
+            if node.level:
+                if not module:
+                    continue
+                base = module.split(".") if is_pkg else module.split(".")[:-1]
+                base = base[:len(base) - (node.level - 1)]
+                mod = ".".join(base + ([node.module] if node.module else []))
+            if mod:
+                out.add(mod)
+                out.update(f"{mod}.{a.name}" for a in node.names if a.name != "*")
+    return out
+
+def _module_file(name: str) -> Optional[str]:
+    """模块全名 -> 源文件；不为查找而导入上级包（上级包未导入时返回 None）。"""
+    m = sys.modules.get(name)
+    if m is not None:
+        return getattr(m, "__file__", None)
+    parent = name.rpartition(".")[0]
+    if parent and parent not in sys.modules:
+        return None
+    try:
+        spec = importlib.util.find_spec(name)
+    except (ImportError, ValueError):   # "包.名字" 中的名字不是模块
+        return None
+    return spec.origin if spec is not None and spec.has_location else None
+
+def _with_parents(name: str) -> List[Tuple[str, str]]:
+    """name 及其各级上级包的 (源文件, 模块全名)：导入子模块也会执行上级包的 __init__.py。"""
+    parts = name.split(".")
+    out = []
+    for i in range(1, len(parts) + 1):
+        sub = ".".join(parts[:i])
+        f = _module_file(sub)
+        if f:
+            out.append((f, sub))
+    return out
+
+def _import_closure(seeds: Iterable[Tuple[str, Optional[str]]]) -> Set[str]:
+    """
+    从 (源文件, 模块全名) 出发，按 import 语句（静态分析）传递展开，返回项目内的全部源码文件。
+    早已导入、本身不定义节点的辅助模块也在内，修改它们同样使缓存失效。
+    """
+    files: Set[str] = set()
+    todo = list(seeds)
+    while todo:
+        f, name = todo.pop()
+        f = os.path.realpath(f)
+        if f in files or not _is_graph_source(f):
+            continue
+        files.add(f)
+        try:
+            tree = ast.parse(Path(f).read_bytes())
+        except (OSError, SyntaxError, ValueError):
+            continue
+        for dep in _imports(tree, name, os.path.basename(f) == "__init__.py"):
+            todo.extend(_with_parents(dep))
+    return files
+
+# ---------- 读 ----------
+def _load(path: Path) -> Optional[dict]:
+    try:
+        data = json.loads(path.read_text(encoding="utf-8"))
+    except (OSError, ValueError):
+        return None
+    if data.get("format") != FORMAT or data.get("ibmm") != ibmm_fingerprint():
+        return None
+    for src, digest in data.get("sources", {}).items():
+        if _sha(src) != digest:
+            return None
+    return data
+
+def _restore(data: dict, reg: Registry) -> None:
+    for kind, parents in data["kinds"].items():   # 图模块中 make_kind(..., is_a=...) 声明的子类型
+        core.declare_kind(kind, parents)
+    for nid, kind, title, text, parent, meta, module in data["nodes"]:
+        reg.add_node(Node(nid, kind, title, text, parent, meta, module))   # 触发节点钩子（如全文索引）
+    # 边按原顺序原样恢复（钩子补出的边已包含在内）
+    reg.edges = [Edge(*e) for e in data["edges"]]
+    reg._edge_set = {(e.src, e.dst, e.rel, e.label) for e in reg.edges}
+    reg._reindex_links()
+    reg._auto_ver = core._AUTO_EDGE_VER
+    for hook in core.EDGE_HOOKS:   # 边未经 add_edge：补调边钩子（如已启用的论证评分）
+        for e in reg.edges:
+            hook(reg, e)
+
+# ---------- 写 ----------
+def _store(path: Path, module: str, sources: Dict[str, str], reg: Registry) -> bool:
+    data = {
+        "format": FORMAT, "ibmm": ibmm_fingerprint(), "module": module, "sources": sources,
+        "nodes": [[n.id, n.kind, n.title, n.text, n.parent, n.meta, n.module] for n in reg.nodes.values()],
+        "edges": [[e.src, e.dst, e.rel, e.label, e.module] for e in reg.edges],
+        "kinds": {k: list(p) for k, p in core.KIND_PARENTS.items() if p},
+    }
+    try:
+        text = json.dumps(data, ensure_ascii=False)
+    except (TypeError, ValueError):   # meta 中有无法 JSON 化的值：不缓存
+        return False
+    tmp = path.with_name(f".{path.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+    try:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp.write_text(text, encoding="utf-8")
+        os.replace(tmp, path)
+    except OSError:
+        try:
+            tmp.unlink()
+        except OSError:
+            pass
+        return False
+    return True
+
+def load_graph(module: str, use_cache: bool = True) -> bool:
+    """
+    构建图模块到全局 REGISTRY（装饰器总是写入它；调用前应已 reset）：缓存有效时直接恢复并返回 True；
+    否则导入模块、resolve_all、写缓存并返回 False。存在未解析关系时不写缓存。
+    module 本身若已在 sys.modules 中会先移除，以保证装饰器重新执行。
+    use_cache=False 时总是导入（如性能剖析），结果仍会写回缓存。
+    """
+    reg = REGISTRY
+    spec = importlib.util.find_spec(module)
+    origin = spec.origin if spec else None
+    enabled = os.environ.get("IBMM_CACHE", "1") != "0" and origin and origin.endswith(".py")
+    path = cache_path(module, origin) if enabled else None
+
+    if path is not None and use_cache:
+        data = _load(path)
+        if data is not None:
+            _restore(data, reg)
+            reg.resolve_all()
+            return True
+
+    sys.modules.pop(module, None)
+    importlib.import_module(module)
+    reg.resolve_all()
+    if path is None or reg.unresolved:
+        return False
+
+    # 本次构建用到的源码：模块本身与各节点所在文件（含按需导入的被引用图），及它们传递 import 的项目内源码
+    seeds = _with_parents(module) + [(origin, module)]
+    seeds += [(n.meta["src_file"], n.module) for n in reg.nodes.values() if n.meta.get("src_file")]
+    files = _import_closure(seeds)
+    sources = {}
+    for f in sorted(files):
+        if _is_graph_source(f):
+            digest = _sha(f)
+            if digest is None:
+                return False
+            sources[os.path.realpath(f)] = digest
+    _store(path, module, sources, reg)
+    return False
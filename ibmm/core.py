@@ -1,17 +1,22 @@
 # ibmm/core.py
 from __future__ import annotations
-import inspect, os, re
+import importlib, inspect, os, re, sys, weakref
+from types import MappingProxyType
 from dataclasses import dataclass, field
-from typing import Dict, List, Optional, Any, Callable, Tuple
+from typing import Dict, FrozenSet, Iterable, List, Optional, Any, Callable, Tuple, Union
 
 # ---------- 内部扩展钩子（对扩展隐藏） ----------
 PROXY_BINDERS: List[Callable[[Any, str], None]] = []
 VALIDATORS:     List[Callable[[str, str, str, "Registry", Optional[tuple[str,int]]], None]] = []
 FINALIZERS:     List[Callable[["Registry"], None]] = []
+NODE_HOOKS:     List[Callable[["Registry", "Node"], None]] = []
+EDGE_HOOKS:     List[Callable[["Registry", "Edge"], None]] = []
 
 def _register_proxy_binder(fn: Callable[[Any, str], None]) -> None: PROXY_BINDERS.append(fn)
 def _register_validator(fn: Callable[[str, str, str, "Registry", Optional[tuple[str,int]]], None]) -> None: VALIDATORS.append(fn)
 def _register_finalizer(fn: Callable[["Registry"], None]) -> None: FINALIZERS.append(fn)
+def _register_node_hook(fn: Callable[["Registry", "Node"], None]) -> None: NODE_HOOKS.append(fn)
+def _register_edge_hook(fn: Callable[["Registry", "Edge"], None]) -> None: EDGE_HOOKS.append(fn)
 
 # ---------- 数据结构 ----------
 @dataclass
@@ -22,6 +27,7 @@ class Node:
     text: str
     parent: Optional[str]
     meta: dict = field(default_factory=dict)
+    module: Optional[str] = None   # 所属模块（Registry.unload 按此移除）
 
 @dataclass
 class Edge:
@@ -29,6 +35,7 @@ class Edge:
     dst: str
     rel: str                # contains / relates / supports / opposes / answers / ...
     label: Optional[str] = None   # ← 新增：仅对 relates 有意义
+    module: Optional[str] = None  # 声明该边的模块（contains / 自动边归子节点所在模块）
 
 @dataclass
 class _Pending:
@@ -37,6 +44,7 @@ class _Pending:
     rel: str
     origin: Optional[tuple[str, int]]  # (filename, lineno)
     label: Optional[str] = None
+    module: Optional[str] = None
 
 class Registry:
     def __init__(self):
@@ -44,22 +52,197 @@ class Registry:
         self.edges: List[Edge] = []
         self._edge_set: set[tuple[str, str, str, Optional[str]]] = set()   # ← 新增：去重用
         self._pending: List[_Pending] = []
+        self._search_index = None   # 可选：由 ibmm.search.enable_search 挂接
+        self._scores = None         # 可选：由 ibmm.ibis.enable_scoring 挂接
+        self.unresolved: List[_Pending] = []       # 目标（或源）尚未注册的关系；每次 resolve_all 重试
+        self.module_map: Dict[str, str] = {}       # 可选：顶层节点名 -> 定义它的模块（按需导入）
+        self._lazy_loaded: set[str] = set()
+        self._children: Dict[str, List[str]] = {}  # parent id -> 子节点 id（子类先于外层类注册）
+        self._links: Dict[str, List[Edge]] = {}    # 节点 id -> 关联的非 contains 边（两端各记一次；邻域导出用）
+        self._auto_ver = 0                          # 已整体应用过的 auto_edge 规则版本
+        self._frozen: Optional[Snapshot] = None     # 最近一次 freeze() 的快照：与之共享容器，写入前先复制
 
     # 节点/边
     def add_node(self, n: Node):
+        self._thaw()
+        old = self.nodes.get(n.id)
         self.nodes[n.id] = n
         if n.parent:
-            self.add_edge(n.parent, n.id, "contains", None)  # ← 用 add_edge，而不是直接 append
-
-    def defer(self, src_ref: Any, dst_ref: Any, rel: str, origin: Optional[tuple[str,int]] = None, label: Optional[str] = None):
-        self._pending.append(_Pending(src_ref, dst_ref, rel, origin, label))
-
-    def add_edge(self, src: str, dst: str, rel: str, label: Optional[str] = None):
+            if old is None or old.parent != n.parent:
+                self._children.setdefault(n.parent, []).append(n.id)
+            self.add_edge(n.parent, n.id, "contains", None, n.module)  # ← 用 add_edge，而不是直接 append
+        for hook in NODE_HOOKS:
+            hook(self, n)
+
+    def clear(self):
+        """清空节点/边/待解析关系（供重新导入图模块前使用）；换用新容器，已发出的快照不受影响。"""
+        self._frozen = None
+        self.nodes = {}
+        self.edges = []
+        self._edge_set = set()
+        self._pending.clear()
+        self._search_index = None
+        self._scores = None
+        self.unresolved.clear()
+        self._lazy_loaded.clear()
+        self._children = {}
+        self._links = {}
+
+    # 快照
+    def freeze(self) -> "Snapshot":
+        """
+        resolve_all 后返回当前状态的不可变快照（不复制：与 Registry 共享容器与节点/边对象）。
+        之后的写入先复制容器（copy-on-write），已发出的快照保持不变；其间未写入时返回同一快照。
+        """
+        self.resolve_all()
+        if self._frozen is None:
+            self._frozen = Snapshot(self)
+        return self._frozen
+
+    def _thaw(self) -> None:
+        """写入前调用：容器仍被快照共享时复制一份（节点/边对象本身不变，仍共享）。"""
+        snap = self._frozen
+        if snap is None:
+            return
+        self._frozen = None
+        self.nodes = dict(self.nodes)
+        self.edges = list(self.edges)
+        self._edge_set = set(self._edge_set)
+        self._children = {k: list(v) for k, v in self._children.items()}
+        self._links = {k: list(v) for k, v in self._links.items()}
+        if self._search_index is not None:
+            self._search_index = self._search_index.copy()
+        if self._scores is not None:
+            self._scores.reg = snap          # 旧评分留给快照（此刻两者内容相同）
+            self._scores = self._scores.copy(self)
+
+    def defer(self, src_ref: Any, dst_ref: Any, rel: str, origin: Optional[tuple[str,int]] = None,
+              label: Optional[str] = None, module: Optional[str] = None):
+        self._pending.append(_Pending(src_ref, dst_ref, rel, origin, label, module))
+
+    def add_edge(self, src: str, dst: str, rel: str, label: Optional[str] = None, module: Optional[str] = None):
         key = (src, dst, rel, label)
         if key in self._edge_set:
             return
+        self._thaw()
         self._edge_set.add(key)
-        self.edges.append(Edge(src, dst, rel, label))
+        e = Edge(src, dst, rel, label, module)
+        self.edges.append(e)
+        self._index_link(e)
+        for hook in EDGE_HOOKS:
+            hook(self, e)
+
+    def _index_link(self, e: Edge) -> None:
+        if e.rel != "contains":
+            self._links.setdefault(e.src, []).append(e)
+            if e.dst != e.src:
+                self._links.setdefault(e.dst, []).append(e)
+
+    def _reindex_links(self) -> None:
+        """self.edges 被整体替换后（unload、缓存恢复）重建邻接索引。"""
+        self._links = {}
+        for e in self.edges:
+            self._index_link(e)
+
+    def bulk_add(self, nodes: Iterable[Any] = (), edges: Iterable[Any] = (), module: Optional[str] = None) -> None:
+        """
+        不创建类、直接写入节点与边（从数据批量生成图）：
+          nodes : Node 或 dict（id、kind 必填；title 省略时取 id 末段，parent 省略时按 id 的点分路径推断）
+          edges : Edge 或 (src, dst, rel[, label])；两端都已注册时立即校验并加入，
+                  否则推迟到 resolve_all（可指向稍后注册、或 module_map 中其他模块的节点）
+          module: 未自带 module 的节点/边归属于它（之后可 unload(module) 整体移除）
+        与装饰器一样运行节点钩子（auto_edge、全文索引）与关系校验器。
+        """
+        for n in nodes:
+            if not isinstance(n, Node):
+                nid = n["id"]
+                n = Node(nid, n["kind"], n.get("title") or nid.rsplit(".", 1)[-1].replace("_", " "),
+                         n.get("text") or "", n["parent"] if "parent" in n else _parent_of(nid),
+                         dict(n.get("meta") or {}), n.get("module"))
+            if n.module is None and module is not None:
+                n.module = module
+            self.add_node(n)
+        for e in edges:
+            if isinstance(e, Edge):
+                src, dst, rel, label, owner = e.src, e.dst, e.rel, e.label, e.module
+            else:
+                src, dst, rel, label = (tuple(e) + (None,))[:4]
+                owner = None
+            owner = owner if owner is not None else module
+            if src in self.nodes and dst in self.nodes:
+                for v in VALIDATORS:
+                    v(rel, src, dst, self, None)
+                self.add_edge(src, dst, rel, label, owner)
+            else:
+                self.defer(src, dst, rel, None, label, owner)
+
+    def unload(self, module: str) -> int:
+        """
+        移除 module 拥有的节点、边与待解析关系（重新导入该模块之前调用），返回移除的节点数。
+        其他模块指向这些节点的关系退回待解析队列：模块重新导入后 resolve_all 会再次连上。
+        """
+        self._thaw()
+        gone = {nid for nid, n in self.nodes.items() if n.module == module}
+        parents = {self.nodes[nid].parent for nid in gone}
+        for nid in gone:
+            del self.nodes[nid]
+            self._children.pop(nid, None)
+            if self._search_index is not None:
+                self._search_index.remove(nid)
+        for p in parents - gone:
+            if p in self._children:
+                self._children[p] = [c for c in self._children[p] if c not in gone]
+        kept: List[Edge] = []
+        for e in self.edges:
+            if e.module == module:
+                continue
+            if e.src in gone or e.dst in gone:
+                if e.rel != "contains":
+                    self._pending.append(_Pending(e.src, e.dst, e.rel, None, e.label, e.module))
+                continue
+            kept.append(e)
+        self.edges = kept
+        self._edge_set = {(e.src, e.dst, e.rel, e.label) for e in kept}
+        self._reindex_links()
+        self._pending = [p for p in self._pending if p.module != module]
+        self.unresolved = [p for p in self.unresolved if p.module != module]
+        self._lazy_loaded.discard(module)
+        if self is REGISTRY:
+            for c in [c for c in ALL_NODE_CLASSES_SET if c.__module__ == module]:
+                ALL_NODE_CLASSES_SET.discard(c)
+        if self._scores is not None:
+            self._scores.rebuild()
+        return len(gone)
+
+    def neighbourhood(self, focus: str, hops: int = 2, rels: Optional[Iterable[str]] = None) -> Dict[str, int]:
+        """
+        从 focus 出发、不分方向沿 rels 的边至多走 hops 步可达的节点 -> 步数（focus 为 0）。
+        rels 为 None 时取 contains 以外的全部关系；含 "contains" 时也沿父子层级扩展。
+        有界 BFS：只访问邻域内节点的索引边，与全图大小无关。
+        """
+        rels = None if rels is None else set(rels)
+        tree = rels is not None and "contains" in rels
+        dist = {focus: 0}
+        frontier = [focus]
+        for d in range(1, hops + 1):
+            nxt = []
+            for x in frontier:
+                near = [e.dst if e.src == x else e.src
+                        for e in self._links.get(x, ()) if rels is None or e.rel in rels]
+                if tree:
+                    p = self.nodes[x].parent
+                    if p:
+                        near.append(p)
+                    near.extend(c for c in self._children.get(x, ())
+                                if c in self.nodes and self.nodes[c].parent == x)
+                for y in near:
+                    if y not in dist and y in self.nodes:
+                        dist[y] = d
+                        nxt.append(y)
+            if not nxt:
+                break
+            frontier = nxt
+        return dist
 
     # 解析
     def _resolve_ref(self, ref: Any) -> Optional[str]:
@@ -88,28 +271,159 @@ class Registry:
             f = f.f_back
         return None
 
+    def _import_referenced(self, pendings: List[_Pending]) -> bool:
+        """关系路径的根名尚未注册且在 module_map 中：导入对应模块。返回是否导入了新模块。"""
+        imported = False
+        for p in pendings:
+            for ref in (p.src_ref, p.dst_ref):
+                if not isinstance(ref, str):
+                    continue
+                root = ref.split(".", 1)[0]
+                mod = self.module_map.get(root)
+                if not mod or root in self.nodes or mod in self._lazy_loaded:
+                    continue
+                self._lazy_loaded.add(mod)
+                if mod not in sys.modules:
+                    importlib.import_module(mod)   # 执行装饰器：追加新节点与新的待解析关系
+                    imported = True
+        return imported
+
     def resolve_all(self):
+        # 按需导入被引用的图模块（新模块可能又引用其他模块，直到不再有新导入）
+        while self.module_map and self._import_referenced(self.unresolved + self._pending):
+            pass
+
         # 自动边（扩展可注入）
         for fn in FINALIZERS:
             fn(self)
 
-        # 把当前待处理边拿出来处理，然后清空队列，避免重复追加
-        pendings, self._pending = self._pending, []
-        # 解析延迟边 + 规则校验
+        # 把当前待处理边（含上次未解析的）拿出来处理，然后清空队列，避免重复追加
+        pendings, self._pending = self.unresolved + self._pending, []
+        self.unresolved = []
+        # 解析延迟边 + 规则校验；解析不到的端点不再以原始字符串入边（悬空边会让校验器 KeyError）
         for p in pendings:
-            src = self._resolve_ref(p.src_ref) or (
-                p.src_ref if isinstance(p.src_ref, str) else getattr(p.src_ref, "__qualname__", None)
-            )
-            dst = self._resolve_ref(p.dst_ref) or (
-                p.dst_ref if isinstance(p.dst_ref, str) else getattr(p.dst_ref, "__qualname__", None)
-            )
-            if src and dst:
-                for v in VALIDATORS:
-                    v(p.rel, src, dst, self, p.origin)
-                self.add_edge(src, dst, p.rel, p.label)
+            src = self._resolve_ref(p.src_ref)
+            dst = self._resolve_ref(p.dst_ref)
+            if not (src and dst):
+                self.unresolved.append(p)
+                continue
+            for v in VALIDATORS:
+                v(p.rel, src, dst, self, p.origin)
+            self.add_edge(src, dst, p.rel, p.label, p.module)
+
+class Snapshot:
+    """
+    Registry.freeze() 的结果：只读的节点/边/索引视图。导出函数（reg=）可在多个线程中无锁读取，
+    同时写入方继续构建下一版本，建好后再 freeze() 并整体替换引用。
+    """
+    __slots__ = ("nodes", "edges", "_edge_set", "_children", "_links", "_search_index", "_scores")
+
+    def __init__(self, reg: Registry):
+        self.nodes = MappingProxyType(reg.nodes)
+        self.edges = reg.edges
+        self._edge_set = reg._edge_set
+        self._children = reg._children
+        self._links = reg._links
+        self._search_index = reg._search_index   # 未启用时 search / enable_search 临时建立，不挂到快照上
+        self._scores = reg._scores               # 同上（enable_scoring / scores=True）
+
+    def resolve_all(self) -> None:
+        """快照创建时已解析；供导出函数统一调用。"""
+
+    neighbourhood = Registry.neighbourhood
 
 REGISTRY = Registry()
 
+# ---------- kind 分类（is-a） ----------
+# make_kind(kind, is_a=...) 声明子类型（如 risk 是一种 con）；每次声明后整体重算传递闭包，
+# 之后的匹配（关系校验、auto_edge、样式、论证评分）都是 O(1) 查表，不再沿父类型链逐级查找。
+KIND_PARENTS: Dict[str, Tuple[str, ...]] = {}    # kind -> 直接父类型
+_KIND_MRO: Dict[str, Tuple[str, ...]] = {}       # kind -> 自身及祖先，由近及远（样式继承取第一个有定义的）
+_KIND_ISA: Dict[str, FrozenSet[str]] = {}        # kind -> 自身及全部祖先
+_KIND_SUBS: Dict[str, FrozenSet[str]] = {}       # kind -> 自身及全部子类型
+
+# auto_edge 规则表：(child_kind, parent_kind) -> [rel, ...]
+AUTO_EDGE_RULES: Dict[Tuple[str, str], List[str]] = {}
+_AUTO_EDGE_INDEX: Dict[Tuple[str, str], List[str]] = {}   # 展开到全部已声明子类型的规则表（查表用）
+_AUTO_EDGE_VER = 0
+
+def declare_kind(kind: str, is_a: Union[str, Iterable[str], None] = None) -> None:
+    """
+    声明 kind 及其父类型（一个或多个）；is_a=None 时只登记 kind，不改动已声明的父类型。
+    未声明过的父类型随之登记为根类型。形成环时抛出 ValueError。
+    """
+    if is_a is None:
+        if kind in KIND_PARENTS:
+            return
+        parents: Tuple[str, ...] = ()
+    else:
+        parents = (is_a,) if isinstance(is_a, str) else tuple(dict.fromkeys(is_a))
+        if KIND_PARENTS.get(kind) == parents:
+            return
+    old = dict(KIND_PARENTS)
+    KIND_PARENTS[kind] = parents
+    for p in parents:
+        KIND_PARENTS.setdefault(p, ())
+    try:
+        _rebuild_kinds()
+    except ValueError:
+        KIND_PARENTS.clear()
+        KIND_PARENTS.update(old)
+        _rebuild_kinds()
+        raise
+
+def _rebuild_kinds() -> None:
+    mro: Dict[str, Tuple[str, ...]] = {}
+    def walk(k: str, path: Tuple[str, ...]) -> Tuple[str, ...]:
+        if k in mro:
+            return mro[k]
+        if k in path:
+            raise ValueError(f"kind 继承成环: {' -> '.join(path[path.index(k):] + (k,))}")
+        out = [k]
+        for p in KIND_PARENTS.get(k, ()):
+            out.extend(x for x in walk(p, path + (k,)) if x not in out)
+        mro[k] = tuple(out)
+        return mro[k]
+    for k in KIND_PARENTS:
+        walk(k, ())
+    subs: Dict[str, set] = {k: set() for k in mro}
+    for k, anc in mro.items():
+        for a in anc:
+            subs[a].add(k)
+    _KIND_MRO.clear(); _KIND_MRO.update(mro)
+    _KIND_ISA.clear(); _KIND_ISA.update((k, frozenset(v)) for k, v in mro.items())
+    _KIND_SUBS.clear(); _KIND_SUBS.update((k, frozenset(v)) for k, v in subs.items())
+    _rebuild_auto_edge_index()
+
+def _rebuild_auto_edge_index() -> None:
+    """规则或 kind 分类变化后重新展开；内容有变时升版本，已注册的节点在下次 resolve_all 时补边。"""
+    global _AUTO_EDGE_VER
+    index: Dict[Tuple[str, str], List[str]] = {}
+    for (ck, pk), rels in AUTO_EDGE_RULES.items():
+        for c in _KIND_SUBS.get(ck, (ck,)):
+            for p in _KIND_SUBS.get(pk, (pk,)):
+                out = index.setdefault((c, p), [])
+                out.extend(r for r in rels if r not in out)
+    if index != _AUTO_EDGE_INDEX:
+        _AUTO_EDGE_INDEX.clear()
+        _AUTO_EDGE_INDEX.update(index)
+        _AUTO_EDGE_VER += 1
+
+def is_a(kind: str, ancestor: str) -> bool:
+    """kind 是否为 ancestor 或其（传递）子类型。"""
+    return kind == ancestor or ancestor in _KIND_ISA.get(kind, ())
+
+def kind_closure(kind: str) -> FrozenSet[str]:
+    """kind 自身及全部祖先类型（未声明的 kind 只含自身）。"""
+    return _KIND_ISA.get(kind) or frozenset((kind,))
+
+def _kind_style(styles: Dict[str, str], kind: str) -> Optional[str]:
+    """kind 的样式：自身没有时继承最近的祖先类型的样式。"""
+    for k in _KIND_MRO.get(kind, (kind,)):
+        if k in styles:
+            return styles[k]
+    return None
+
 # ---------- 装饰器 ----------
 def _parent_of(qn: str) -> Optional[str]:
     return qn.rsplit(".", 1)[0] if "." in qn else None
@@ -118,8 +432,12 @@ def _title(obj, explicit: Optional[str]) -> str:
     # 没给标题就用类名，且将下划线转为空格
     return explicit if explicit is not None else obj.__name__.replace("_", " ")
 
-def make_kind(kind: str):
-    """创建一个节点装饰器，既支持 @Kind 也支持 @Kind('标题', ...)。"""
+def make_kind(kind: str, is_a: Union[str, Iterable[str], None] = None):
+    """
+    创建一个节点装饰器，既支持 @Kind 也支持 @Kind('标题', ...)。
+    is_a：父类型（如 make_kind("risk", is_a="con")），子类型沿用父类型的关系规则、auto_edge 与默认样式。
+    """
+    declare_kind(kind, is_a)
     def apply(c, title: Optional[str] = None, **meta):
         qn = c.__qualname__
 
@@ -139,7 +457,7 @@ def make_kind(kind: str):
 
         REGISTRY.add_node(Node(
             id=qn, kind=kind, title=_title(c, title),
-            text=(inspect.getdoc(c) or ""), parent=_parent_of(qn), meta=meta_out
+            text=(inspect.getdoc(c) or ""), parent=_parent_of(qn), meta=meta_out, module=c.__module__
         ))
         for binder in PROXY_BINDERS: binder(c, qn)
         return c
@@ -220,7 +538,8 @@ class _RelProxy:
         frame = inspect.currentframe().f_back
         fi = inspect.getframeinfo(frame)
         origin = (fi.filename, fi.lineno)
-        REGISTRY.defer(s, self.path, self.rel, origin=origin, label=self.label)
+        REGISTRY.defer(s, self.path, self.rel, origin=origin, label=self.label,
+                       module=frame.f_globals.get("__name__"))
         return self
 
 # 全局“关联”
@@ -231,60 +550,114 @@ def _bind_relates(cls: Any, node_id: str):
 _register_proxy_binder(_bind_relates)
 
 # ---------- 友好扩展 API ----------
+_RELATION_HOOKS: Dict[str, List[Callable]] = {}   # 关系名 -> 它注册的绑定器/校验器
+
 def define_relation(name: str,
                     *,
                     allow: Optional[Tuple[str, str]] = None,
                     allow_dst_descendant: bool = False) -> _RelProxy:
     """
-    定义一元加号关系（如 'supports'）。如果给出 allow=(src_kind, dst_kind)：
+    定义一元加号关系（如 'supports'）。如果给出 allow=(src_kind, dst_kind)（两端均含子类型）：
       - 若 allow_dst_descendant=True，则允许目标是该 dst_kind 的“后代”（祖先链上包含 dst_kind）。
     """
     proxy = _RelProxy(name)
+    # 同名关系重复定义（如图模块重新导入）：替换旧的绑定器/校验器，而不是累积
+    for old in _RELATION_HOOKS.pop(name, ()):
+        for hooks in (PROXY_BINDERS, VALIDATORS):
+            if old in hooks:
+                hooks.remove(old)
     def _bind(cls: Any, node_id: str):
         setattr(cls, name, _RelProxy(name, src=node_id))
     _register_proxy_binder(_bind)
+    _RELATION_HOOKS[name] = [_bind]
 
     if allow:
         s_kind, d_kind = allow
         def _validator(rel: str, src_id: str, dst_id: str, reg: Registry, origin: Optional[tuple[str,int]]):
             if rel != name: return
             sk = reg.nodes[src_id].kind
-            # 目标是否是 d_kind，或 d_kind 的祖先？
+            # 目标是否是 d_kind（含子类型），或 d_kind 的祖先？（祖先链可能经过未装饰的外层类，遇到即停止）
             ok_dst = False
             cur = dst_id
-            while True:
+            while cur in reg.nodes:
                 dk = reg.nodes[cur].kind
-                if dk == d_kind:
+                if is_a(dk, d_kind):
                     ok_dst = True; break
                 if not allow_dst_descendant: break
-                parent = reg.nodes[cur].parent
-                if not parent: break
-                cur = parent
-            if not (sk == s_kind and ok_dst):
+                cur = reg.nodes[cur].parent
+            if not (is_a(sk, s_kind) and ok_dst):
                 where = f" at {os.path.basename(origin[0])}:{origin[1]}" if origin else ""
                 raise ValueError(f"{name}: 仅允许 {s_kind} → {d_kind}{'(含其后代)' if allow_dst_descendant else ''}"
                                  f"（实际 {sk} → {reg.nodes[dst_id].kind}）: {src_id} -> {dst_id}{where}")
         _register_validator(_validator)
+        _RELATION_HOOKS[name].append(_validator)
 
     return proxy
 
+# auto_edge 规则表见 AUTO_EDGE_RULES（kind 分类一节）
 def auto_edge(child_kind: str, parent_kind: str, rel_name: str) -> None:
-    """根据层级关系自动添加语义边。"""
-    def _finalizer(reg: Registry):
-        for n in list(reg.nodes.values()):
-            if not n.parent: continue
-            p = reg.nodes.get(n.parent)
-            if p and n.kind == child_kind and p.kind == parent_kind:
-                reg.add_edge(n.id, p.id, rel_name)
-    _register_finalizer(_finalizer)
+    """根据层级关系自动添加语义边（child --rel--> parent；两端均含子类型）。"""
+    rels = AUTO_EDGE_RULES.setdefault((child_kind, parent_kind), [])
+    if rel_name not in rels:
+        rels.append(rel_name)
+        _rebuild_auto_edge_index()
+
+def _apply_auto_edges(reg: Registry, n: Node):
+    """节点注册时查表：与已注册的父节点、已注册的子节点（内层类先装饰）各 O(1) 匹配。"""
+    if not _AUTO_EDGE_INDEX:
+        return
+    p = reg.nodes.get(n.parent) if n.parent else None
+    if p is not None:
+        for rel in _AUTO_EDGE_INDEX.get((n.kind, p.kind), ()):
+            reg.add_edge(n.id, p.id, rel, None, n.module)
+    for cid in reg._children.get(n.id, ()):
+        c = reg.nodes[cid]
+        for rel in _AUTO_EDGE_INDEX.get((c.kind, n.kind), ()):
+            reg.add_edge(c.id, n.id, rel, None, c.module)
+_register_node_hook(_apply_auto_edges)
+
+def _auto_edge_finalizer(reg: Registry):
+    # 节点注册之后才新增的规则：整体补一遍（单次遍历），之后由 add_node 增量维护
+    if reg._auto_ver == _AUTO_EDGE_VER:
+        return
+    for n in list(reg.nodes.values()):
+        p = reg.nodes.get(n.parent) if n.parent else None
+        if p is not None:
+            for rel in _AUTO_EDGE_INDEX.get((n.kind, p.kind), ()):
+                reg.add_edge(n.id, p.id, rel, None, n.module)
+    reg._auto_ver = _AUTO_EDGE_VER
+_register_finalizer(_auto_edge_finalizer)
 
 # ---------- 导出 ----------
 
-ALL_NODE_CLASSES_SET = set()
+# 弱引用：模块卸载/重新导入后，旧的类对象可被回收（Registry.unload 会立即移除）
+ALL_NODE_CLASSES_SET: "weakref.WeakSet[Any]" = weakref.WeakSet()
 def _collect_node_class(cls: Any, node_id: str):
     ALL_NODE_CLASSES_SET.add(cls)
 _register_proxy_binder(_collect_node_class)
 
+def set_module_map(mapping: Dict[str, str]) -> None:
+    """
+    设置“顶层节点名 -> 模块名”映射。resolve_all 遇到尚未注册的 +___.X... 时，
+    只导入 X 所在的模块，而不必预先导入所有图。
+    """
+    REGISTRY.module_map = dict(mapping)
+    REGISTRY._lazy_loaded.clear()
+
+def bulk_add(nodes: Iterable[Any] = (), edges: Iterable[Any] = (), module: Optional[str] = None) -> None:
+    """向全局 REGISTRY 批量写入节点/边，见 Registry.bulk_add。"""
+    REGISTRY.bulk_add(nodes, edges, module)
+
+def unload(module: str) -> int:
+    """从全局 REGISTRY 移除 module 拥有的一切（见 Registry.unload），并从 sys.modules 删除，下次导入重新执行装饰器。"""
+    sys.modules.pop(module, None)
+    return REGISTRY.unload(module)
+
+def reset_registry() -> None:
+    """清空全局 REGISTRY 与已收集的节点类（重新构建图之前调用）。"""
+    REGISTRY.clear()
+    ALL_NODE_CLASSES_SET.clear()
+
 def to_node_classes() -> List[Any]:
     """返回所有被装饰器（如 @Topic）标记的节点类对象列表，列表已排序确保幂等性。"""
     return sorted(list(ALL_NODE_CLASSES_SET), key=lambda c: c.__qualname__)
@@ -296,6 +669,8 @@ def summarize():
         kinds[n.kind] = kinds.get(n.kind, 0) + 1
     print("Nodes:", len(REGISTRY.nodes), kinds)
     print("Edges:", len(REGISTRY.edges))
+    if REGISTRY.unresolved:
+        print("Unresolved:", ", ".join(sorted({str(p.dst_ref) for p in REGISTRY.unresolved})))
 
 # ---- Markdown -> HTML (极简) ----
 import re as _re
@@ -398,6 +773,8 @@ def to_mermaid_mindmap(
     text_lines: int | None = None,  # 限制使用的 docstring 行数；None=全部
     inline_sep: str = "<br>",        # text_mode='inline' 时的分隔符
     md: str = "html",             # 'text'或 'html'（默认）
+    scores: Any = None,           # True / ArgumentScores：标题后附加论证得分
+    reg: Registry | Snapshot | None = None,   # 默认全局 REGISTRY；也可传 REGISTRY.freeze() 的快照
 ) -> str:
     """
     导出 Mermaid mindmap，支持多行 docstring。
@@ -409,30 +786,34 @@ def to_mermaid_mindmap(
       - 'children' ：把每一行作为“子节点”渲染（推荐在思维导图中表达多行）
 
     text_lines: 限制 docstring 取前 N 行；None 表示全部非空行。
+    scores: True 时使用（必要时启用）reg 上的 ibmm.ibis 论证评分，也可直接传 ArgumentScores。
+    reg: 导出的 Registry 或快照（Registry.freeze()）；快照可在其他线程重建图时无锁导出。
     """
-    REGISTRY.resolve_all()
+    reg = reg if reg is not None else REGISTRY
+    reg.resolve_all()
+    scores = _resolve_scores(scores, reg)
 
     def _resolve_id(ref):
         if ref is None: return None
         if isinstance(ref, str):
-            if ref in REGISTRY.nodes: return ref
+            if ref in reg.nodes: return ref
             tail = ref.split(".")[-1]
-            hits = [k for k in REGISTRY.nodes if k.endswith(f".{tail}") or k == tail]
+            hits = [k for k in reg.nodes if k.endswith(f".{tail}") or k == tail]
             return hits[0] if len(hits) == 1 else None
         return getattr(ref, "__qualname__", None)
 
     # children 索引
     children = {}
-    for n in REGISTRY.nodes.values():
+    for n in reg.nodes.values():
         if n.parent:
             children.setdefault(n.parent, []).append(n.id)
     for k in children:
-        children[k].sort(key=lambda i: (REGISTRY.nodes[i].kind, REGISTRY.nodes[i].title.lower()))
+        children[k].sort(key=lambda i: (reg.nodes[i].kind, reg.nodes[i].title.lower()))
 
     # 选根：root 指定则用之；否则选“后代最多”的顶层根
     rid = _resolve_id(root) if root else None
     if rid is None:
-        top_roots = [nid for nid, n in REGISTRY.nodes.items() if not n.parent]
+        top_roots = [nid for nid, n in reg.nodes.items() if not n.parent]
         if not top_roots:
             return "mindmap"
         def subtree_size(nid: str) -> int:
@@ -445,7 +826,7 @@ def to_mermaid_mindmap(
             return cnt
         rid = max(
             top_roots,
-            key=lambda nid: (subtree_size(nid), REGISTRY.nodes[nid].title.lower())
+            key=lambda nid: (subtree_size(nid), reg.nodes[nid].title.lower())
         )
 
     # 文本处理
@@ -476,20 +857,22 @@ def to_mermaid_mindmap(
     IND = "  "
 
     def emit(nid: str, depth: int):
-        n = REGISTRY.nodes[nid]
+        n = reg.nodes[nid]
+        badge = scores.label(nid) if scores else ""
+        title = f"{n.title} · {badge}" if badge else n.title
         if text_mode == "firstline":
-            label = f"{n.title}{_firstline_snippet(n.text)}"
+            label = f"{title}{_firstline_snippet(n.text)}"
             lines_out.append(f"{IND*depth}{label}")
         elif text_mode == "inline":
             doc = inline_sep.join(_render_line(ln) for ln in _doc_lines(n.text))
-            label = n.title if not doc else f"{n.title}: {doc}"
+            label = title if not doc else f"{title}: {doc}"
             lines_out.append(f"{IND*depth}{label}")
         elif text_mode == "children":
-            lines_out.append(f"{IND*depth}{n.title}")
+            lines_out.append(f"{IND*depth}{title}")
             for l in _doc_lines(n.text):
                 lines_out.append(f"{IND*(depth+1)}{_render_line(l)}")
         else:
-            label = f"{n.title}{_firstline_snippet(n.text)}"
+            label = f"{title}{_firstline_snippet(n.text)}"
             lines_out.append(f"{IND*depth}{label}")
 
         for cid in children.get(nid, []):
@@ -498,6 +881,98 @@ def to_mermaid_mindmap(
     emit(rid, 1)
     return "\n".join(lines_out)
 
+# flowchart 默认节点样式（Mermaid classDef 样式串）；ibmm.layout 的 SVG 输出共用
+DEFAULT_NODE_STYLES = {
+    "topic":    "fill:#eef6ff,stroke:#5b8,stroke-width:1px;",
+    "title":    "fill:#f0f7ff,stroke:#69c,stroke-width:1px;",
+    "node":     "fill:#ffffff,stroke:#bbb,stroke-width:1px;",
+    "note":     "fill:#f7f7f7,stroke:#999,stroke-width:1px;",
+    "issue":    "fill:#fff6e5,stroke:#d48,stroke-width:1px;",
+    "position": "fill:#f3ffef,stroke:#5a5,stroke-width:1px;",
+    "pro":      "fill:#eafff3,stroke:#5a5,stroke-width:1px;",
+    "con":      "fill:#ffefef,stroke:#d55,stroke-width:1px;",
+    "question": "fill:#fff,stroke:#888,stroke-dasharray: 4 2;",
+}
+ROUNDED_KINDS = ("topic", "title", "node", "note")   # 圆角节点（含其子类型）；其余为直角矩形
+_B36 = "0123456789abcdefghijklmnopqrstuvwxyz"
+
+def _rounded(kind: str) -> bool:
+    return not kind_closure(kind).isdisjoint(ROUNDED_KINDS)
+
+def _base36(i: int) -> str:
+    out = ""
+    while True:
+        i, r = divmod(i, 36)
+        out = _B36[r] + out
+        if not i:
+            return out
+# 论证评分的附加样式类（ArgumentScores.style_class）；同样可由 node_styles 覆盖
+SCORE_NODE_STYLES = {
+    "score_up":   "stroke-width:3px;",
+    "score_down": "stroke-dasharray: 5 3;",
+}
+
+def _resolve_scores(scores: Any, reg: Registry):
+    """
+    scores=True：取 reg 上已挂接的论证评分，未挂接则启用（快照上只就地计算，不挂接）；
+    也可直接传 ArgumentScores。
+    """
+    if scores is True:
+        from .ibis import enable_scoring, get_scores
+        sc = get_scores(reg)
+        return sc if sc is not None else enable_scoring(reg)
+    return scores or None
+
+# 邻域导出（focus=）的附加样式类：焦点节点与仅作上下文的祖先
+EGO_NODE_STYLES = {
+    "focus":   "stroke:#f59e0b,stroke-width:3px;",
+    "context": "opacity:0.6;",
+}
+
+def _ego_selection(reg: Registry, focus: str, hops: int, rels) -> Tuple[Dict[str, int], set]:
+    """focus 的 hops 步邻域（节点 -> 步数），以及加上各节点祖先（上下文）后的选中集合。"""
+    ego = reg.neighbourhood(focus, hops, rels)
+    selected = set(ego)
+    for nid in ego:
+        p = reg.nodes[nid].parent
+        while p and p in reg.nodes and p not in selected:
+            selected.add(p)
+            p = reg.nodes[p].parent
+    return ego, selected
+
+def _ego_edges(reg: Registry, selected: set, ego: Dict[str, int]) -> List[Edge]:
+    """邻域内的候选边（不扫描全图）：两端都在邻域内的索引边，加上选中节点与其父节点之间的 contains。"""
+    out: Dict[int, Edge] = {}
+    for nid in ego:
+        for e in reg._links.get(nid, ()):
+            if e.src in ego and e.dst in ego:
+                out[id(e)] = e
+    edges = sorted(out.values(), key=lambda e: (e.src, e.dst, e.rel, e.label or ""))
+    for nid in sorted(selected):
+        p = reg.nodes[nid].parent
+        if p in selected and (p, nid, "contains", None) in reg._edge_set:
+            edges.append(Edge(p, nid, "contains", None, reg.nodes[nid].module))
+    return edges
+
+def _visible_edges(reg: Registry, selected: set, include, ego: Optional[Dict[str, int]] = None) -> List[Edge]:
+    """
+    flowchart 的边筛选：两端都被选中、rel 在 include 中；节点间已有语义关系时省略 contains。
+    ego（邻域导出）给出时只从邻域的索引边中挑选：语义边两端都须在邻域内，上下文祖先只连 contains。
+    """
+    pool = reg.edges if ego is None else _ego_edges(reg, selected, ego)
+    semantic_relations = set()  # 存储所有已有semantic关系的节点对(src, dst)或(dst, src)
+    for e in pool:
+        if e.rel in ("answers", "supports", "opposes") and e.src in selected and e.dst in selected:
+            semantic_relations.add((e.src, e.dst))
+            semantic_relations.add((e.dst, e.src))  # 反向也加入，确保contains关系被筛选
+    out = []
+    for e in pool:
+        if e.rel == "contains" and (e.src, e.dst) in semantic_relations:
+            continue  # 跳过已有semantic关系的contains边
+        if e.rel in include and e.src in selected and e.dst in selected:
+            out.append(e)
+    return out
+
 def to_mermaid_flowchart(
     root=None,
     include=("contains", "answers", "supports", "opposes", "relates"),
@@ -507,13 +982,20 @@ def to_mermaid_flowchart(
     *,
     text_lines: int | None = None,    # 取 docstring 的前 N 行；None=全部
     subgraphs: list[Any] | None = None,
+    scores: Any = None,
+    compact: bool = False,
+    focus: Any = None,
+    hops: int = 2,
+    rels: Iterable[str] | None = None,
+    reg: Registry | Snapshot | None = None,
+    edit_links: bool = True,
 ) -> str:
     """
     导出 Mermaid flowchart（可选自定义节点/边样式）。
 
     参数
     ----
-    node_styles : 映射 {kind: "Mermaid classDef 样式串"}
+    node_styles : 映射 {kind: "Mermaid classDef 样式串"}；未列出的子类型（make_kind(..., is_a=...)）沿用父类型的样式
         例如: {"issue": "fill:#fff2cc,stroke:#cc7a00,stroke-width:1.5px;"}
     edge_styles : 映射 {rel: "Mermaid linkStyle 样式串"}
         例如: {
@@ -525,30 +1007,45 @@ def to_mermaid_flowchart(
         注意：我们已自动按输出顺序为每条边计算 linkStyle 编号，你无需关心 index。
     text_lines : 取 docstring 的前 N 行；None=全部（默认），0=不显示（等价 show_text=False）。
     subgraphs : 要渲染为 subgraph 的根节点列表，可以是类对象或 qualname 字符串。
+    scores : True 或 ArgumentScores（见 ibmm.ibis）：标签附加论证得分，并按 SCORE_NODE_STYLES 追加样式类。
+    compact : 紧凑输出（大图文本更小、Mermaid 解析更快）：节点 id 为全图排序后序号的 base-36（n0、n1z ...），
+        class / linkStyle 按 kind / rel 合并为一行，编辑链接改为 click 语句（需 securityLevel 'loose'）。
+    focus : 邻域导出（给出时忽略 root）：只输出与 focus 相距 hops 步以内的节点（不分方向沿 rels 的边；
+        rels=None 为 contains 以外的全部关系），并带上它们的祖先作上下文；
+        焦点与上下文节点按 EGO_NODE_STYLES 追加样式类。
+    reg : 导出的 Registry 或快照（Registry.freeze()），默认全局 REGISTRY。
+    edit_links : 标题链接到 edit/<源文件>:<行号>（只有 ibmm-dev 服务器处理）；静态发布时传 False。
     """
     import re
-    REGISTRY.resolve_all()
+    reg = reg if reg is not None else REGISTRY
+    reg.resolve_all()
+    scores = _resolve_scores(scores, reg)
 
     def _resolve_id(ref):
         if ref is None: return None
         if isinstance(ref, str):
-            if ref in REGISTRY.nodes: return ref
+            if ref in reg.nodes: return ref
             tail = ref.split(".")[-1]
-            hits = [k for k in REGISTRY.nodes if k.endswith(f".{tail}") or k == tail]
+            hits = [k for k in reg.nodes if k.endswith(f".{tail}") or k == tail]
             return hits[0] if len(hits) == 1 else None
         return getattr(ref, "__qualname__", None)
 
     rid = _resolve_id(root) if root else None
-
-    # --- 子树选择 ---
-    children = {}
-    for n in REGISTRY.nodes.values():
-        if n.parent:
-            children.setdefault(n.parent, []).append(n.id)
-    for k in children:
-        children[k].sort(key=lambda i: (REGISTRY.nodes[i].kind, REGISTRY.nodes[i].title.lower()))
-
-    if rid:
+    fid = None
+    if focus is not None:
+        fid = _resolve_id(focus)
+        if fid not in reg.nodes:
+            raise ValueError(f"focus node not found or ambiguous: {focus!r}")
+
+    # --- 子树 / 邻域选择 ---
+    ego = None
+    if fid:
+        ego, selected = _ego_selection(reg, fid, hops, rels)
+    elif rid:
+        children = {}
+        for n in reg.nodes.values():
+            if n.parent:
+                children.setdefault(n.parent, []).append(n.id)
         selected = set()
         stack = [rid]
         while stack:
@@ -557,25 +1054,24 @@ def to_mermaid_flowchart(
             selected.add(cur)
             stack.extend(children.get(cur, []))
     else:
-        selected = set(REGISTRY.nodes.keys())
+        selected = set(reg.nodes.keys())
 
     # --- 样式（可被覆盖） ---
-    default_node_styles = {
-        "topic":    "fill:#eef6ff,stroke:#5b8,stroke-width:1px;",
-        "title":    "fill:#f0f7ff,stroke:#69c,stroke-width:1px;",
-        "node":     "fill:#ffffff,stroke:#bbb,stroke-width:1px;",
-        "note":     "fill:#f7f7f7,stroke:#999,stroke-width:1px;",
-        "issue":    "fill:#fff6e5,stroke:#d48,stroke-width:1px;",
-        "position": "fill:#f3ffef,stroke:#5a5,stroke-width:1px;",
-        "pro":      "fill:#eafff3,stroke:#5a5,stroke-width:1px;",
-        "con":      "fill:#ffefef,stroke:#d55,stroke-width:1px;",
-        "question": "fill:#fff,stroke:#888,stroke-dasharray: 4 2;",
-    }
+    default_node_styles = dict(DEFAULT_NODE_STYLES)
+    if scores:
+        default_node_styles.update(SCORE_NODE_STYLES)
+    if ego is not None:
+        default_node_styles.update(EGO_NODE_STYLES)
     if node_styles:
         default_node_styles.update(node_styles)
 
     # --- 工具 ---
-    def safe_id(qn: str) -> str: return "n_" + re.sub(r"[^0-9A-Za-z_]", "_", qn)
+    if compact:
+        # 按全图（而非本次选中的子树）排序编号：同一张图换 root/subgraphs 时 id 不变
+        short_ids = {qn: "n" + _base36(i) for i, qn in enumerate(sorted(reg.nodes))}
+        def safe_id(qn: str) -> str: return short_ids[qn]
+    else:
+        def safe_id(qn: str) -> str: return "n_" + re.sub(r"[^0-9A-Za-z_]", "_", qn)
     def esc_label_quotes(s: str) -> str: return s.replace("\\", "\\\\").replace('"', '\\"')
 
     def _doc_lines(txt: str) -> list[str]:
@@ -597,34 +1093,42 @@ def to_mermaid_flowchart(
 
     # --- 输出 ---
     lines = ["flowchart TD"]
-    ordered_nodes = sorted(list(selected), key=lambda i: REGISTRY.nodes[i].title.lower())
+    ordered_nodes = sorted(list(selected), key=lambda i: reg.nodes[i].title.lower())
+    click_lines = []   # compact：编辑链接
 
     def render_node_definition(nid: str) -> str:
-        n = REGISTRY.nodes[nid]
+        n = reg.nodes[nid]
         label = n.title
 
         # === 追加"编辑链接" ===
         sf = n.meta.get("src_file")
         sl = n.meta.get("src_line")
-        if sf and sl:
+        if edit_links and sf and sl:
             #base = os.path.basename(sf)
             # 单引号属性，避免 Mermaid 语法冲突；可带 target/_blank
             if sf.startswith("/home/pyodide/"):
                 sf = sf[len("/home/pyodide/"):]
-            label = f"<a href='edit/{sf}:{sl}' target='_blank' rel='noopener noreferrer'>{label}</a>"
+            if compact:
+                click_lines.append(f'click {safe_id(nid)} href "edit/{esc_label_quotes(sf)}:{sl}" _blank')
+            else:
+                label = f"<a href='edit/{sf}:{sl}' target='_blank' rel='noopener noreferrer'>{label}</a>"
         # ==========================
 
+        badge = scores.label(nid) if scores else ""
+        if badge:
+            label = label + "<br/>" + badge
+
         more = doc_md_html(n.text)
         if more:
             label = label + "<br/>" + more
 
-        rounded = n.kind in ("topic", "title", "node", "note")
+        rounded = _rounded(n.kind)
         br_l, br_r = ("(", ")") if rounded else ("[", "]")
         return f'{safe_id(nid)}{br_l}"{esc_label_quotes(label)}"{br_r}'
 
     if subgraphs:
         subgraph_root_ids = [_resolve_id(r) for r in subgraphs]
-        subgraph_root_ids = [r for r in subgraph_root_ids if r and r in REGISTRY.nodes]
+        subgraph_root_ids = [r for r in subgraph_root_ids if r and r in reg.nodes]
 
         nodes_in_subgraphs = {}  # root_id -> list of node ids
         standalone_nodes = []
@@ -635,7 +1139,7 @@ def to_mermaid_flowchart(
             path_to_root = []
             while curr:
                 path_to_root.append(curr)
-                curr = REGISTRY.nodes[curr].parent
+                curr = reg.nodes[curr].parent
 
             for ancestor in path_to_root:
                 if ancestor in subgraph_root_ids:
@@ -652,9 +1156,9 @@ def to_mermaid_flowchart(
         for nid in standalone_nodes:
             lines.append(render_node_definition(nid))
 
-        sorted_subgraph_roots = sorted(nodes_in_subgraphs.keys(), key=lambda r: REGISTRY.nodes[r].title.lower())
+        sorted_subgraph_roots = sorted(nodes_in_subgraphs.keys(), key=lambda r: reg.nodes[r].title.lower())
         for root_id in sorted_subgraph_roots:
-            subgraph_title = REGISTRY.nodes[root_id].title
+            subgraph_title = reg.nodes[root_id].title
             lines.append(f'subgraph "{esc_label_quotes(subgraph_title)}"')
             for nid in nodes_in_subgraphs[root_id]:
                 lines.append(f"  {render_node_definition(nid)}")
@@ -663,18 +1167,45 @@ def to_mermaid_flowchart(
         for nid in ordered_nodes:
             lines.append(render_node_definition(nid))
 
-    # classDef（只输出实际出现的 kind）
-    present_kinds = {REGISTRY.nodes[nid].kind for nid in ordered_nodes}
-    for kind in present_kinds:
-        style = default_node_styles.get(kind)
+    # classDef（只输出实际出现的 kind；子类型没有自己的样式时沿用父类型的）
+    present_kinds = {reg.nodes[nid].kind for nid in ordered_nodes}
+    for kind in sorted(present_kinds):   # 集合顺序随进程的哈希种子变化：排序保证输出逐字节稳定（ETag）
+        style = _kind_style(default_node_styles, kind)
         if style:
             lines.append(f"classDef {kind} {style}")
-    for nid in ordered_nodes:
-        lines.append(f"class {safe_id(nid)} {REGISTRY.nodes[nid].kind};")
+    node_classes = [(nid, reg.nodes[nid].kind) for nid in ordered_nodes]
+    if scores:
+        score_classes = [(nid, scores.style_class(nid)) for nid in ordered_nodes]
+        for cls in sorted({c for _, c in score_classes if c}):
+            if default_node_styles.get(cls):
+                lines.append(f"classDef {cls} {default_node_styles[cls]}")
+        node_classes += [(nid, cls) for nid, cls in score_classes if cls]
+    if ego is not None:
+        ego_classes = [(fid, "focus")] + [(nid, "context") for nid in ordered_nodes if nid not in ego]
+        for cls in ("context", "focus"):
+            if default_node_styles.get(cls) and any(c == cls for _, c in ego_classes):
+                lines.append(f"classDef {cls} {default_node_styles[cls]}")
+        node_classes += ego_classes
+    if compact:
+        grouped: Dict[str, List[str]] = {}
+        for nid, cls in node_classes:
+            grouped.setdefault(cls, []).append(safe_id(nid))
+        for cls, ids in grouped.items():
+            lines.append(f"class {','.join(ids)} {cls};")
+        lines.extend(click_lines)
+    else:
+        for nid, cls in node_classes:
+            lines.append(f"class {safe_id(nid)} {cls};")
 
     # 边
     def edge_line(e):
         a, b = safe_id(e.src), safe_id(e.dst)
+        if compact:
+            if e.rel == "contains": return f"{a}---{b}"
+            if e.rel == "relates":
+                label = (e.label or "").strip()
+                return f"{a}-. {esc_label_quotes(label)} .->{b}" if label else f"{a}-.->{b}"
+            return f"{a}-->|{e.rel}|{b}"
         if e.rel == "contains": return f"{a} --- {b}"
         if e.rel == "relates":
             # 若有自定义标签则用标签，否则不显示标签（仅显示点划线）
@@ -686,33 +1217,24 @@ def to_mermaid_flowchart(
                 return f"{a} -..-> {b}"
         return f'{a} -- "{e.rel}" --> {b}'
 
-    # 预处理：找出所有节点之间的关系，检查是否存在semantic关系
-    semantic_relations = set()  # 存储所有已有semantic关系的节点对(src, dst)或(dst, src)
-    for e in REGISTRY.edges:
-        if e.rel in ("answers", "supports", "opposes") and e.src in selected and e.dst in selected:
-            semantic_relations.add((e.src, e.dst))
-            semantic_relations.add((e.dst, e.src))  # 反向也加入，确保contains关系被筛选
-
-    # 过滤边：如果节点间已有semantic关系，则不显示contains关系
-    filtered_edges = []
-    for e in REGISTRY.edges:
-        if e.rel == "contains" and (e.src, e.dst) in semantic_relations:
-            continue  # 跳过已有semantic关系的contains边
-        if e.rel in include and e.src in selected and e.dst in selected:
-            filtered_edges.append(e)
-
-    selected_edges = filtered_edges
+    selected_edges = _visible_edges(reg, selected, include, ego)
     selected_edges.sort(key=lambda e: (0 if e.rel == "contains" else 1, e.rel, e.src, e.dst))
 
     linkstyle_lines = []
     edge_idx = 0
     if edge_styles:
+        by_rel: Dict[str, List[str]] = {}   # compact：同一 rel 的编号合并为一行
         for e in selected_edges:
             lines.append(edge_line(e))
             style = edge_styles.get(e.rel)
             if style:
-                linkstyle_lines.append(f"linkStyle {edge_idx} {style}")
+                if compact:
+                    by_rel.setdefault(e.rel, []).append(str(edge_idx))
+                else:
+                    linkstyle_lines.append(f"linkStyle {edge_idx} {style}")
             edge_idx += 1
+        for rel, idxs in by_rel.items():
+            linkstyle_lines.append(f"linkStyle {','.join(idxs)} {edge_styles[rel]}")
     else:
         for e in selected_edges:
             lines.append(edge_line(e))
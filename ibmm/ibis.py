@@ -1,8 +1,12 @@
 # ibmm/ibis.py
 from __future__ import annotations
+from dataclasses import dataclass
+from typing import Dict, Iterable, List, Optional, Set
+
 from .core import (
     Topic, Title, NodeKind, Note, Question, ___,
-    make_kind, define_relation, auto_edge, REGISTRY
+    make_kind, define_relation, auto_edge, is_a, REGISTRY,
+    Edge, Node, Registry, Snapshot, _register_edge_hook, _register_node_hook,
 )
 
 # 节点类型：IBIS 扩展（仍可在内部混用 Title/NodeKind 作 mind map 展开）
@@ -20,4 +24,283 @@ answers  = define_relation("answers",  allow=("position", "issue"), allow_dst_de
 # 自动语义边（靠层级推断）
 auto_edge(child_kind="position", parent_kind="issue",    rel_name="answers")
 auto_edge(child_kind="pro",      parent_kind="position", rel_name="supports")
-auto_edge(child_kind="con",      parent_kind="position", rel_name="opposes")
\ No newline at end of file
+auto_edge(child_kind="con",      parent_kind="position", rel_name="opposes")
+
+# ---------- 论证评分 ----------
+# 自底向上汇总论据强度：
+#
+# - 论据（argument）-> 目标（target）：supports/opposes/answers 边（目标为 Title 等时取最近的 IBIS 祖先），
+#   以及嵌套：pro/con/position 归属于最近的 IBIS 祖先（与 allow_dst_descendant 的放宽一致）。
+#   position 只作为 issue 的论据。子类型（如 make_kind("risk", is_a="con")）按其 IBIS 祖先类型计分。
+# - pro/con 的强度 = max(0, weight + 支持它的强度之和 - 反对它的强度之和)；weight 取 meta["weight"]，默认 1。
+# - position：pro/con 为论据树中的 pro/con 节点数，pro_score/con_score 为直接论据的强度之和。
+# - issue：汇总各 position 的计数与得分，best 为 net 最高的 position。
+#
+# 用法：
+#     from ibmm.ibis import enable_scoring
+#     scores = enable_scoring()       # 挂到全局 REGISTRY：一次后序遍历，之后加边只重算受影响的祖先
+#     scores[some_id].net
+#     to_mermaid_flowchart(scores=True)
+SCORED_KINDS = ("issue", "position", "pro", "con")
+ARGUMENT_RELS = ("supports", "opposes", "answers")
+
+def _role(kind: str) -> Optional[str]:
+    """kind 在评分中的角色：SCORED_KINDS 之一（子类型取其 IBIS 祖先），否则 None。"""
+    if kind in SCORED_KINDS:
+        return kind
+    for k in SCORED_KINDS:
+        if is_a(kind, k):
+            return k
+    return None
+
+@dataclass(frozen=True)
+class Score:
+    pro: int = 0                 # 论据树中的 pro 节点数（同一论据经多条路径到达时各计一次）
+    con: int = 0
+    pro_score: float = 0.0       # 直接支持者强度之和（issue：各 position 之和）
+    con_score: float = 0.0
+    strength: float = 0.0        # pro/con 作为论据的强度
+    positions: int = 0           # issue：回答它的 position 数
+    best: Optional[str] = None   # issue：net 最高的 position
+
+    @property
+    def net(self) -> float:
+        return self.pro_score - self.con_score
+
+class ArgumentScores:
+    """reg 上的论证评分；enable_scoring 挂接后由节点/边钩子增量维护。"""
+    def __init__(self, reg: Registry = REGISTRY):
+        self.reg = reg
+        self.scores: Dict[str, Score] = {}
+        self._args: Dict[str, Dict[str, int]] = {}    # 目标 -> {论据: 引用数}（嵌套与每条边各计 1）
+        self._targets: Dict[str, Set[str]] = {}       # 论据 -> 目标
+        self._nest: Dict[str, str] = {}               # 论据 -> 按嵌套推断的目标
+        self._cyclic = False                          # 论据图有环：结果依赖遍历顺序，增量改为整体重算
+        self.rebuild()
+
+    def __getitem__(self, nid: str) -> Score:
+        return self.scores[nid]
+
+    def get(self, nid: str) -> Optional[Score]:
+        return self.scores.get(nid)
+
+    def copy(self, reg: Registry) -> "ArgumentScores":
+        """绑定到 reg 的副本（Registry 冻结后首次写入时调用；Score 不可变，直接共享）。"""
+        new = ArgumentScores.__new__(ArgumentScores)
+        new.reg = reg
+        new.scores = dict(self.scores)
+        new._args = {t: dict(refs) for t, refs in self._args.items()}
+        new._targets = {a: set(ts) for a, ts in self._targets.items()}
+        new._nest = dict(self._nest)
+        new._cyclic = self._cyclic
+        return new
+
+    # ---------- 索引 ----------
+    def _anchor(self, nid: Optional[str]) -> Optional[str]:
+        nodes = self.reg.nodes
+        while nid is not None and nid in nodes:
+            n = nodes[nid]
+            if _role(n.kind):
+                return nid
+            nid = n.parent
+        return None
+
+    def _link(self, a: str, t: Optional[str]) -> bool:
+        nodes = self.reg.nodes
+        if t is None or a == t or a not in nodes:
+            return False
+        ak = _role(nodes[a].kind)
+        if not (ak in ("pro", "con") or (ak == "position" and _role(nodes[t].kind) == "issue")):
+            return False
+        refs = self._args.setdefault(t, {})
+        refs[a] = refs.get(a, 0) + 1
+        self._targets.setdefault(a, set()).add(t)
+        return True
+
+    def _unlink(self, a: str, t: str) -> None:
+        refs = self._args.get(t)
+        if not refs or a not in refs:
+            return
+        refs[a] -= 1
+        if not refs[a]:
+            del refs[a]
+            self._targets[a].discard(t)
+
+    def _nest_target(self, nid: str) -> Optional[str]:
+        n = self.reg.nodes[nid]
+        return self._anchor(n.parent) if _role(n.kind) in ("pro", "con", "position") else None
+
+    def rebuild(self) -> None:
+        """从 reg 重建索引并整体计算。"""
+        self._args.clear(); self._targets.clear(); self._nest.clear()
+        for nid in self.reg.nodes:
+            t = self._nest_target(nid)
+            if self._link(nid, t):
+                self._nest[nid] = t
+        for e in self.reg.edges:
+            if e.rel in ARGUMENT_RELS:
+                self._link(e.src, self._anchor(e.dst))
+        self.compute()
+
+    # ---------- 计算 ----------
+    def _score(self, t: str) -> Score:
+        """由论据（已算好的）得分合成 t 的得分；未算出的论据（成环时栈上的节点）忽略。"""
+        nodes = self.reg.nodes
+        n = nodes[t]
+        pro = con = positions = 0
+        ps = cs = 0.0
+        best, best_net = None, 0.0
+        for a in self._args.get(t, ()):
+            s = self.scores.get(a)
+            if s is None:
+                continue
+            ak = _role(nodes[a].kind)
+            if ak == "position":
+                positions += 1
+                pro += s.pro; con += s.con
+                ps += s.pro_score; cs += s.con_score
+                if best is None or s.net > best_net or (s.net == best_net and a < best):
+                    best, best_net = a, s.net
+            elif ak == "pro":
+                pro += 1 + s.pro; con += s.con
+                ps += s.strength
+            else:
+                con += 1 + s.con; pro += s.pro
+                cs += s.strength
+        strength = max(0.0, float(n.meta.get("weight", 1.0)) + ps - cs) if _role(n.kind) in ("pro", "con") else 0.0
+        return Score(pro, con, ps, cs, strength, positions, best)
+
+    def compute(self) -> None:
+        """一次后序遍历（迭代 DFS，论据先于目标）；成环时回边不计入（论据按 id 排序，结果确定）。"""
+        self.scores.clear()
+        self._cyclic = False
+        nodes = self.reg.nodes
+        state: Dict[str, int] = {}   # 1 = 在栈上，2 = 已完成
+        for root in nodes:
+            if root in state or not _role(nodes[root].kind):
+                continue
+            state[root] = 1
+            stack = [(root, iter(sorted(self._args.get(root, ()))))]
+            while stack:
+                nid, it = stack[-1]
+                for a in it:
+                    if a not in state:
+                        state[a] = 1
+                        stack.append((a, iter(sorted(self._args.get(a, ())))))
+                        break
+                    if state[a] == 1:
+                        self._cyclic = True
+                else:
+                    stack.pop()
+                    self.scores[nid] = self._score(nid)
+                    state[nid] = 2
+
+    def _refresh(self, starts: Iterable[str]) -> None:
+        """只重算 starts 及其（传递）目标：在受影响子图内按拓扑序；有环时整体重算。"""
+        if self._cyclic:
+            self.compute()
+            return
+        nodes = self.reg.nodes
+        affected: Set[str] = set()
+        todo = [x for x in starts if x in nodes and _role(nodes[x].kind)]
+        while todo:
+            x = todo.pop()
+            if x not in affected:
+                affected.add(x)
+                todo.extend(self._targets.get(x, ()))
+        indeg = {t: sum(1 for a in self._args.get(t, ()) if a in affected) for t in affected}
+        ready = [t for t, d in indeg.items() if not d]
+        order: List[str] = []
+        while ready:
+            x = ready.pop()
+            order.append(x)
+            for t in self._targets.get(x, ()):
+                if t in affected:
+                    indeg[t] -= 1
+                    if not indeg[t]:
+                        ready.append(t)
+        if len(order) < len(affected):
+            self.compute()
+            return
+        for x in order:
+            self.scores[x] = self._score(x)
+
+    # ---------- 增量 ----------
+    def _on_edge(self, e: Edge) -> None:
+        t = self._anchor(e.dst)
+        if self._link(e.src, t):
+            self._refresh((e.src, t))
+
+    def _on_node(self, n: Node) -> None:
+        # 新节点可能成为其下方（经由非 IBIS 节点）的 pro/con/position 的新归属
+        frontier, todo = [], [n.id]
+        while todo:
+            x = todo.pop()
+            if x != n.id and _role(self.reg.nodes[x].kind):
+                frontier.append(x)
+                continue
+            todo.extend(c for c in self.reg._children.get(x, ()) if c in self.reg.nodes)
+        starts = [n.id]
+        for a in [n.id] + frontier:
+            old, new = self._nest.get(a), self._nest_target(a)
+            if old == new:
+                continue
+            if old is not None:
+                self._unlink(a, old)
+                del self._nest[a]
+            if self._link(a, new):
+                self._nest[a] = new
+            starts += [a] + [t for t in (old, new) if t is not None]
+        self._refresh(starts)
+
+    # ---------- 导出用 ----------
+    def label(self, nid: str) -> str:
+        """节点标签后附加的得分摘要；无论据时为空串。"""
+        s = self.scores.get(nid)
+        if s is None:
+            return ""
+        kind = _role(self.reg.nodes[nid].kind)
+        if kind == "issue":
+            return f"▲{s.pro} ▼{s.con} · {s.positions} positions" if s.positions or s.pro or s.con else ""
+        if kind == "position":
+            return f"▲{s.pro} ▼{s.con} · net {s.net:+g}"
+        return f"▲{s.pro} ▼{s.con} · strength {s.strength:g}" if s.pro or s.con else ""
+
+    def style_class(self, nid: str) -> Optional[str]:
+        """position 按 net 正负、被驳倒（强度为 0）的 pro/con 给出附加样式类（见 core.SCORE_NODE_STYLES）。"""
+        s = self.scores.get(nid)
+        if s is None:
+            return None
+        kind = _role(self.reg.nodes[nid].kind)
+        if kind == "position" and s.net:
+            return "score_up" if s.net > 0 else "score_down"
+        if kind in ("pro", "con") and not s.strength:
+            return "score_down"
+        return None
+
+def enable_scoring(reg: Registry = REGISTRY) -> ArgumentScores:
+    """
+    为 reg 计算（或重算）论证评分，并在之后的 add_node / add_edge 中增量维护。
+    reg 为快照时只算不挂接：快照被多个线程无锁共享，不能写入。
+    """
+    if isinstance(reg, Snapshot):
+        return ArgumentScores(reg)
+    reg.resolve_all()
+    reg._thaw()   # 已发出的快照不变；下次 freeze() 带上评分
+    reg._scores = ArgumentScores(reg)
+    return reg._scores
+
+def get_scores(reg: Registry = REGISTRY) -> Optional[ArgumentScores]:
+    return getattr(reg, "_scores", None)
+
+def _score_node(reg: Registry, n: Node) -> None:
+    sc = getattr(reg, "_scores", None)
+    if sc is not None:
+        sc._on_node(n)
+_register_node_hook(_score_node)
+
+def _score_edge(reg: Registry, e: Edge) -> None:
+    sc = getattr(reg, "_scores", None)
+    if sc is not None and e.rel in ARGUMENT_RELS:
+        sc._on_edge(e)
+_register_edge_hook(_score_edge)
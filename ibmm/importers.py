@@ -0,0 +1,262 @@
+# ibmm/importers.py
+"""
+把已有的大纲 / 思维导图直接导入 Registry（不生成类），之后即可用任意导出器渲染：
+
+- OPML           : import_opml      （ElementTree.iterparse，逐个 <outline> 处理后即丢弃）
+- FreeMind .mm   : import_freemind  （同上；<arrowlink> 转为 relates 边）
+- Markdown 标题  : import_markdown  （逐行读取；标题之间的正文作为节点文本）
+- 按扩展名分派   : import_file
+
+层级 -> kind：根为 topic，第一层为 title，更深为 node（level_kinds 可改）。
+批注 -> IBIS kind（优先于层级）：
+  - 标题前缀 "[issue] ..." / "Issue: ..."（question->issue、idea->position 同义，大小写不敏感）；
+  - OPML 的 type / ibis 属性；FreeMind 图标 help/idea/button_ok/button_cancel 等。
+
+节点按批调用 Registry.bulk_add（仍经过 auto_edge 与关系校验）；解析侧只保留当前路径上的元素，
+因此内存只随节点数（Registry 本身）增长，与文件大小无关。
+
+用法：
+    from ibmm.importers import import_file
+    root = import_file("roadmap.opml")        # -> 根节点 id
+    print(to_mermaid_mindmap(root))
+"""
+from __future__ import annotations
+import io, os, re
+import xml.etree.ElementTree as ET
+from typing import IO, Dict, Iterator, List, Optional, Sequence, Tuple, Union
+
+from .core import Node, REGISTRY, Registry
+
+Source = Union[str, os.PathLike, IO]
+
+LEVEL_KINDS = ("topic", "title", "node")   # 按深度取，超出部分沿用最后一个
+BATCH = 5000                              # 每批写入 Registry 的节点数
+
+_KIND_ALIASES = {"issue": "issue", "question": "issue", "position": "position", "idea": "position",
+                 "pro": "pro", "con": "con"}
+_ANNOTATION = re.compile(r"^\s*(?:\[(issue|question|position|idea|pro|con)\]|(issue|question|position|idea|pro|con)\s*:)\s*",
+                         re.I)
+# FreeMind 内置图标 -> IBIS kind
+FREEMIND_ICONS = {
+    "help": "issue", "idea": "position",
+    "button_ok": "pro", "yes": "pro", "ksmiletris": "pro",
+    "button_cancel": "con", "stop-sign": "con", "messagebox_warning": "con",
+}
+
+# ---------- 公共 ----------
+def _split_annotation(text: str) -> Tuple[Optional[str], str]:
+    """'[pro] 更便宜' -> ('pro', '更便宜')；无批注返回 (None, 原文)。"""
+    m = _ANNOTATION.match(text)
+    if not m:
+        return None, text
+    return _KIND_ALIASES[(m.group(1) or m.group(2)).lower()], text[m.end():]
+
+def _clean(s: Optional[str]) -> str:
+    return " ".join((s or "").split())
+
+def _root_id(reg: Registry, source: Source, root_id: Optional[str]) -> str:
+    """默认取文件名（去扩展名、非标识符字符换成 _）；与已有节点重名时加 _2、_3 ..."""
+    if root_id is None:
+        name = source if isinstance(source, (str, os.PathLike)) else getattr(source, "name", "")
+        stem = os.path.splitext(os.path.basename(os.fspath(name)))[0] if isinstance(name, (str, os.PathLike)) else ""
+        root_id = re.sub(r"\W", "_", stem) or "Imported"
+        if root_id[0].isdigit():
+            root_id = "_" + root_id
+    base, i = root_id, 2
+    while root_id in reg.nodes:
+        root_id, i = f"{base}_{i}", i + 1
+    return root_id
+
+class _Sink:
+    """收集节点/边，按批 bulk_add；边在全部节点写入后再加（端点可能出现在后面）。"""
+    def __init__(self, reg: Registry, level_kinds: Sequence[str], batch: int):
+        self.reg = reg
+        self.level_kinds = tuple(level_kinds)
+        self.batch = batch
+        self.nodes: List[Node] = []
+        self.edges: List[Tuple[str, str, str]] = []
+        self.count = 0
+
+    def kind(self, depth: int, annotated: Optional[str]) -> str:
+        return annotated or self.level_kinds[min(depth, len(self.level_kinds) - 1)]
+
+    def child_id(self, parent: Optional[str], fallback: str) -> str:
+        self.count += 1
+        return f"{parent}.N{self.count}" if parent else fallback
+
+    def node(self, nid: str, kind: str, title: str, text: str, parent: Optional[str], meta: Optional[dict] = None):
+        self.nodes.append(Node(nid, kind, title or "(untitled)", text, parent, meta or {}))
+        if len(self.nodes) >= self.batch:
+            self.flush()
+
+    def flush(self):
+        if self.nodes:
+            self.reg.bulk_add(self.nodes)
+            self.nodes = []
+
+    def close(self):
+        self.flush()
+        self.reg.bulk_add(edges=self.edges)
+        self.edges = []
+
+def _iter_xml(source: Source, prune: str) -> Iterator[Tuple[str, ET.Element]]:
+    """
+    iterparse 的 (event, elem)；每个 prune 元素（<outline> / <node>）在 end 事件处理完后即清空并从父元素移除，
+    其余元素（icon、richcontent 等）随所属节点一起释放。任一时刻只保留从根到当前节点的路径。
+    """
+    stack: List[ET.Element] = []
+    for event, elem in ET.iterparse(source, events=("start", "end")):
+        if event == "start":
+            stack.append(elem)
+            yield event, elem
+            continue
+        stack.pop()
+        yield event, elem
+        if elem.tag.rsplit("}", 1)[-1] == prune:
+            elem.clear()
+            if stack:
+                stack[-1].remove(elem)   # 之前的兄弟已移除，remove 只需比较一次
+
+# ---------- OPML ----------
+def import_opml(source: Source, reg: Optional[Registry] = None, *, root_id: Optional[str] = None,
+                level_kinds: Sequence[str] = LEVEL_KINDS, batch: int = BATCH) -> str:
+    """
+    <head><title> 作为根节点（topic），每个 <outline text=...> 一个子节点；
+    _note / note 属性为节点文本，type / ibis 属性或文字前缀给出 IBIS kind。返回根节点 id。
+    """
+    reg = reg if reg is not None else REGISTRY
+    sink = _Sink(reg, level_kinds, batch)
+    rid = _root_id(reg, source, root_id)
+    title = ""
+    open_ids: List[str] = [rid]
+    pending: List[Tuple[str, str, str, str, str]] = []   # 与 open_ids[1:] 对应：(id, kind, title, text, parent)
+    for event, elem in _iter_xml(source, "outline"):
+        tag = elem.tag.rsplit("}", 1)[-1]
+        if tag == "outline":
+            if event == "start":
+                attrs = elem.attrib
+                annotated, text = _split_annotation(_clean(attrs.get("text") or attrs.get("title")))
+                for key in ("ibis", "type"):
+                    annotated = annotated or _KIND_ALIASES.get((attrs.get(key) or "").lower())
+                parent = open_ids[-1]
+                nid = sink.child_id(parent, rid)
+                pending.append((nid, sink.kind(len(open_ids), annotated), text,
+                                (attrs.get("_note") or attrs.get("note") or "").strip(), parent))
+                open_ids.append(nid)
+            else:
+                # 后序写入：子节点先于父节点（与嵌套类的装饰顺序一致）
+                sink.node(*pending.pop())
+                open_ids.pop()
+        elif tag == "title" and event == "end" and len(open_ids) == 1:
+            title = _clean(elem.text)
+    sink.node(rid, sink.kind(0, None), title or rid.replace("_", " "), "", None)
+    sink.close()
+    return rid
+
+# ---------- FreeMind ----------
+def _rich_text(elem: ET.Element) -> str:
+    return " ".join(t.strip() for t in elem.itertext() if t.strip())
+
+def import_freemind(source: Source, reg: Optional[Registry] = None, *, root_id: Optional[str] = None,
+                    level_kinds: Sequence[str] = LEVEL_KINDS, batch: int = BATCH) -> str:
+    """
+    FreeMind / Freeplane .mm：根 <node> 即根节点；标题取 TEXT 属性或 richcontent TYPE=NODE，
+    richcontent TYPE=NOTE 为节点文本；<icon BUILTIN=...> 按 FREEMIND_ICONS 给出 IBIS kind，
+    <arrowlink DESTINATION=...> 转为 relates 边。返回根节点 id。
+    """
+    reg = reg if reg is not None else REGISTRY
+    sink = _Sink(reg, level_kinds, batch)
+    rid = _root_id(reg, source, root_id)
+    by_fm_id: Dict[str, str] = {}              # FreeMind ID -> 节点 id（箭头连线用）
+    links: List[Tuple[str, str]] = []          # (源节点 id, 目标 FreeMind ID)
+    open_ids: List[str] = []
+    for event, elem in _iter_xml(source, "node"):
+        if elem.tag != "node":
+            continue
+        if event == "start":
+            nid = sink.child_id(open_ids[-1] if open_ids else None, rid)
+            open_ids.append(nid)
+            if elem.get("ID"):
+                by_fm_id[elem.get("ID")] = nid
+            continue
+        # 后序写入：子节点先于父节点（与嵌套类的装饰顺序一致）；此时子 <node> 已移除，只剩本节点的内容
+        nid = open_ids.pop()
+        title, note, icon_kind = elem.get("TEXT"), "", None
+        for child in elem:
+            if child.tag == "icon" and icon_kind is None:
+                icon_kind = FREEMIND_ICONS.get(child.get("BUILTIN", ""))
+            elif child.tag == "arrowlink" and child.get("DESTINATION"):
+                links.append((nid, child.get("DESTINATION")))
+            elif child.tag == "richcontent":
+                if child.get("TYPE") == "NOTE":
+                    note = _rich_text(child)
+                elif title is None:
+                    title = _rich_text(child)
+        annotated, title = _split_annotation(_clean(title))
+        sink.node(nid, sink.kind(len(open_ids), annotated or icon_kind), title, note,
+                  open_ids[-1] if open_ids else None, {"link": elem.get("LINK")} if elem.get("LINK") else None)
+    sink.edges.extend((src, by_fm_id[dst], "relates") for src, dst in links if dst in by_fm_id)
+    sink.close()
+    return rid
+
+# ---------- Markdown ----------
+_HEADING = re.compile(r"^(#{1,6})\s+(.*?)\s*#*\s*$")
+_FENCE = re.compile(r"^\s*(```|~~~)")
+
+def _lines(source: Source) -> Iterator[str]:
+    if isinstance(source, (str, os.PathLike)):
+        with open(source, encoding="utf-8") as f:
+            yield from f
+    elif isinstance(source, io.TextIOBase):
+        yield from source
+    else:
+        yield from io.TextIOWrapper(source, encoding="utf-8")
+
+def import_markdown(source: Source, reg: Optional[Registry] = None, *, root_id: Optional[str] = None,
+                    level_kinds: Sequence[str] = LEVEL_KINDS, batch: int = BATCH) -> str:
+    """
+    ATX 标题（# ~ ######）构成层级，标题下方到下一个标题之间的正文为节点文本；
+    代码块中的 # 行不算标题。所有顶层标题挂在以文件名命名的根节点下。返回根节点 id。
+    """
+    reg = reg if reg is not None else REGISTRY
+    sink = _Sink(reg, level_kinds, batch)
+    rid = _root_id(reg, source, root_id)
+    stack: List[Tuple[int, str]] = [(0, rid)]          # (标题级别, 节点 id)
+    cur: Optional[list] = None                        # 当前节点 [id, kind, title, 正文行, parent]
+    root_text: List[str] = []
+    in_fence = False
+
+    def emit():
+        if cur is not None:
+            sink.node(cur[0], cur[1], cur[2], "\n".join(cur[3]).strip(), cur[4])
+
+    for raw in _lines(source):
+        line = raw.rstrip("\n").rstrip()
+        if _FENCE.match(line):
+            in_fence = not in_fence
+        m = None if in_fence else _HEADING.match(line)
+        if not m:
+            (cur[3] if cur is not None else root_text).append(line)
+            continue
+        emit()
+        level = len(m.group(1))
+        while stack[-1][0] >= level:
+            stack.pop()
+        annotated, title = _split_annotation(_clean(m.group(2)))
+        parent = stack[-1][1]
+        nid = sink.child_id(parent, rid)
+        cur = [nid, sink.kind(len(stack), annotated), title, [], parent]
+        stack.append((level, nid))
+    emit()
+    sink.node(rid, sink.kind(0, None), rid.replace("_", " "), "\n".join(root_text).strip(), None)
+    sink.close()
+    return rid
+
+# ---------- 按扩展名 ----------
+IMPORTERS = {".opml": import_opml, ".mm": import_freemind, ".md": import_markdown, ".markdown": import_markdown}
+
+def import_file(path: Union[str, os.PathLike], reg: Optional[Registry] = None, **kwargs) -> str:
+    ext = os.path.splitext(os.fspath(path))[1].lower()
+    if ext not in IMPORTERS:
+        raise ValueError(f"Unsupported outline format: {ext!r} (expected {', '.join(IMPORTERS)})")
+    return IMPORTERS[ext](path, reg, **kwargs)
@@ -0,0 +1,487 @@
+# ibmm/layout.py
+"""
+纯 Python 的分层（Sugiyama）布局，直接输出独立 SVG（不依赖 Mermaid / 浏览器）：
+
+1. 去环：从根开始迭代 DFS，把回边反向（绘制时仍按原方向画箭头）；
+2. 分层：最长路径分层，再把出度大于入度的节点下移贴近后继，缩短长边；
+3. 排序：长边拆成虚拟节点，按相邻层重心上下扫描，用双层累加树计数交叉并保留最好的一轮；
+4. 坐标：以相邻层重心为目标 x，左推、右推各消除一次重叠后取平均。
+
+节点与边的选择同 to_mermaid_flowchart；样式沿用 DEFAULT_NODE_STYLES（Mermaid 样式串转为 CSS）。
+
+用法：
+    from ibmm.layout import to_svg
+    svg = to_svg(root=None, text_lines=2)
+"""
+from __future__ import annotations
+import re
+from dataclasses import dataclass
+from html import escape
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+from .core import (DEFAULT_NODE_STYLES, REGISTRY, Registry, Snapshot, _ego_selection, _kind_style,
+                   _md_to_text_line, _resolve_scores, _rounded, _visible_edges)
+
+# ---------- 尺寸 ----------
+FONT_SIZE = 13
+LINE_HEIGHT = 18
+PAD_X, PAD_Y = 12, 8
+NODE_GAP = 24         # 同层相邻节点的最小水平间距
+DUMMY_GAP = 6         # 相邻虚拟节点（长边经过点）的最小间距
+LAYER_GAP = 56        # 相邻层之间的垂直间距
+MARGIN = 16
+MAX_LINE_CHARS = 40   # 每行文字的最大字符数（超出截断）
+SWEEPS = 4            # 交叉减少 / 坐标迭代的轮数
+
+@dataclass
+class LayoutNode:
+    id: str
+    kind: str
+    x: float          # 左上角
+    y: float
+    w: float
+    h: float
+    layer: int
+    lines: List[str]  # 第一行为标题
+
+@dataclass
+class LayoutEdge:
+    src: str
+    dst: str
+    rel: str
+    label: Optional[str]
+    points: List[Tuple[float, float]]   # 从 src 到 dst 的折线
+
+@dataclass
+class Layout:
+    nodes: Dict[str, LayoutNode]
+    edges: List[LayoutEdge]
+    width: float
+    height: float
+    crossings: int = 0
+
+# ---------- 文本 ----------
+def _text_width(s: str) -> float:
+    """估算文字宽度：CJK 等宽字符按一个字号，其余按 0.6 个字号。"""
+    wide = sum(1 for ch in s if ord(ch) >= 0x1100)
+    return (wide + 0.6 * (len(s) - wide)) * FONT_SIZE
+
+def _clip(s: str) -> str:
+    return s if len(s) <= MAX_LINE_CHARS else s[:MAX_LINE_CHARS - 1] + "…"
+
+def _node_lines(title: str, text: str, show_text: bool, text_lines: Optional[int]) -> List[str]:
+    lines = [_clip(title)]
+    if show_text and text_lines != 0:
+        arr = [ln.strip() for ln in (text or "").splitlines()]
+        arr = [ln for ln in arr if ln]
+        if text_lines is not None:
+            arr = arr[:text_lines]
+        lines.extend(_clip(_md_to_text_line(ln)) for ln in arr)
+    return lines
+
+# ---------- 选择 ----------
+def _resolve_root(reg: Registry, ref: Any) -> Optional[str]:
+    if isinstance(ref, str):
+        if ref in reg.nodes: return ref
+        tail = ref.split(".")[-1]
+        hits = [k for k in reg.nodes if k.endswith(f".{tail}") or k == tail]
+        return hits[0] if len(hits) == 1 else None
+    return getattr(ref, "__qualname__", None)
+
+def _ordered_ids(reg: Registry, rid: Optional[str], only: Optional[set] = None) -> List[str]:
+    """先序遍历（子节点按 kind、标题排序，同 flowchart），作为各层的初始顺序；only 给出时限于该集合。"""
+    def kids(nid: str) -> List[str]:
+        out = [c for c in reg._children.get(nid, ())
+               if c in reg.nodes and reg.nodes[c].parent == nid and (only is None or c in only)]
+        out.sort(key=lambda i: (reg.nodes[i].kind, reg.nodes[i].title.lower()), reverse=True)
+        return out
+    if only is not None:
+        roots = sorted((nid for nid in only if reg.nodes[nid].parent not in only),
+                       key=lambda i: reg.nodes[i].title.lower(), reverse=True)
+    elif rid:
+        roots = [rid] if rid in reg.nodes else []
+    else:
+        roots = sorted((nid for nid, n in reg.nodes.items() if not n.parent or n.parent not in reg.nodes),
+                       key=lambda i: reg.nodes[i].title.lower(), reverse=True)
+    seen, order, stack = set(), [], roots
+    while stack:
+        nid = stack.pop()
+        if nid in seen: continue
+        seen.add(nid)
+        order.append(nid)
+        stack.extend(kids(nid))
+    return order
+
+# ---------- 1) 去环 ----------
+def _reverse_back_edges(n: int, pairs: Sequence[Tuple[int, int]]) -> set:
+    """返回需要反向的边下标（DFS 回边）。"""
+    out: List[List[Tuple[int, int]]] = [[] for _ in range(n)]
+    for k, (u, v) in enumerate(pairs):
+        out[u].append((v, k))
+    state = bytearray(n)   # 0 未访问 / 1 在栈上 / 2 已完成
+    back = set()
+    for s in range(n):
+        if state[s]: continue
+        state[s] = 1
+        stack = [(s, 0)]
+        while stack:
+            u, i = stack[-1]
+            if i < len(out[u]):
+                stack[-1] = (u, i + 1)
+                v, k = out[u][i]
+                if state[v] == 1:
+                    back.add(k)
+                elif state[v] == 0:
+                    state[v] = 1
+                    stack.append((v, 0))
+            else:
+                state[u] = 2
+                stack.pop()
+    return back
+
+# ---------- 2) 分层 ----------
+def _assign_layers(n: int, dag: Sequence[Tuple[int, int]]) -> List[int]:
+    succ: List[List[int]] = [[] for _ in range(n)]
+    npred = [0] * n
+    for u, v in set(dag):
+        succ[u].append(v)
+        npred[v] += 1
+    indeg = list(npred)
+    topo = [u for u in range(n) if not indeg[u]]
+    for u in topo:   # Kahn：边遍历边追加
+        for v in succ[u]:
+            indeg[v] -= 1
+            if not indeg[v]:
+                topo.append(v)
+    layer = [0] * n
+    for u in topo:
+        for v in succ[u]:
+            if layer[v] <= layer[u]:
+                layer[v] = layer[u] + 1
+    # 出边多于入边的节点下移到紧挨最浅后继的一层（只会缩短总边长）
+    for u in reversed(topo):
+        if succ[u] and len(succ[u]) > npred[u]:
+            layer[u] = min(layer[v] for v in succ[u]) - 1
+    base = min(layer, default=0)
+    return [l - base for l in layer]
+
+# ---------- 3) 交叉减少 ----------
+def _bilayer_crossings(row: Sequence[int], down: Sequence[Sequence[int]], pos: Sequence[int], q: int) -> int:
+    """相邻两层之间的交叉数（Barth–Jünger–Mutzel 累加树，O(E log V)）。"""
+    first = 1
+    while first < q:
+        first <<= 1
+    tree = [0] * (2 * first - 1)
+    first -= 1
+    cross = 0
+    for v in row:
+        for p in sorted(pos[w] for w in down[v]):
+            idx = p + first
+            tree[idx] += 1
+            while idx > 0:
+                if idx % 2:
+                    cross += tree[idx + 1]
+                idx = (idx - 1) >> 1
+                tree[idx] += 1
+    return cross
+
+def _count_crossings(layers: List[List[int]], down, pos) -> int:
+    return sum(_bilayer_crossings(layers[i], down, pos, len(layers[i + 1])) for i in range(len(layers) - 1))
+
+def _reorder(row: List[int], adj, pos: List[int]) -> None:
+    """按 adj 中邻居的平均位置（重心）重排一层；没有邻居的节点保持原位次。"""
+    keyed = []
+    for j, v in enumerate(row):
+        nb = adj[v]
+        keyed.append(((sum(pos[w] for w in nb) / len(nb)) if nb else j, j, v))
+    keyed.sort()
+    for j, (_, _, v) in enumerate(keyed):
+        row[j] = v
+        pos[v] = j
+
+def _minimize_crossings(layers: List[List[int]], up, down, pos: List[int]) -> int:
+    best = _count_crossings(layers, down, pos)
+    best_layers = [list(r) for r in layers]
+    for _ in range(SWEEPS):
+        if not best:
+            break
+        for i in range(1, len(layers)):
+            _reorder(layers[i], up, pos)
+        for i in range(len(layers) - 2, -1, -1):
+            _reorder(layers[i], down, pos)
+        c = _count_crossings(layers, down, pos)
+        if c >= best:
+            break
+        best, best_layers = c, [list(r) for r in layers]
+    for i, r in enumerate(best_layers):
+        layers[i] = r
+        for j, v in enumerate(r):
+            pos[v] = j
+    return best
+
+# ---------- 4) 坐标 ----------
+def _place_row(row: List[int], cx: List[float], w: List[float], real: int, adj_lists) -> None:
+    """目标 x = 邻居中心的平均值；左推与右推各得到一个无重叠解，取平均（仍无重叠）。"""
+    if not row: return
+    target = []
+    for v in row:
+        acc = cnt = 0
+        for adj in adj_lists:
+            for u in adj[v]:
+                acc += cx[u]
+                cnt += 1
+        target.append(acc / cnt if cnt else cx[v])
+    seps = [0.0] + [(w[a] + w[b]) / 2 + (NODE_GAP if a < real or b < real else DUMMY_GAP)
+                    for a, b in zip(row, row[1:])]
+    left = list(target)
+    for i in range(1, len(row)):
+        left[i] = max(left[i], left[i - 1] + seps[i])
+    right = list(target)
+    for i in range(len(row) - 2, -1, -1):
+        right[i] = min(right[i], right[i + 1] - seps[i + 1])
+    for i, v in enumerate(row):
+        cx[v] = (left[i] + right[i]) / 2
+
+def _assign_x(layers: List[List[int]], up, down, w: List[float], real: int) -> List[float]:
+    cx = [0.0] * len(w)
+    for row in layers:   # 初始：各层从左紧排
+        x = 0.0
+        for v in row:
+            cx[v] = x + w[v] / 2
+            x += w[v] + NODE_GAP
+    for _ in range(SWEEPS):
+        for row in layers[1:]:
+            _place_row(row, cx, w, real, (up,))
+        for row in reversed(layers[:-1]):
+            _place_row(row, cx, w, real, (down,))
+    for row in layers:
+        _place_row(row, cx, w, real, (up, down))
+    return cx
+
+# ---------- 布局 ----------
+def layout(
+    root=None,
+    include=("contains", "answers", "supports", "opposes", "relates"),
+    show_text=True,
+    *,
+    text_lines: int | None = 2,   # 取 docstring 的前 N 行；None=全部，0=不显示
+    reg: Registry | Snapshot | None = None,
+    scores: Any = None,           # True / ArgumentScores：标题下方附加论证得分
+    focus: Any = None,            # 邻域布局（同 to_mermaid_flowchart 的 focus/hops/rels）
+    hops: int = 2,
+    rels: Sequence[str] | None = None,
+) -> Layout:
+    """计算分层布局；root 为类对象或 qualname 时只布局其子树，focus 给出时只布局其邻域及祖先。"""
+    reg = reg or REGISTRY
+    reg.resolve_all()
+    scores = _resolve_scores(scores, reg)
+    ego = None
+    if focus is not None:
+        fid = _resolve_root(reg, focus)
+        if fid not in reg.nodes:
+            raise ValueError(f"focus node not found or ambiguous: {focus!r}")
+        ego, selected = _ego_selection(reg, fid, hops, rels)
+        ids = _ordered_ids(reg, None, selected)
+    else:
+        rid = _resolve_root(reg, root) if root else None
+        ids = _ordered_ids(reg, rid)
+    index = {nid: i for i, nid in enumerate(ids)}
+    n = len(ids)
+
+    edges = [e for e in _visible_edges(reg, set(ids), include, ego) if e.src != e.dst]
+    edges.sort(key=lambda e: (0 if e.rel == "contains" else 1, e.rel, e.src, e.dst))   # 树边先入 DFS
+    pairs = [(index[e.src], index[e.dst]) for e in edges]
+    back = _reverse_back_edges(n, pairs)
+    dag = [(v, u) if k in back else (u, v) for k, (u, v) in enumerate(pairs)]
+    layer = _assign_layers(n, dag)
+
+    # 节点尺寸
+    lines = [_node_lines(reg.nodes[nid].title, reg.nodes[nid].text, show_text, text_lines) for nid in ids]
+    if scores:
+        for ls, nid in zip(lines, ids):
+            badge = scores.label(nid)
+            if badge:
+                ls.insert(1, badge)
+    w = [max(_text_width(s) for s in ls) + 2 * PAD_X for ls in lines]
+    h = [len(ls) * LINE_HEIGHT + 2 * PAD_Y for ls in lines]
+
+    # 长边 -> 虚拟节点链
+    up: List[List[int]] = [[] for _ in range(n)]
+    down: List[List[int]] = [[] for _ in range(n)]
+    chains: List[List[int]] = []
+    for a, b in dag:
+        chain = [a]
+        for l in range(layer[a] + 1, layer[b]):
+            layer.append(l)
+            w.append(0.0)
+            h.append(0.0)
+            up.append([])
+            down.append([])
+            chain.append(len(layer) - 1)
+        chain.append(b)
+        for x, y in zip(chain, chain[1:]):
+            down[x].append(y)
+            up[y].append(x)
+        chains.append(chain)
+
+    layers: List[List[int]] = [[] for _ in range(max(layer, default=-1) + 1)]
+    for v in range(len(layer)):
+        layers[layer[v]].append(v)
+    pos = [0] * len(layer)
+    for row in layers:
+        for j, v in enumerate(row):
+            pos[v] = j
+    for i in range(1, len(layers)):   # 初始顺序：先序 + 一次自上而下的重心排序
+        _reorder(layers[i], up, pos)
+    crossings = _minimize_crossings(layers, up, down, pos)
+
+    cx = _assign_x(layers, up, down, w, n)
+    shift = MARGIN - min((cx[v] - w[v] / 2 for v in range(len(cx))), default=0.0)
+    tops, y = [], float(MARGIN)
+    for row in layers:
+        tops.append(y)
+        y += max((h[v] for v in row), default=0.0) + LAYER_GAP
+    heights = [max((h[v] for v in row), default=0.0) for row in layers]
+
+    nodes: Dict[str, LayoutNode] = {}
+    for i, nid in enumerate(ids):
+        l = layer[i]
+        nodes[nid] = LayoutNode(nid, reg.nodes[nid].kind, cx[i] - w[i] / 2 + shift,
+                                tops[l] + (heights[l] - h[i]) / 2, w[i], h[i], l, lines[i])
+
+    out_edges: List[LayoutEdge] = []
+    for k, e in enumerate(edges):
+        chain = chains[k]
+        a, b = chain[0], chain[-1]
+        la, lb = layer[a], layer[b]
+        pts = [(cx[a] + shift, tops[la] + (heights[la] + h[a]) / 2)]
+        for d in chain[1:-1]:
+            pts.append((cx[d] + shift, tops[layer[d]]))
+            pts.append((cx[d] + shift, tops[layer[d]] + heights[layer[d]]))
+        pts.append((cx[b] + shift, tops[lb] + (heights[lb] - h[b]) / 2))
+        if k in back:
+            pts.reverse()
+        out_edges.append(LayoutEdge(e.src, e.dst, e.rel, e.label, pts))
+
+    width = max((nd.x + nd.w for nd in nodes.values()), default=0.0) + MARGIN
+    for le in out_edges:
+        width = max(width, max(p[0] for p in le.points) + MARGIN)
+    height = (tops[-1] + heights[-1] + MARGIN) if layers else 2.0 * MARGIN
+    return Layout(nodes, out_edges, width, height, crossings)
+
+# ---------- SVG ----------
+_STYLE_SPLIT = re.compile(r"[;,](?![^(]*\))")   # 逗号/分号分隔，rgb(...) 内的逗号除外
+
+def _css(style: str) -> Tuple[str, str]:
+    """Mermaid 样式串 -> (形状 CSS, 文字 CSS)；color/font-* 作用于文字。"""
+    shape, text = [], []
+    for part in _STYLE_SPLIT.split(style or ""):
+        k, sep, v = part.partition(":")
+        k, v = k.strip(), v.strip()
+        if not sep or not k or not v:
+            continue
+        if k == "color":
+            text.append(f"fill:{v}")
+        elif k.startswith("font-"):
+            text.append(f"{k}:{v}")
+        else:
+            shape.append(f"{k}:{v}")
+    return ";".join(shape), ";".join(text)
+
+def _cls(name: str) -> str:
+    return re.sub(r"[^0-9A-Za-z_-]", "_", name)
+
+def _num(x: float) -> str:
+    return f"{x:.1f}".rstrip("0").rstrip(".")
+
+def render_svg(lay: Layout, node_styles: dict | None = None, edge_styles: dict | None = None) -> str:
+    """把 Layout 渲染为独立 SVG 文本。"""
+    styles = dict(DEFAULT_NODE_STYLES)
+    if node_styles:
+        styles.update(node_styles)
+    rels = sorted({e.rel for e in lay.edges})
+    kinds = sorted({nd.kind for nd in lay.nodes.values()})
+
+    css = [
+        f"text{{font-family:'trebuchet ms',verdana,arial,sans-serif;font-size:{FONT_SIZE}px;fill:#333}}",
+        ".n rect{fill:#ececff;stroke:#9370db;stroke-width:1px}",
+        ".n .t{font-weight:600}",
+        ".e path{fill:none;stroke:#333;stroke-width:1px}",
+        ".e.r-relates path{stroke-dasharray:3 3}",
+        ".e text{font-size:11px;paint-order:stroke;stroke:#fff;stroke-width:3px}",
+    ]
+    for kind in kinds:
+        shape, text = _css(_kind_style(styles, kind) or "")
+        if shape: css.append(f".n.k-{_cls(kind)} rect{{{shape}}}")
+        if text: css.append(f".n.k-{_cls(kind)} text{{{text}}}")
+    arrow_fill: Dict[str, str] = {}
+    for rel in rels:
+        shape, text = _css((edge_styles or {}).get(rel, ""))
+        if shape: css.append(f".e.r-{_cls(rel)} path{{{shape}}}")
+        if text: css.append(f".e.r-{_cls(rel)} text{{{text}}}")
+        m = re.search(r"(?:^|;)stroke:([^;]+)", shape)
+        arrow_fill[rel] = m.group(1) if m else "#333"
+
+    out = [
+        f'<svg xmlns="http://www.w3.org/2000/svg" width="{_num(lay.width)}" height="{_num(lay.height)}" '
+        f'viewBox="0 0 {_num(lay.width)} {_num(lay.height)}">',
+        "<style>" + "\n".join(css) + "</style>",
+        "<defs>",
+    ]
+    for rel in rels:
+        if rel != "contains":
+            out.append(f'<marker id="ah-{_cls(rel)}" viewBox="0 0 10 10" refX="10" refY="5" markerWidth="8" '
+                       f'markerHeight="8" orient="auto"><path d="M0,0L10,5L0,10z" '
+                       f'fill="{escape(arrow_fill[rel])}"/></marker>')
+    out.append("</defs>")
+
+    out.append('<g class="edges">')
+    for e in lay.edges:
+        d = "M" + "L".join(f"{_num(x)},{_num(y)}" for x, y in e.points)
+        marker = "" if e.rel == "contains" else f' marker-end="url(#ah-{_cls(e.rel)})"'
+        label = (e.label or "").strip() if e.rel == "relates" else ("" if e.rel == "contains" else e.rel)
+        if label:
+            i = len(e.points) // 2
+            (x1, y1), (x2, y2) = e.points[i - 1], e.points[i]
+            text = (f'<text x="{_num((x1 + x2) / 2)}" y="{_num((y1 + y2) / 2 + 4)}" '
+                    f'text-anchor="middle">{escape(label)}</text>')
+        else:
+            text = ""
+        out.append(f'<g class="e r-{_cls(e.rel)}"><path d="{d}"{marker}/>{text}</g>')
+    out.append("</g>")
+
+    out.append('<g class="nodes">')
+    for nd in lay.nodes.values():
+        cx = _num(nd.x + nd.w / 2)
+        rx = ' rx="6"' if _rounded(nd.kind) else ""
+        tspans = "".join(
+            f'<tspan x="{cx}" y="{_num(nd.y + PAD_Y + (i + 1) * LINE_HEIGHT - 5)}"{cls}>{escape(s)}</tspan>'
+            for i, (s, cls) in enumerate(zip(nd.lines, [' class="t"'] + [""] * (len(nd.lines) - 1))))
+        out.append(f'<g class="n k-{_cls(nd.kind)}"><title>{escape(nd.id)}</title>'
+                   f'<rect x="{_num(nd.x)}" y="{_num(nd.y)}" width="{_num(nd.w)}" height="{_num(nd.h)}"{rx}/>'
+                   f'<text text-anchor="middle">{tspans}</text></g>')
+    out.append("</g>")
+    out.append("</svg>")
+    return "\n".join(out) + "\n"
+
+def to_svg(
+    root=None,
+    include=("contains", "answers", "supports", "opposes", "relates"),
+    show_text=True,
+    node_styles: dict | None = None,
+    edge_styles: dict | None = None,
+    *,
+    text_lines: int | None = 2,
+    reg: Registry | Snapshot | None = None,
+    scores: Any = None,
+    focus: Any = None,
+    hops: int = 2,
+    rels: Sequence[str] | None = None,
+) -> str:
+    """
+    导出独立 SVG（参数同 to_mermaid_flowchart；node_styles/edge_styles 为 Mermaid 样式串）。
+    text_lines 默认 2：大图中整段 docstring 会让节点过高。
+    """
+    return render_svg(layout(root, include, show_text, text_lines=text_lines, reg=reg, scores=scores,
+                             focus=focus, hops=hops, rels=rels),
+                      node_styles, edge_styles)
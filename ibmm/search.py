@@ -0,0 +1,139 @@
+# ibmm/search.py
+"""
+可选的全文倒排索引：对节点标题与 docstring 分词建索引，按 BM25 排序返回结果。
+
+用法：
+    from ibmm.search import enable_search
+    idx = enable_search()          # 挂到全局 REGISTRY，之后 add_node 会增量更新
+    idx.search("开源 security")    # -> [(node_id, score), ...]
+
+分词对中英文混排友好：拉丁字母/数字按词切分并小写；CJK 连续片段拆成单字 + 相邻二元组。
+"""
+from __future__ import annotations
+import math, re
+from typing import Dict, List, Optional, Tuple
+
+from .core import Node, Registry, REGISTRY, Snapshot, _register_node_hook
+
+# ---------- 分词 ----------
+_CJK = r"぀-ヿ㐀-䶿一-鿿豈-﫿가-힯"
+_TOKEN_RE = re.compile(rf"[{_CJK}]+|[0-9a-z]+")
+_CJK_RE = re.compile(rf"[{_CJK}]")
+# Markdown 链接/图片的 URL 不参与索引，只保留可见文字
+_MD_URL_RE = re.compile(r"!?\[([^\]]*)\]\([^)]*\)|https?://\S+")
+
+def tokenize(text: str) -> List[str]:
+    """把文本切为 token 列表（保留重复，用于词频）。"""
+    s = _MD_URL_RE.sub(lambda m: m.group(1) or " ", text or "").lower()
+    out: List[str] = []
+    for m in _TOKEN_RE.finditer(s):
+        tok = m.group(0)
+        if _CJK_RE.match(tok):
+            out.extend(tok)                                       # 单字
+            out.extend(tok[i:i + 2] for i in range(len(tok) - 1))  # 二元组
+        else:
+            out.append(tok)
+    return out
+
+# ---------- 索引 ----------
+class SearchIndex:
+    """标题与 docstring 的倒排索引；标题中的词按 title_weight 计入词频。"""
+    K1 = 1.2
+    B = 0.75
+
+    def __init__(self, title_weight: int = 3):
+        self.title_weight = title_weight
+        self.postings: Dict[str, Dict[str, int]] = {}   # token -> {node_id: tf}
+        self.doc_len: Dict[str, int] = {}               # node_id -> 加权后的 token 数
+        self._doc_terms: Dict[str, Dict[str, int]] = {} # node_id -> {token: tf}（删除用）
+        self._total_len = 0
+
+    def __len__(self) -> int:
+        return len(self.doc_len)
+
+    def copy(self) -> "SearchIndex":
+        """独立副本（Registry 冻结后首次写入时调用）；各节点的词频表只会整体替换，直接共享。"""
+        new = SearchIndex(self.title_weight)
+        new.postings = {tok: dict(p) for tok, p in self.postings.items()}
+        new.doc_len = dict(self.doc_len)
+        new._doc_terms = dict(self._doc_terms)
+        new._total_len = self._total_len
+        return new
+
+    def add(self, n: Node) -> None:
+        """加入或更新一个节点（同 id 重复加入会先移除旧文档）。"""
+        if n.id in self.doc_len:
+            self.remove(n.id)
+        tf: Dict[str, int] = {}
+        for tok in tokenize(n.title):
+            tf[tok] = tf.get(tok, 0) + self.title_weight
+        for tok in tokenize(n.text):
+            tf[tok] = tf.get(tok, 0) + 1
+        for tok, c in tf.items():
+            self.postings.setdefault(tok, {})[n.id] = c
+        length = sum(tf.values())
+        self._doc_terms[n.id] = tf
+        self.doc_len[n.id] = length
+        self._total_len += length
+
+    def remove(self, node_id: str) -> None:
+        tf = self._doc_terms.pop(node_id, None)
+        if tf is None:
+            return
+        for tok in tf:
+            plist = self.postings.get(tok)
+            if plist is None: continue
+            plist.pop(node_id, None)
+            if not plist:
+                del self.postings[tok]
+        self._total_len -= self.doc_len.pop(node_id)
+
+    def search(self, query: str, limit: Optional[int] = 20) -> List[Tuple[str, float]]:
+        """按 BM25 打分返回 [(node_id, score), ...]，分数降序。"""
+        n_docs = len(self.doc_len)
+        if not n_docs:
+            return []
+        avg_len = self._total_len / n_docs or 1.0
+        scores: Dict[str, float] = {}
+        for tok in set(tokenize(query)):
+            plist = self.postings.get(tok)
+            if not plist: continue
+            idf = math.log(1 + (n_docs - len(plist) + 0.5) / (len(plist) + 0.5))
+            for nid, tf in plist.items():
+                norm = self.K1 * (1 - self.B + self.B * self.doc_len[nid] / avg_len)
+                scores[nid] = scores.get(nid, 0.0) + idf * tf * (self.K1 + 1) / (tf + norm)
+        ranked = sorted(scores.items(), key=lambda kv: (-kv[1], kv[0]))
+        return ranked if limit is None else ranked[:limit]
+
+# ---------- 挂接到 Registry ----------
+def enable_search(reg: Registry = REGISTRY, title_weight: int = 3) -> SearchIndex:
+    """
+    为 reg 建立（或重建）索引，并在之后的 add_node 中增量维护。
+    reg 为快照时只建不挂接：快照被多个线程无锁共享，不能写入。
+    """
+    idx = SearchIndex(title_weight=title_weight)
+    for n in reg.nodes.values():
+        idx.add(n)
+    if isinstance(reg, Snapshot):
+        return idx
+    reg._thaw()   # 已发出的快照不变；下次 freeze() 带上索引
+    reg._search_index = idx
+    return idx
+
+def get_index(reg: Registry = REGISTRY) -> Optional[SearchIndex]:
+    return getattr(reg, "_search_index", None)
+
+def search(query: str, limit: Optional[int] = 20, reg: Registry = REGISTRY) -> List[Tuple[str, float]]:
+    """在 reg 上搜索；若尚未启用索引则先建立（快照上每次临时建立，不挂接）。"""
+    idx = get_index(reg)
+    if idx is None:   # 空索引也是有效索引：不能用 or
+        idx = enable_search(reg)
+    return idx.search(query, limit)
+
+def _index_node(reg: Registry, n: Node) -> None:
+    idx = getattr(reg, "_search_index", None)
+    if idx is not None:
+        idx.add(n)
+_register_node_hook(_index_node)
+
+__all__ = ["tokenize", "SearchIndex", "enable_search", "get_index", "search"]